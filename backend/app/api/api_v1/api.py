@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.api_v1.endpoints import budgets, accounts, transactions, categories, payees
+from app.api.api_v1.endpoints import budgets, accounts, transactions, categories, payees, events, exports
 
 api_router = APIRouter()
 
@@ -8,4 +8,6 @@ api_router.include_router(budgets.router, prefix="/budgets", tags=["budgets"])
 api_router.include_router(accounts.router, prefix="/accounts", tags=["accounts"])
 api_router.include_router(transactions.router, prefix="/transactions", tags=["transactions"])
 api_router.include_router(categories.router, prefix="/categories", tags=["categories"])
-api_router.include_router(payees.router, prefix="/payees", tags=["payees"])
\ No newline at end of file
+api_router.include_router(payees.router, prefix="/payees", tags=["payees"])
+api_router.include_router(events.router, prefix="/events", tags=["events"])
+api_router.include_router(exports.router, prefix="/exports", tags=["exports"])
\ No newline at end of file
@@ -0,0 +1,69 @@
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.core.single_flight import single_flight
+from app.db.session import get_db, get_read_db
+from app.models.account import Account
+from app.schemas.account import AccountList, AccountBalanceSeries, NetWorthSeries
+from app.services.balances import account_balance_series, net_worth_series
+from app.services.overview import current_version
+
+router = APIRouter()
+
+@router.get("/", response_model=AccountList)
+def get_accounts(
+    budget_id: str,
+    db: Session = Depends(get_db)
+):
+    """
+    Retrieve all accounts of a budget.
+    """
+    accounts = (
+        db.query(Account)
+        .filter(Account.budget_id == budget_id, Account.deleted == False)
+        .order_by(Account.name)
+        .all()
+    )
+    return {"accounts": accounts}
+
+@router.get("/net-worth", response_model=NetWorthSeries)
+def get_net_worth(
+    budget_id: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Retrieve the net worth of a budget over time, one point per day with activity.
+    Concurrent requests for the same series share one computation.
+    """
+    opening, points = single_flight.do(
+        ("net-worth", budget_id, start_date, end_date, current_version(db, budget_id)),
+        lambda: net_worth_series(db, budget_id, start_date, end_date)
+    )
+    return {
+        "budget_id": budget_id,
+        "opening_balance": int(opening),
+        "points": [{"date": day, "balance": int(balance)} for day, balance in points]
+    }
+
+@router.get("/{account_id}/balances", response_model=AccountBalanceSeries)
+def get_account_balances(
+    account_id: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Retrieve the balance of an account over time, one point per day with activity.
+    """
+    if not db.query(Account.id).filter(Account.id == account_id, Account.deleted == False).first():
+        raise HTTPException(status_code=404, detail="Account not found")
+    opening, points = account_balance_series(db, account_id, start_date, end_date)
+    return {
+        "account_id": account_id,
+        "opening_balance": opening,
+        "points": [{"date": day, "balance": balance} for day, balance in points]
+    }
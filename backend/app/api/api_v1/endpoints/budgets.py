@@ -1,14 +1,67 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+import time
+from datetime import date, datetime
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import and_, or_, select
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
+from app.core.serialization import FastJSONResponse, rows_as_dicts
+from app.core.single_flight import single_flight
+from app.db.session import get_db, get_read_db
+from app.models.account import Account
 from app.models.budget import Budget
+from app.models.month import CategoryMonthHistory, MonthHistory
 from app.schemas.budget import BudgetResponse, BudgetList
+from app.schemas.context import BudgetAnswer, BudgetContext, BudgetQuestion
+from app.schemas.forecast import CashFlowForecast
+from app.schemas.month import MonthSnapshot
+from app.schemas.overview import BudgetOverview
+from app.schemas.timeseries import TimeSeries
+from app.services.context import context_service
+from app.services.llm import llm
+from app.services.overview import budget_overview, budget_version
 
 router = APIRouter()
 
-@router.get("/", response_model=BudgetList)
+ASK_SYSTEM_PROMPT = (
+    "You answer questions about the user's budget. Use only the budget context "
+    "given; say so when it does not contain the answer."
+)
+
+# Columns of the Budget schema, selected as plain tuples for the fast list path
+BUDGET_COLUMNS = [
+    Budget.id,
+    Budget.name,
+    Budget.last_modified_on,
+    Budget.first_month,
+    Budget.last_month,
+    Budget.currency_format_iso_code,
+    Budget.date_format,
+    Budget.currency_format_symbol
+]
+
+# Columns of the MonthSnapshot and CategoryMonthVersion schemas
+MONTH_VERSION_COLUMNS = [
+    MonthHistory.budget_id,
+    MonthHistory.month,
+    MonthHistory.to_be_budgeted,
+    MonthHistory.age_of_money,
+    MonthHistory.income,
+    MonthHistory.budgeted,
+    MonthHistory.activity,
+    MonthHistory.valid_from,
+    MonthHistory.valid_to
+]
+CATEGORY_MONTH_VERSION_COLUMNS = [
+    CategoryMonthHistory.category_id,
+    CategoryMonthHistory.budgeted,
+    CategoryMonthHistory.activity,
+    CategoryMonthHistory.balance,
+    CategoryMonthHistory.valid_from,
+    CategoryMonthHistory.valid_to
+]
+
+@router.get("/", response_model=BudgetList, response_class=FastJSONResponse)
 def get_budgets(
     db: Session = Depends(get_db),
     skip: int = 0,
@@ -17,8 +70,10 @@ def get_budgets(
     """
     Retrieve all budgets.
     """
-    budgets = db.query(Budget).filter(Budget.deleted == False).offset(skip).limit(limit).all()
-    return {"budgets": budgets}
+    result = db.execute(
+        select(*BUDGET_COLUMNS).order_by(Budget.name).offset(skip).limit(limit)
+    )
+    return FastJSONResponse({"budgets": rows_as_dicts(result)})
 
 @router.get("/{budget_id}", response_model=BudgetResponse)
 def get_budget(
@@ -28,7 +83,160 @@ def get_budget(
     """
     Retrieve a specific budget by ID.
     """
-    budget = db.query(Budget).filter(Budget.id == budget_id, Budget.deleted == False).first()
+    budget = db.query(Budget).filter(Budget.id == budget_id).first()
+    if not budget:
+        raise HTTPException(status_code=404, detail="Budget not found")
+    return {"budget": budget}
+
+@router.get("/{budget_id}/forecast", response_model=CashFlowForecast, response_class=FastJSONResponse)
+def get_forecast(
+    budget_id: str,
+    start_date: Optional[date] = None,
+    days: int = Query(365, ge=1, le=1830),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Forecast daily cash flow per account and category from scheduled transactions.
+    """
+    # Imported on first use, numpy is not needed to start the API
+    from app.services.forecast import forecast_service
+
+    budget = db.query(Budget.id).filter(Budget.id == budget_id).first()
+    if not budget:
+        raise HTTPException(status_code=404, detail="Budget not found")
+    return FastJSONResponse(forecast_service.forecast(db, budget_id, start_date or date.today(), days))
+
+@router.get("/{budget_id}/series", response_model=TimeSeries, response_class=FastJSONResponse)
+def get_series(
+    budget_id: str,
+    series: List[Literal["balance", "spending", "income"]] = Query(["balance"]),
+    points: int = Query(500, ge=3, le=10000),
+    method: Literal["lttb", "minmax"] = "lttb",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    account_id: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Daily balance, spending and income of a budget, or of one of its accounts,
+    downsampled server-side to at most points points per series for charts.
+    "lttb" keeps the shape of the series (Largest-Triangle-Three-Buckets),
+    "minmax" the lowest and highest day of each bucket.
+    """
+    # Imported on first use, numpy is not needed to start the API
+    from app.services.timeseries import timeseries_service
+
+    budget = db.query(Budget.id).filter(Budget.id == budget_id).first()
+    if not budget:
+        raise HTTPException(status_code=404, detail="Budget not found")
+    if account_id and not db.query(Account.id).filter(Account.id == account_id, Account.budget_id == budget_id).first():
+        raise HTTPException(status_code=404, detail="Account not found")
+    return FastJSONResponse(timeseries_service.series(
+        db, budget_id, list(dict.fromkeys(series)), points, method, start_date, end_date, account_id
+    ))
+
+@router.get("/{budget_id}/months/{month}", response_model=MonthSnapshot, response_class=FastJSONResponse)
+def get_month_snapshot(
+    budget_id: str,
+    month: date,
+    as_of: Optional[datetime] = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Retrieve a budget month and its categories' values as they were at as_of
+    (default: now), from the versions the sync keeps of every change.
+    """
+    def valid(model):
+        if as_of is None:
+            return model.valid_to.is_(None)
+        return and_(model.valid_from <= as_of, or_(model.valid_to.is_(None), model.valid_to > as_of))
+
+    budget = db.query(Budget.id).filter(Budget.id == budget_id).first()
+    if not budget:
+        raise HTTPException(status_code=404, detail="Budget not found")
+
+    # Both are range lookups on the history tables' primary keys
+    month_key = month.replace(day=1).isoformat()
+    snapshot = rows_as_dicts(db.execute(
+        select(*MONTH_VERSION_COLUMNS)
+        .where(MonthHistory.budget_id == budget_id, MonthHistory.month == month_key, valid(MonthHistory))
+    ))
+    if not snapshot:
+        raise HTTPException(status_code=404, detail="Month not found")
+    snapshot[0]["as_of"] = as_of
+    snapshot[0]["categories"] = rows_as_dicts(db.execute(
+        select(*CATEGORY_MONTH_VERSION_COLUMNS)
+        .where(
+            CategoryMonthHistory.budget_id == budget_id,
+            CategoryMonthHistory.month == month_key,
+            valid(CategoryMonthHistory)
+        )
+        .order_by(CategoryMonthHistory.category_id)
+    ))
+    return FastJSONResponse(snapshot[0])
+
+@router.get("/{budget_id}/context", response_model=BudgetContext)
+def get_context(
+    budget_id: str,
+    question: str = Query(..., min_length=1, max_length=2000),
+    max_tokens: int = Query(2000, ge=100, le=100000),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Assemble the budget context for a question: the cached month, category and
+    budget summaries and the transactions most relevant to it, within max_tokens.
+    """
+    budget = db.query(Budget.id).filter(Budget.id == budget_id).first()
+    if not budget:
+        raise HTTPException(status_code=404, detail="Budget not found")
+    return context_service.assemble(db, budget_id, question, max_tokens)
+
+@router.post("/{budget_id}/ask", response_model=BudgetAnswer)
+def ask(
+    budget_id: str,
+    body: BudgetQuestion,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Answer a question about a budget from its assembled context.
+    """
+    budget = db.query(Budget.id).filter(Budget.id == budget_id).first()
     if not budget:
         raise HTTPException(status_code=404, detail="Budget not found")
-    return {"budget": budget}
\ No newline at end of file
+    context = context_service.assemble(db, budget_id, body.question, body.max_tokens)
+    started = time.perf_counter()
+    answer = llm.complete(ASK_SYSTEM_PROMPT, context["context"], body.question)
+    return {
+        "answer": answer,
+        "model": llm.model,
+        "context": context,
+        "llm_ms": (time.perf_counter() - started) * 1000
+    }
+
+@router.get("/{budget_id}/overview", response_model=BudgetOverview, response_class=FastJSONResponse)
+async def get_budget_overview(
+    budget_id: str,
+    request: Request,
+    month: Optional[date] = None,
+    recent: int = Query(20, ge=0, le=100)
+):
+    """
+    Retrieve everything the dashboard shows for a budget in one response:
+    accounts, categories with the month's values, the month summary and
+    recent transactions. Answers 304 when the client's ETag is still current,
+    and concurrent requests for the same data share one computation.
+    """
+    month = month or date.today()
+    budget, version = await budget_version(budget_id)
+    if budget is None:
+        raise HTTPException(status_code=404, detail="Budget not found")
+    
+    etag = f'"{version}-{month:%Y%m}-{recent}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    overview = await single_flight.do_async(
+        ("overview", budget_id, f"{month:%Y%m}", recent, version),
+        lambda: budget_overview(budget_id, month, recent)
+    )
+    return FastJSONResponse({"version": version, "budget": budget, **overview}, headers={"ETag": etag})
\ No newline at end of file
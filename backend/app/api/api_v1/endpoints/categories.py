@@ -0,0 +1,55 @@
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session, selectinload
+
+from app.db.session import get_read_db
+from app.models.category import Category, CategoryGroup
+from app.models.month import CategoryMonth
+from app.schemas.category import CategoryGroupList, CategoryMonthList
+
+router = APIRouter()
+
+@router.get("/", response_model=CategoryGroupList)
+def get_categories(
+    budget_id: str,
+    month: Optional[date] = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Retrieve the category groups of a budget with their categories and the
+    categories' values for a month (default: the current month).
+    """
+    month_key = (month or date.today()).replace(day=1).isoformat()
+    groups = (
+        db.query(CategoryGroup)
+        .filter(CategoryGroup.budget_id == budget_id, CategoryGroup.deleted == False)
+        .options(
+            selectinload(CategoryGroup.categories.and_(Category.deleted == False))
+            .selectinload(Category.months.and_(
+                CategoryMonth.budget_id == budget_id,
+                CategoryMonth.month == month_key
+            ))
+        )
+        .order_by(CategoryGroup.name)
+        .all()
+    )
+    return {"category_groups": groups}
+
+@router.get("/{category_id}/months", response_model=CategoryMonthList)
+def get_category_months(
+    category_id: str,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Retrieve the month history of a category.
+    """
+    category = (
+        db.query(Category)
+        .filter(Category.id == category_id, Category.deleted == False)
+        .options(selectinload(Category.months))
+        .first()
+    )
+    if not category:
+        raise HTTPException(status_code=404, detail="Category not found")
+    return {"category_id": category.id, "months": category.months}
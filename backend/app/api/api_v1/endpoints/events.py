@@ -0,0 +1,57 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from app.db import session as db_session
+from app.models.server_knowledge import ServerKnowledge
+from app.services.events import broadcaster
+
+router = APIRouter()
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.get("/{budget_id}", response_class=StreamingResponse)
+async def stream_changes(
+    budget_id: str,
+    keepalive: int = Query(15, ge=1, le=300)
+):
+    """
+    Stream change events of a budget as server-sent events.
+
+    The stream opens with a "snapshot" event holding the current server
+    knowledge per entity, then sends a "change" event ({budget_id, entity,
+    server_knowledge}) whenever a sync commits new data for an entity, or when
+    the balance stage updated the daily balances (entity "balances"). An entity
+    of "*" means events may have been missed and everything should be refetched.
+    """
+    async def events():
+        # Subscribe before reading the snapshot, so no change between the two is lost
+        queue = await broadcaster.subscribe(budget_id)
+        try:
+            async with db_session.AsyncSessionLocal() as session:
+                knowledge = dict((await session.execute(
+                    select(ServerKnowledge.entity_type, ServerKnowledge.knowledge)
+                    .where(ServerKnowledge.budget_id == budget_id)
+                )).all())
+            yield "retry: 5000\n\n"
+            yield _sse("snapshot", {"budget_id": budget_id, "server_knowledge": knowledge})
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    # Comment line, keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse("change", event)
+        finally:
+            broadcaster.unsubscribe(budget_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,56 @@
+from datetime import date
+from typing import Literal, Optional
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db import session as db_session
+from app.models.budget import Budget
+
+router = APIRouter()
+
+@router.get("/{table}", response_class=StreamingResponse)
+def export_table(
+    table: Literal["transactions", "subtransactions", "category_months", "months"],
+    budget_id: str,
+    request: Request,
+    since_date: Optional[date] = None,
+    until_date: Optional[date] = None,
+    format: Literal["parquet", "arrow"] = "parquet"
+):
+    """
+    Export a synced table of a budget as a Parquet file or an Arrow IPC stream.
+
+    Rows are read through a server-side cursor and encoded batch by batch while
+    the response streams, so memory stays constant whatever the export size.
+    Dates are filtered on the transaction date or the month.
+    """
+    # Imported on first use, pyarrow is not needed to start the API
+    from app.services.export import EXPORT_TABLES, FORMATS, encode_batches, record_batches
+
+    export = EXPORT_TABLES[table]
+    media_type, extension = FORMATS[format]
+    source, engine = db_session.read_router.read_engine(prefer_primary=request.headers.get("X-Read-From") == "primary")
+    request.state.read_source = source
+
+    conn = engine.connect()
+    try:
+        if conn.execute(select(Budget.id).where(Budget.id == budget_id)).first() is None:
+            raise HTTPException(status_code=404, detail="Budget not found")
+    except Exception:
+        conn.close()
+        raise
+
+    def stream():
+        try:
+            batches = record_batches(conn, export, budget_id, since_date, until_date, settings.EXPORT_BATCH_SIZE)
+            yield from encode_batches(batches, export.schema, format)
+        finally:
+            conn.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{budget_id}-{table}.{extension}"'}
+    )
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.serialization import FastJSONResponse, rows_as_dicts
+from app.db.session import get_db
+from app.models.payee import Payee
+from app.schemas.payee import PayeeList
+
+router = APIRouter()
+
+@router.get("/", response_model=PayeeList, response_class=FastJSONResponse)
+def get_payees(
+    budget_id: str,
+    db: Session = Depends(get_db)
+):
+    """
+    Retrieve all payees of a budget.
+    """
+    result = db.execute(
+        select(Payee.id, Payee.name, Payee.transfer_account_id)
+        .where(Payee.budget_id == budget_id, Payee.deleted == False)
+        .order_by(Payee.name)
+    )
+    return FastJSONResponse({"payees": rows_as_dicts(result)})
@@ -0,0 +1,199 @@
+from datetime import date
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session, aliased, joinedload, selectinload
+
+from app.core.serialization import FastJSONResponse, rows_as_dicts
+from app.db.session import get_db, get_read_db
+from app.models.transaction import Subtransaction, Transaction as TransactionModel
+from app.models.transaction_match import TransactionMatch
+from app.models.transaction_score import TransactionScore
+from app.schemas.transaction import (
+    Transaction,
+    TransactionAnomalyList,
+    TransactionDetailResponse,
+    TransactionList,
+    TransactionMatchList,
+    TransactionSearchResponse,
+    TransactionSearchResult
+)
+from app.services.dimensions import dimension_cache
+from app.services.search import search_transactions
+
+router = APIRouter()
+
+# Columns of the Transaction schema, selected as plain tuples for the fast list path
+TRANSACTION_COLUMNS = [
+    TransactionModel.id,
+    TransactionModel.date,
+    TransactionModel.amount,
+    TransactionModel.memo,
+    TransactionModel.account_id,
+    TransactionModel.category_id,
+    TransactionModel.payee_id,
+    TransactionModel.cleared,
+    TransactionModel.approved,
+    TransactionModel.flag_color,
+    TransactionModel.import_id
+]
+
+@router.get("/", response_model=TransactionList, response_class=FastJSONResponse)
+def get_transactions(
+    budget_id: str,
+    account_id: Optional[str] = None,
+    category_id: Optional[str] = None,
+    since_date: Optional[date] = None,
+    until_date: Optional[date] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Retrieve transactions of a budget, newest first, with the names of their
+    account, payee, category and category group from the dimension cache.
+    """
+    query = select(*TRANSACTION_COLUMNS).where(
+        TransactionModel.budget_id == budget_id,
+        TransactionModel.deleted == False
+    )
+    if account_id:
+        query = query.where(TransactionModel.account_id == account_id)
+    if category_id:
+        query = query.where(TransactionModel.category_id == category_id)
+    if since_date:
+        query = query.where(TransactionModel.date >= since_date.isoformat())
+    if until_date:
+        query = query.where(TransactionModel.date <= until_date.isoformat())
+    
+    result = db.execute(
+        query.order_by(TransactionModel.date.desc(), TransactionModel.id).offset(skip).limit(limit)
+    )
+    transactions = dimension_cache.get(db, budget_id).enrich(rows_as_dicts(result))
+    return FastJSONResponse({"transactions": transactions})
+
+@router.get("/search", response_model=TransactionSearchResponse)
+def search(
+    budget_id: str,
+    q: str = Query(..., min_length=3, max_length=200),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Search transactions by memo text and fuzzy payee name, best matches first.
+    """
+    rows = search_transactions(db, budget_id, q, limit=limit)
+    results = [
+        TransactionSearchResult(
+            **Transaction.model_validate(transaction).model_dump(),
+            payee_name=payee_name,
+            score=score
+        )
+        for transaction, payee_name, score in rows
+    ]
+    return {"query": q, "results": results}
+
+
+@router.get("/anomalies", response_model=TransactionAnomalyList)
+def get_anomalies(
+    budget_id: str,
+    since_date: Optional[date] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Retrieve transactions flagged as unusual by the sync's anomaly stage, newest first.
+    Reasons are "payee_amount" and "category_amount" for an amount far above
+    the usual one, and "new_recurring" for the charge that made a payee recurring.
+    """
+    query = (
+        select(
+            *TRANSACTION_COLUMNS,
+            TransactionScore.score,
+            TransactionScore.expected_amount,
+            TransactionScore.reasons
+        )
+        .join(TransactionModel, TransactionModel.id == TransactionScore.transaction_id)
+        .where(
+            TransactionScore.budget_id == budget_id,
+            TransactionScore.reasons.is_not(None),
+            TransactionModel.deleted == False
+        )
+    )
+    if since_date:
+        query = query.where(TransactionScore.date >= since_date.isoformat())
+    rows = db.execute(query.order_by(TransactionScore.date.desc()).limit(limit)).mappings()
+    anomalies = [{**row, "reasons": row["reasons"].split(",")} for row in rows]
+    return {"anomalies": dimension_cache.get(db, budget_id).enrich(anomalies)}
+
+
+@router.get("/matches", response_model=TransactionMatchList)
+def get_matches(
+    budget_id: str,
+    kind: Optional[Literal["duplicate", "transfer"]] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Retrieve likely duplicate imports and transfers whose other side is
+    missing, as found by the sync's match stage, best matches first.
+    A "transfer" match has the unmatched transfer as its transaction and a
+    non-transfer transaction that could be its other side as the match, or
+    no match if there is none.
+    """
+    best = select(TransactionMatch).where(TransactionMatch.budget_id == budget_id)
+    if kind:
+        best = best.where(TransactionMatch.kind == kind)
+    # Pick the best matches on the score index before joining their transactions
+    best = aliased(TransactionMatch, best.order_by(TransactionMatch.score.desc()).limit(limit).subquery())
+    Match = aliased(TransactionModel)
+    rows = db.execute(
+        select(
+            best.kind,
+            best.score,
+            best.days_apart,
+            *TRANSACTION_COLUMNS,
+            *[getattr(Match, column.key).label(f"match_{column.key}") for column in TRANSACTION_COLUMNS]
+        )
+        .join(TransactionModel, TransactionModel.id == best.transaction_id)
+        .outerjoin(Match, Match.id == best.match_id)
+        .order_by(best.score.desc(), TransactionModel.date.desc())
+    ).mappings()
+
+    matches = []
+    for row in rows:
+        match = {column.key: row[f"match_{column.key}"] for column in TRANSACTION_COLUMNS}
+        matches.append({
+            "kind": row["kind"],
+            "score": row["score"],
+            "days_apart": row["days_apart"],
+            "transaction": {column.key: row[column.key] for column in TRANSACTION_COLUMNS},
+            "match": match if match["id"] is not None else None
+        })
+    dimensions = dimension_cache.get(db, budget_id)
+    dimensions.enrich([match["transaction"] for match in matches])
+    dimensions.enrich([match["match"] for match in matches if match["match"] is not None])
+    return {"matches": matches}
+
+
+@router.get("/{transaction_id}", response_model=TransactionDetailResponse)
+def get_transaction(
+    transaction_id: str,
+    db: Session = Depends(get_db)
+):
+    """
+    Retrieve a transaction with its payee, category and splits.
+    """
+    transaction = (
+        db.query(TransactionModel)
+        .filter(TransactionModel.id == transaction_id, TransactionModel.deleted == False)
+        .options(
+            joinedload(TransactionModel.payee),
+            joinedload(TransactionModel.category),
+            selectinload(TransactionModel.subtransactions.and_(Subtransaction.deleted == False))
+        )
+        .first()
+    )
+    if not transaction:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+    return {"transaction": transaction}
@@ -0,0 +1,78 @@
+import os
+import sys
+import threading
+import uuid
+from collections import Counter, OrderedDict
+
+# Root of the application package, used to tell application frames from library frames
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class StackSampler:
+    """
+    Sampling profiler for a single request.
+
+    A background thread snapshots the stacks of all threads every interval and
+    keeps the ones running application code, so it sees the request whether it
+    runs on the event loop or in the threadpool. The result is a count per
+    collapsed stack ("outer;...;inner"), the format flame graph tools read.
+    Samples from concurrent requests are not told apart, so profile one request
+    at a time.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_thread = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                stack = []
+                in_app = False
+                while frame is not None:
+                    code = frame.f_code
+                    in_app = in_app or code.co_filename.startswith(APP_DIR)
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                if in_app:
+                    self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        """Collapsed stacks, one "stack count" line each, most frequent first."""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+class ProfileStore:
+    """The most recent request profiles, retrievable by ID."""
+
+    def __init__(self, size: int = 20):
+        self.size = size
+        self.lock = threading.Lock()
+        self.profiles = OrderedDict()
+
+    def add(self, profile: str) -> str:
+        profile_id = uuid.uuid4().hex
+        with self.lock:
+            self.profiles[profile_id] = profile
+            while len(self.profiles) > self.size:
+                self.profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str):
+        with self.lock:
+            return self.profiles.get(profile_id)
+
+profiles = ProfileStore()
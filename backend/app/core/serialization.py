@@ -0,0 +1,30 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse
+
+class FastJSONResponse(ORJSONResponse):
+    """
+    JSON response encoded with orjson, which also handles numpy arrays and
+    datetimes natively.
+
+    Endpoints returning this response directly skip response_model validation,
+    so it is meant for trusted database output shaped like the declared schema.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+def rows_as_dicts(result):
+    """
+    Turn SQL result tuples into plain dicts keyed by column label, without
+    building an ORM object or a Pydantic model per row.
+
+    Args:
+        result (Result): Result of a Core select
+
+    Returns:
+        list: One dict per row
+    """
+    keys = tuple(result.keys())
+    return [dict(zip(keys, row)) for row in result]
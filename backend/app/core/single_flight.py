@@ -0,0 +1,102 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Hashable
+
+class _Call:
+    """An in-flight computation that threads with the same key wait for."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical computations: the first caller for a key
+    runs it, callers arriving while it is in flight wait for and share its
+    result (or its exception). Nothing is kept once the computation finishes,
+    so this protects the database from a burst of identical requests without
+    serving anything staler than the in-flight computation.
+
+    Keys should include the data version, so a request made after a sync never
+    joins a computation that started before it. Results are shared between
+    callers and must not be mutated.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def _count(self, leader: bool):
+        with self._lock:
+            if leader:
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn, or wait for the identical call already running in another thread.
+
+        Args:
+            key (Hashable): Identifies identical calls, e.g. endpoint, parameters and data version
+            fn (callable): Computation to run when no identical call is in flight
+
+        Returns:
+            The result of fn
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        self._count(leader)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await fn(), or the identical coroutine already running on the event loop.
+
+        The computation runs as its own task, so a waiter that is cancelled
+        (e.g. because its client disconnected) does not cancel it for the others.
+
+        Args:
+            key (Hashable): Identifies identical calls, e.g. endpoint, parameters and data version
+            fn (callable): Returns the coroutine to run when no identical call is in flight
+
+        Returns:
+            The result of the coroutine
+        """
+        task = self._tasks.get(key)
+        leader = task is None
+        if leader:
+            task = self._tasks[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda done: self._tasks.pop(key) if self._tasks.get(key) is done else None)
+        self._count(leader)
+        return await asyncio.shield(task)
+
+    def stats(self):
+        """Number of computations run and of callers that shared one instead."""
+        with self._lock:
+            return {"computations": self.leaders, "coalesced": self.followers}
+
+single_flight = SingleFlight()
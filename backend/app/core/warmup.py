@@ -0,0 +1,101 @@
+import asyncio
+import importlib
+import logging
+import threading
+import time
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Modules imported on first use by their endpoints, loaded ahead of that use
+DEFERRED_MODULES = ["app.services.forecast", "app.services.export", "app.services.timeseries"]
+
+class WarmUp:
+    """
+    Warms a cold container up off the request path.
+
+    The API starts without connecting to the database or loading numpy and
+    pyarrow, so it answers its first request, a health check included, as
+    soon as it is imported. Right after startup a background thread opens
+    the first pool connections and runs the replica lag check, then imports
+    the modules deferred by the endpoints, while a task on the event loop
+    connects the async engine. Requests arriving meanwhile do whatever they
+    need themselves: the warm-up only saves later requests the wait.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = None
+        self.steps = {}
+        self.errors = {}
+
+    def _step(self, name, fn):
+        started = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            logger.warning(f"Warm-up step {name} failed: {str(e)}")
+            with self._lock:
+                self.errors[name] = str(e)
+        with self._lock:
+            self.steps[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    def _connect(self, connections: int):
+        from app.db import session as db_session
+
+        # Hold the connections together so the pool keeps that many open
+        opened = []
+        try:
+            for _ in range(connections):
+                opened.append(db_session.engine.connect())
+                opened[-1].execute(text("SELECT 1"))
+        finally:
+            for conn in opened:
+                conn.close()
+
+    def _route_reads(self):
+        from app.db import session as db_session
+
+        db_session.read_router.check_lag()
+        _, engine = db_session.read_router.read_engine()
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    def _run(self, connections: int):
+        self._step("connections", lambda: self._connect(connections))
+        self._step("read_router", self._route_reads)
+        for module in DEFERRED_MODULES:
+            self._step(module, lambda: importlib.import_module(module))
+
+    async def _run_async(self):
+        from app.db import session as db_session
+
+        started = time.perf_counter()
+        try:
+            async with db_session.async_engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        except Exception as e:
+            logger.warning(f"Warm-up step async_connection failed: {str(e)}")
+            with self._lock:
+                self.errors["async_connection"] = str(e)
+        with self._lock:
+            self.steps["async_connection"] = round((time.perf_counter() - started) * 1000, 1)
+
+    def start(self, connections: int = 2):
+        """
+        Start warming up in the background. Call from a running event loop.
+
+        Args:
+            connections (int): Connections to open in the primary pool
+        """
+        self.started_at = time.time()
+        threading.Thread(target=self._run, args=(connections,), name="warm-up", daemon=True).start()
+        asyncio.get_running_loop().create_task(self._run_async())
+
+    def stats(self):
+        """Milliseconds each warm-up step took, and the steps that failed."""
+        with self._lock:
+            return {"started_at": self.started_at, "steps_ms": dict(self.steps), "errors": dict(self.errors)}
+
+warm_up = WarmUp()
@@ -0,0 +1,191 @@
+import logging
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Expanded IN lists ("IN (%(id_1_1)s, %(id_1_2)s)" or "IN ($1, $2)") collapse to one
+# shape, so a statement aggregates under the same key whatever the list length
+EXPANDED_PARAMETERS = re.compile(r"\((?:\s*(?:%\(\w+\)s|\$\d+)\s*,)+\s*(?:%\(\w+\)s|\$\d+)\s*\)")
+WHITESPACE = re.compile(r"\s+")
+EXPLAINABLE = ("select", "with", "insert", "update", "delete")
+
+def normalize_statement(statement):
+    """Collapse whitespace and expanded parameter lists of a SQL statement."""
+    return EXPANDED_PARAMETERS.sub("(...)", WHITESPACE.sub(" ", statement).strip())
+
+class RequestStats:
+    """SQL activity of a single request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+        self.sql_seconds = 0.0
+
+    def record(self, seconds, rows):
+        self.queries += 1
+        self.rows += rows
+        self.sql_seconds += seconds
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+class QueryMetrics:
+    """
+    Process-wide aggregates of SQL statements and requests, exposed on /metrics.
+
+    Statements are keyed by their normalized text; once max_statements distinct
+    statements are tracked, new ones are counted under a single overflow key.
+    Request latencies keep the last window_size samples per route for percentiles.
+    """
+
+    OVERFLOW_KEY = "<other statements>"
+
+    def __init__(self, max_statements=500, window_size=1000, slow_query_log_size=50):
+        self.max_statements = max_statements
+        self.window_size = window_size
+        self.lock = threading.Lock()
+        self.statements = {}
+        self.routes = {}
+        self.slow_queries = deque(maxlen=slow_query_log_size)
+
+    def record_statement(self, statement, seconds, rows):
+        key = normalize_statement(statement)
+        with self.lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                if len(self.statements) >= self.max_statements:
+                    key = self.OVERFLOW_KEY
+                stats = self.statements.setdefault(key, {"count": 0, "rows": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            stats["count"] += 1
+            stats["rows"] += rows
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+    def record_slow_query(self, statement, seconds, plan):
+        with self.lock:
+            self.slow_queries.append({
+                "statement": normalize_statement(statement),
+                "seconds": seconds,
+                "plan": plan,
+                "at": time.time(),
+            })
+
+    def record_request(self, route, seconds, stats: RequestStats):
+        with self.lock:
+            route_stats = self.routes.get(route)
+            if route_stats is None:
+                route_stats = self.routes[route] = {
+                    "count": 0, "queries": 0, "rows": 0, "sql_seconds": 0.0,
+                    "latencies": deque(maxlen=self.window_size),
+                }
+            route_stats["count"] += 1
+            route_stats["queries"] += stats.queries
+            route_stats["rows"] += stats.rows
+            route_stats["sql_seconds"] += stats.sql_seconds
+            route_stats["latencies"].append(seconds)
+
+    def snapshot(self, top=20):
+        """
+        Aggregated stats: per route request counts, latency percentiles and SQL
+        totals, the top statements by total time, and the recent slow queries.
+        """
+        import numpy as np
+
+        with self.lock:
+            routes = {
+                route: {**{k: v for k, v in stats.items() if k != "latencies"}, "latencies": np.array(stats["latencies"])}
+                for route, stats in self.routes.items()
+            }
+            statements = sorted(self.statements.items(), key=lambda item: item[1]["total_seconds"], reverse=True)[:top]
+            slow_queries = list(self.slow_queries)
+
+        for stats in routes.values():
+            latencies = stats.pop("latencies") * 1000
+            stats["queries_per_request"] = stats["queries"] / stats["count"]
+            stats["latency_ms"] = {
+                "p50": float(np.percentile(latencies, 50)),
+                "p95": float(np.percentile(latencies, 95)),
+                "max": float(latencies.max()),
+            }
+        return {
+            "routes": routes,
+            "statements": [{"statement": statement, **stats} for statement, stats in statements],
+            "slow_queries": slow_queries,
+        }
+
+metrics = QueryMetrics()
+
+def _explain(conn, statement, parameters):
+    """
+    EXPLAIN a statement on the connection it just ran on, inside a savepoint so
+    a failing EXPLAIN cannot abort the caller's transaction.
+    """
+    cursor = conn.connection.cursor()
+    try:
+        try:
+            cursor.execute("SAVEPOINT explain_slow_query")
+            savepoint = True
+        except Exception:
+            # Autocommit connection, there is no transaction a failing EXPLAIN could abort
+            savepoint = False
+        try:
+            cursor.execute("EXPLAIN " + statement, parameters)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+            if savepoint:
+                cursor.execute("RELEASE SAVEPOINT explain_slow_query")
+            return plan
+        except Exception as e:
+            if savepoint:
+                cursor.execute("ROLLBACK TO SAVEPOINT explain_slow_query")
+            return f"EXPLAIN failed: {e}"
+    finally:
+        cursor.close()
+
+def instrument_engine(engine, slow_query_ms: float):
+    """
+    Time every statement executed on an engine.
+
+    Each statement is added to the process-wide metrics and to the stats of the
+    request it runs in. Statements slower than slow_query_ms are logged together
+    with their EXPLAIN plan.
+
+    Args:
+        engine (Engine): Sync engine, or the sync_engine of an async engine
+        slow_query_ms (float): Threshold for the slow-query log, 0 disables it
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_started"].pop()
+        rows = max(cursor.rowcount, 0)
+
+        metrics.record_statement(statement, seconds, rows)
+        request_stats = current_request.get()
+        if request_stats is not None:
+            request_stats.record(seconds, rows)
+
+        if slow_query_ms and seconds * 1000 >= slow_query_ms:
+            explainable = (
+                not executemany
+                and statement.lstrip().lower().startswith(EXPLAINABLE)
+                and not (context and context.execution_options.get("stream_results"))
+            )
+            plan = _explain(conn, statement, parameters) if explainable else None
+            metrics.record_slow_query(statement, seconds, plan)
+            logger.warning(f"Slow query ({seconds * 1000:.0f}ms): {normalize_statement(statement)}\n{plan or ''}")
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+        if started:
+            started.pop()
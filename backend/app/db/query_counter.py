@@ -0,0 +1,39 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+class QueryCounter:
+    """
+    Counts the SQL statements executed on a set of engines, e.g. to check
+    that an endpoint stays within its query budget and has no N+1 pattern.
+    """
+
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+@contextmanager
+def count_queries(*engines):
+    """
+    Count the statements executed on the given engines within the block.
+
+    Args:
+        *engines: Sync engines, or the sync_engine of async engines
+
+    Yields:
+        QueryCounter: Counter collecting the executed statements
+    """
+    counter = QueryCounter()
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", counter._record)
+    try:
+        yield counter
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", counter._record)
@@ -0,0 +1,131 @@
+import itertools
+import logging
+import time
+from threading import Lock, Thread
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+KNOWLEDGE_QUERY = text("SELECT budget_id, entity_type, knowledge FROM server_knowledge")
+
+class ReadRouter:
+    """
+    Chooses the engine for read-only analytics requests.
+
+    Replicas serve reads only while they have caught up with the primary:
+    every lag_check_seconds the server knowledge per budget and entity type,
+    which the sync advances with every write, is read from the primary and
+    from each replica, and a replica missing any of the primary's knowledge is
+    skipped until it catches up. Without a fresh replica, and for requests that
+    need fresh data, reads go to the primary through the fallback engine, a
+    separate pool so analytics reads cannot exhaust the pool of short requests.
+
+    The check runs in a background thread, so requests never wait on a slow or
+    unreachable replica; they are routed by the last result until it finishes.
+    """
+
+    def __init__(self, primary, fallback, replicas, lag_check_seconds: float = 5.0):
+        """
+        Initialize the read router.
+
+        Args:
+            primary (Engine): Primary engine, the reference for replica lag
+            fallback (Engine): Engine for reads on the primary
+            replicas (list): Replica engines
+            lag_check_seconds (float): How long a lag check result is reused
+        """
+        self.primary = primary
+        self.fallback = fallback
+        self.replicas = replicas
+        self.lag_check_seconds = lag_check_seconds
+        self._lock = Lock()
+        self._checked_at = None
+        self._checking = False
+        self._behind = {}
+        self._fresh = []
+        self._next = itertools.count()
+
+    @staticmethod
+    def _knowledge(engine):
+        with engine.connect() as conn:
+            return {(budget_id, entity_type): knowledge for budget_id, entity_type, knowledge in conn.execute(KNOWLEDGE_QUERY)}
+
+    def check_lag(self):
+        """Refresh which replicas have caught up with the primary."""
+        try:
+            reference = self._knowledge(self.primary)
+        except Exception as e:
+            logger.error(f"Error checking replica lag: {str(e)}")
+            with self._lock:
+                self._checked_at = time.monotonic()
+                self._fresh = []
+            return
+
+        fresh = []
+        behind_by_replica = {}
+        for index, replica in enumerate(self.replicas):
+            previous = self._behind.get(index, 0)
+            try:
+                knowledge = self._knowledge(replica)
+                behind = sum(1 for key, value in reference.items() if knowledge.get(key, -1) < value)
+            except Exception as e:
+                if previous is not None:
+                    logger.warning(f"Replica {index} is unavailable, reading from the primary: {str(e)}")
+                behind = None
+
+            if behind == 0:
+                fresh.append((f"replica-{index}", replica))
+            if (behind == 0) != (previous == 0):
+                if behind == 0:
+                    logger.info(f"Replica {index} caught up with the primary, routing reads to it again")
+                elif behind is not None:
+                    logger.warning(f"Replica {index} lags behind the primary on {behind} entities, reading from the primary")
+            behind_by_replica[index] = behind
+        with self._lock:
+            self._checked_at = time.monotonic()
+            self._behind = behind_by_replica
+            self._fresh = fresh
+
+    def _check_lag_in_background(self):
+        try:
+            self.check_lag()
+        finally:
+            with self._lock:
+                self._checking = False
+
+    def read_engine(self, prefer_primary: bool = False):
+        """
+        Pick the engine for a read-only request, round-robin over fresh replicas.
+
+        Args:
+            prefer_primary (bool): The request needs the latest data
+
+        Returns:
+            tuple: (source name, Engine)
+        """
+        if self.replicas and not prefer_primary:
+            with self._lock:
+                now = time.monotonic()
+                due = self._checked_at is None or now - self._checked_at >= self.lag_check_seconds
+                if due and not self._checking:
+                    self._checked_at = now
+                    self._checking = True
+                    Thread(target=self._check_lag_in_background, name="replica-lag-check", daemon=True).start()
+                fresh = self._fresh
+            if fresh:
+                return fresh[next(self._next) % len(fresh)]
+        return "primary", self.fallback
+
+    def status(self):
+        """Replica hosts and how many entities each lagged behind at the last check (None if unreachable)."""
+        with self._lock:
+            return [
+                {
+                    "replica": f"replica-{index}",
+                    "host": replica.url.host,
+                    "behind": self._behind.get(index),
+                    "fresh": self._behind.get(index) == 0,
+                }
+                for index, replica in enumerate(self.replicas)
+            ]
@@ -1,18 +1,93 @@
+from threading import Lock
+
+from fastapi import Request
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 
 from app.core.config import settings
+from app.db.instrumentation import instrument_engine
+from app.db.routing import ReadRouter
+
+# Analytics reads get their own pools and a statement timeout, on the replicas
+# and on the primary when no replica is fresh, so they cannot starve short requests.
+# Replicas also get a connect timeout, so an unreachable one fails fast
+def create_analytics_engine(url, connect_timeout=None):
+    connect_args = {}
+    if connect_timeout:
+        connect_args["connect_timeout"] = connect_timeout
+    if settings.ANALYTICS_STATEMENT_TIMEOUT_MS:
+        connect_args["options"] = f"-c statement_timeout={settings.ANALYTICS_STATEMENT_TIMEOUT_MS}"
+    return create_engine(
+        url,
+        pool_pre_ping=True,
+        pool_size=settings.ANALYTICS_POOL_SIZE,
+        connect_args=connect_args,
+    )
+
+# Engines and pools are created on first use rather than at import, so a
+# cold container answers health checks without loading the database drivers:
+# the sync engines with their session factory and read router on the first
+# database request, the async engine only for the endpoints that need it
+def _create_engines():
+    engine = create_engine(
+        settings.DATABASE_URL,
+        pool_pre_ping=True,
+        pool_size=settings.POOL_SIZE,
+    )
+    analytics_engine = create_analytics_engine(settings.DATABASE_URL)
+    replica_engines = [
+        create_analytics_engine(url, settings.REPLICA_CONNECT_TIMEOUT_SECONDS) for url in settings.REPLICA_URLS
+    ]
+    # Time every statement for the per-request stats, /metrics and the slow-query log
+    for instrumented in [engine, analytics_engine, *replica_engines]:
+        instrument_engine(instrumented, settings.SLOW_QUERY_MS)
+    return {
+        "engine": engine,
+        "analytics_engine": analytics_engine,
+        "replica_engines": replica_engines,
+        "read_router": ReadRouter(engine, analytics_engine, replica_engines, settings.REPLICA_LAG_CHECK_SECONDS),
+        "SessionLocal": sessionmaker(autocommit=False, autoflush=False, bind=engine),
+    }
+
+# Async engine for endpoints that run independent queries concurrently
+def _create_async_engine():
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
-# Create SQLAlchemy engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-)
+    async_engine = create_async_engine(
+        settings.ASYNC_DATABASE_URL,
+        pool_pre_ping=True,
+    )
+    instrument_engine(async_engine.sync_engine, settings.SLOW_QUERY_MS)
+    return {
+        "async_engine": async_engine,
+        "AsyncSessionLocal": async_sessionmaker(async_engine, expire_on_commit=False),
+    }
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+_LAZY = {
+    **dict.fromkeys(["engine", "analytics_engine", "replica_engines", "read_router", "SessionLocal"], _create_engines),
+    **dict.fromkeys(["async_engine", "AsyncSessionLocal"], _create_async_engine),
+}
+_lazy_lock = Lock()
+
+def _created(name):
+    """Get a lazily created engine or session factory, creating its group on first use."""
+    namespace = globals()
+    if name not in namespace:
+        with _lazy_lock:
+            if name not in namespace:
+                namespace.update(_LAZY[name]())
+    return namespace[name]
+
+def __getattr__(name):
+    """
+    Module attributes engine, analytics_engine, replica_engines, read_router,
+    SessionLocal, async_engine and AsyncSessionLocal, created on first access
+    and plain module globals from then on.
+    """
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return _created(name)
 
 # Create base class for models
 Base = declarative_base()
@@ -21,7 +96,21 @@ def get_db():
     """
     Dependency for getting DB session.
     """
-    db = SessionLocal()
+    db = _created("SessionLocal")()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_read_db(request: Request):
+    """
+    Dependency for getting a DB session for read-only analytics requests.
+    Reads from a replica that has caught up with the primary, or from the
+    primary for requests sent with "X-Read-From: primary".
+    """
+    source, bind = _created("read_router").read_engine(prefer_primary=request.headers.get("X-Read-From") == "primary")
+    request.state.read_source = source
+    db = _created("SessionLocal")(bind=bind)
     try:
         yield db
     finally:
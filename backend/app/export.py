@@ -0,0 +1,63 @@
+"""
+Export synced budget tables as Parquet files or Arrow IPC streams.
+
+Usage:
+    poetry run python -m app.export --budget-id <id> [--table transactions] [--format parquet]
+        [--since 2024-01-01] [--until 2024-12-31] [--output-dir exports]
+"""
+import argparse
+import os
+import time
+from datetime import date
+
+from app.core.config import settings
+from app.db.session import read_router
+from app.services.export import EXPORT_TABLES, FORMATS, encode_batches, record_batches
+
+def export(budget_id, table, file_format, since_date, until_date, output_dir, batch_size):
+    """
+    Export one table of a budget to a file in output_dir.
+
+    Returns:
+        tuple: (path, rows, bytes written)
+    """
+    export_table = EXPORT_TABLES[table]
+    _, extension = FORMATS[file_format]
+    path = os.path.join(output_dir, f"{budget_id}-{table}.{extension}")
+
+    rows = 0
+    def counted(batches):
+        nonlocal rows
+        for batch in batches:
+            rows += batch.num_rows
+            yield batch
+
+    _, engine = read_router.read_engine()
+    with engine.connect() as conn, open(path, "wb") as file:
+        batches = record_batches(conn, export_table, budget_id, since_date, until_date, batch_size)
+        for data in encode_batches(counted(batches), export_table.schema, file_format):
+            file.write(data)
+        return path, rows, file.tell()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-id", required=True)
+    parser.add_argument("--table", choices=[*EXPORT_TABLES, "all"], default="all")
+    parser.add_argument("--format", choices=list(FORMATS), default="parquet")
+    parser.add_argument("--since", type=date.fromisoformat)
+    parser.add_argument("--until", type=date.fromisoformat)
+    parser.add_argument("--output-dir", default=".")
+    parser.add_argument("--batch-size", type=int, default=settings.EXPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for table in EXPORT_TABLES if args.table == "all" else [args.table]:
+        started = time.perf_counter()
+        path, rows, size = export(
+            args.budget_id, table, args.format, args.since, args.until, args.output_dir, args.batch_size
+        )
+        seconds = time.perf_counter() - started
+        print(f"{path}: {rows} rows, {size / 1e6:.1f} MB in {seconds:.1f}s ({rows / max(seconds, 1e-9):,.0f} rows/s)")
+
+if __name__ == "__main__":
+    main()
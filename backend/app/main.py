@@ -1,11 +1,19 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 import logging
 import os
+import time
 from dotenv import load_dotenv
 
 from app.core.config import settings
-from app.db.session import get_db
+from app.core.profiling import StackSampler, profiles
+from app.core.serialization import FastJSONResponse
+from app.core.single_flight import single_flight
+from app.core.warmup import warm_up
+from app.db.instrumentation import RequestStats, current_request, metrics
+from app.db import session as db_session
+from app.services.events import broadcaster
 from app.api.api_v1.api import api_router
 
 # Configure logging
@@ -33,9 +41,56 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def instrument_request(request: Request, call_next):
+    """
+    Collect the SQL statements of each request and report them in the
+    Server-Timing and X-Query-Count headers, and the database analytics reads
+    were served from in X-Read-Source. With PROFILING_ENABLED, a request
+    sent with "X-Profile: 1" is stack-sampled and the profile ID returned in
+    X-Profile-Id.
+    """
+    stats = RequestStats()
+    token = current_request.set(stats)
+    sampler = None
+    if settings.PROFILING_ENABLED and request.headers.get("X-Profile") == "1":
+        sampler = StackSampler(settings.PROFILE_INTERVAL_MS / 1000).__enter__()
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        seconds = time.perf_counter() - started
+        current_request.reset(token)
+        if sampler:
+            sampler.__exit__(None, None, None)
+
+    route = request.scope.get("route")
+    metrics.record_request(f"{request.method} {route.path if route else 'unmatched'}", seconds, stats)
+
+    response.headers["X-Query-Count"] = str(stats.queries)
+    if getattr(request.state, "read_source", None):
+        response.headers["X-Read-Source"] = request.state.read_source
+    response.headers["Server-Timing"] = (
+        f'db;desc="{stats.queries} queries";dur={stats.sql_seconds * 1000:.1f}, total;dur={seconds * 1000:.1f}'
+    )
+    if sampler:
+        response.headers["X-Profile-Id"] = profiles.add(sampler.collapsed())
+    return response
+
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
 
+@app.on_event("startup")
+async def start_warm_up():
+    """Open the first database connections and load the deferred modules in the background."""
+    if settings.WARMUP_ENABLED:
+        warm_up.start(settings.WARMUP_CONNECTIONS)
+
+@app.on_event("shutdown")
+async def stop_change_listener():
+    """Close the LISTEN connection of the change event stream."""
+    await broadcaster.stop()
+
 @app.get("/")
 async def root():
     """Root endpoint for health check"""
@@ -46,6 +101,30 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
 
+@app.get("/metrics", response_class=FastJSONResponse)
+def get_metrics(top: int = 20):
+    """
+    Aggregated request and SQL stats since startup: per-route latency
+    percentiles and queries per request, the statements with the highest total
+    time, the recent slow queries with their plans, how many requests
+    shared an in-flight computation, the lag state of the read replicas, and
+    how long each step of the startup warm-up took.
+    """
+    return FastJSONResponse({
+        **metrics.snapshot(top),
+        "single_flight": single_flight.stats(),
+        "replicas": db_session.read_router.status(),
+        "warm_up": warm_up.stats(),
+    })
+
+@app.get("/metrics/profiles/{profile_id}", response_class=PlainTextResponse)
+def get_profile(profile_id: str):
+    """Collapsed stacks of a profiled request, loadable in flame graph tools such as speedscope."""
+    profile = profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
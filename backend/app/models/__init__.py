@@ -1,2 +1,13 @@
 # Import models for easier access
-from app.models.budget import Budget
\ No newline at end of file
+from app.models.budget import Budget
+from app.models.account import Account
+from app.models.account_balance import AccountDailyBalance
+from app.models.category import CategoryGroup, Category
+from app.models.month import Month, CategoryMonth, MonthHistory, CategoryMonthHistory
+from app.models.transaction import Transaction, Subtransaction
+from app.models.payee import Payee
+from app.models.scheduled_transaction import ScheduledTransaction, ScheduledSubtransaction
+from app.models.server_knowledge import ServerKnowledge
+from app.models.embedding import Embedding
+from app.models.transaction_score import TransactionScore
+from app.models.transaction_match import TransactionMatch
\ No newline at end of file
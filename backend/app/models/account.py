@@ -0,0 +1,28 @@
+from sqlalchemy import Column, String, Integer, Boolean, ForeignKey
+from sqlalchemy.orm import relationship
+
+from app.db.session import Base
+
+class Account(Base):
+    """
+    Account model.
+    """
+    __tablename__ = "accounts"
+    
+    id = Column(String, primary_key=True, index=True)
+    budget_id = Column(String, ForeignKey("budgets.id"), nullable=False)
+    name = Column(String, nullable=False)
+    type = Column(String, nullable=False)
+    on_budget = Column(Boolean, nullable=False)
+    closed = Column(Boolean, nullable=False)
+    note = Column(String)
+    balance = Column(Integer, nullable=False)
+    cleared_balance = Column(Integer)
+    uncleared_balance = Column(Integer)
+    transfer_payee_id = Column(String)
+    deleted = Column(Boolean, default=False)
+    
+    budget = relationship("Budget", back_populates="accounts", lazy="raise")
+    
+    def __repr__(self):
+        return f"<Account {self.name}>"
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, Integer, ForeignKey
+
+from app.db.session import Base
+
+class AccountDailyBalance(Base):
+    """
+    Running account balance at the end of a day with activity,
+    maintained by the sync service's balance stage.
+    """
+    __tablename__ = "account_daily_balances"
+    
+    account_id = Column(String, primary_key=True)
+    date = Column(String, primary_key=True)
+    budget_id = Column(String, ForeignKey("budgets.id"), nullable=False)
+    activity = Column(Integer, nullable=False)
+    balance = Column(Integer, nullable=False)
+    
+    def __repr__(self):
+        return f"<AccountDailyBalance {self.account_id} {self.date} {self.balance}>"
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, DateTime, Boolean
-from sqlalchemy.sql import func
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.orm import relationship
 
 from app.db.session import Base
 
@@ -17,7 +17,10 @@ class Budget(Base):
     currency_format_iso_code = Column(String)
     date_format = Column(String)
     currency_format_symbol = Column(String)
-    deleted = Column(Boolean, default=False)
+    
+    accounts = relationship("Account", back_populates="budget", lazy="raise")
+    category_groups = relationship("CategoryGroup", back_populates="budget", lazy="raise")
+    payees = relationship("Payee", back_populates="budget", lazy="raise")
     
     def __repr__(self):
         return f"<Budget {self.name}>"
\ No newline at end of file
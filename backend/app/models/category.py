@@ -0,0 +1,51 @@
+from sqlalchemy import Column, String, Integer, Boolean, ForeignKey
+from sqlalchemy.orm import relationship
+
+from app.db.session import Base
+
+class CategoryGroup(Base):
+    """
+    Category group model.
+    """
+    __tablename__ = "category_groups"
+    
+    id = Column(String, primary_key=True, index=True)
+    budget_id = Column(String, ForeignKey("budgets.id"), nullable=False)
+    name = Column(String, nullable=False)
+    hidden = Column(Boolean, default=False)
+    deleted = Column(Boolean, default=False)
+    
+    budget = relationship("Budget", back_populates="category_groups", lazy="raise")
+    categories = relationship("Category", back_populates="group", lazy="raise", order_by="Category.name")
+    
+    def __repr__(self):
+        return f"<CategoryGroup {self.name}>"
+
+class Category(Base):
+    """
+    Category model. Budgeted, activity and balance are those of the current month.
+    """
+    __tablename__ = "categories"
+    
+    id = Column(String, primary_key=True, index=True)
+    category_group_id = Column(String, ForeignKey("category_groups.id"), nullable=False)
+    name = Column(String, nullable=False)
+    hidden = Column(Boolean, default=False)
+    budgeted = Column(Integer)
+    activity = Column(Integer)
+    balance = Column(Integer)
+    goal_type = Column(String)
+    goal_target = Column(Integer)
+    goal_target_month = Column(String)
+    goal_percentage_complete = Column(Integer)
+    goal_months_to_budget = Column(Integer)
+    goal_under_funded = Column(Integer)
+    goal_overall_funded = Column(Integer)
+    goal_overall_left = Column(Integer)
+    deleted = Column(Boolean, default=False)
+    
+    group = relationship("CategoryGroup", back_populates="categories", lazy="raise")
+    months = relationship("CategoryMonth", back_populates="category", lazy="raise", order_by="CategoryMonth.month")
+    
+    def __repr__(self):
+        return f"<Category {self.name}>"
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, String, Float, DateTime
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app.db.session import Base
+
+class Embedding(Base):
+    """
+    Embedding model, written by the sync service's embedding stage.
+    """
+    __tablename__ = "embeddings"
+    
+    budget_id = Column(String, primary_key=True)
+    source_type = Column(String, primary_key=True)
+    source_id = Column(String, primary_key=True)
+    content_hash = Column(String, nullable=False)
+    content = Column(String, nullable=False)
+    embedding = Column(ARRAY(Float), nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f"<Embedding {self.source_type} {self.source_id}>"
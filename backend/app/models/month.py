@@ -0,0 +1,79 @@
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+
+from app.db.session import Base
+
+class Month(Base):
+    """
+    Budget month model, month is the first day of the month (YYYY-MM-DD).
+    """
+    __tablename__ = "months"
+    
+    budget_id = Column(String, ForeignKey("budgets.id"), primary_key=True)
+    month = Column(String, primary_key=True)
+    to_be_budgeted = Column(Integer)
+    age_of_money = Column(Integer)
+    income = Column(Integer)
+    budgeted = Column(Integer)
+    activity = Column(Integer)
+    
+    def __repr__(self):
+        return f"<Month {self.budget_id} {self.month}>"
+
+class CategoryMonth(Base):
+    """
+    Category values for a single budget month.
+    """
+    __tablename__ = "category_months"
+    
+    budget_id = Column(String, ForeignKey("budgets.id"), primary_key=True)
+    month = Column(String, primary_key=True)
+    category_id = Column(String, ForeignKey("categories.id"), primary_key=True)
+    budgeted = Column(Integer)
+    activity = Column(Integer)
+    balance = Column(Integer)
+    
+    category = relationship("Category", back_populates="months", lazy="raise")
+    
+    def __repr__(self):
+        return f"<CategoryMonth {self.category_id} {self.month}>"
+
+class MonthHistory(Base):
+    """
+    Version of a budget month's values, valid from valid_from until valid_to
+    (NULL while current). Written by the sync when a month's values change.
+    """
+    __tablename__ = "month_history"
+    
+    budget_id = Column(String, ForeignKey("budgets.id"), primary_key=True)
+    month = Column(String, primary_key=True)
+    valid_from = Column(DateTime, primary_key=True)
+    valid_to = Column(DateTime)
+    knowledge = Column(Integer)
+    to_be_budgeted = Column(Integer)
+    age_of_money = Column(Integer)
+    income = Column(Integer)
+    budgeted = Column(Integer)
+    activity = Column(Integer)
+    
+    def __repr__(self):
+        return f"<MonthHistory {self.budget_id} {self.month} {self.valid_from}>"
+
+class CategoryMonthHistory(Base):
+    """
+    Version of a category's values for a budget month, as MonthHistory.
+    """
+    __tablename__ = "category_month_history"
+    
+    budget_id = Column(String, ForeignKey("budgets.id"), primary_key=True)
+    month = Column(String, primary_key=True)
+    category_id = Column(String, primary_key=True)
+    valid_from = Column(DateTime, primary_key=True)
+    valid_to = Column(DateTime)
+    knowledge = Column(Integer)
+    budgeted = Column(Integer)
+    activity = Column(Integer)
+    balance = Column(Integer)
+    
+    def __repr__(self):
+        return f"<CategoryMonthHistory {self.category_id} {self.month} {self.valid_from}>"
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, String, Boolean, ForeignKey
+from sqlalchemy.orm import relationship
+
+from app.db.session import Base
+
+class Payee(Base):
+    """
+    Payee model.
+    """
+    __tablename__ = "payees"
+    
+    id = Column(String, primary_key=True, index=True)
+    budget_id = Column(String, ForeignKey("budgets.id"), nullable=False)
+    name = Column(String, nullable=False)
+    transfer_account_id = Column(String)
+    deleted = Column(Boolean, default=False)
+    
+    budget = relationship("Budget", back_populates="payees", lazy="raise")
+    
+    def __repr__(self):
+        return f"<Payee {self.name}>"
@@ -0,0 +1,48 @@
+from sqlalchemy import Column, String, Integer, Boolean, ForeignKey
+from sqlalchemy.orm import relationship
+
+from app.db.session import Base
+
+class ScheduledTransaction(Base):
+    """
+    Scheduled transaction model. The date column holds the next occurrence.
+    """
+    __tablename__ = "scheduled_transactions"
+    
+    id = Column(String, primary_key=True, index=True)
+    budget_id = Column(String, ForeignKey("budgets.id"), nullable=False)
+    account_id = Column(String, ForeignKey("accounts.id"), nullable=False)
+    category_id = Column(String, ForeignKey("categories.id"))
+    payee_id = Column(String, ForeignKey("payees.id"))
+    date = Column(String)
+    date_first = Column(String)
+    amount = Column(Integer, nullable=False)
+    memo = Column(String)
+    frequency = Column(String, nullable=False)
+    flag_color = Column(String)
+    flag_name = Column(String)
+    deleted = Column(Boolean, default=False)
+    
+    subtransactions = relationship("ScheduledSubtransaction", back_populates="scheduled_transaction", lazy="raise")
+    
+    def __repr__(self):
+        return f"<ScheduledTransaction {self.id} {self.frequency} {self.amount}>"
+
+class ScheduledSubtransaction(Base):
+    """
+    Scheduled subtransaction model, one split of a scheduled transaction.
+    """
+    __tablename__ = "scheduled_subtransactions"
+    
+    id = Column(String, primary_key=True, index=True)
+    scheduled_transaction_id = Column(String, ForeignKey("scheduled_transactions.id"), nullable=False)
+    category_id = Column(String, ForeignKey("categories.id"))
+    amount = Column(Integer, nullable=False)
+    memo = Column(String)
+    payee_id = Column(String, ForeignKey("payees.id"))
+    deleted = Column(Boolean, default=False)
+    
+    scheduled_transaction = relationship("ScheduledTransaction", back_populates="subtransactions", lazy="raise")
+    
+    def __repr__(self):
+        return f"<ScheduledSubtransaction {self.id} {self.amount}>"
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, String, Integer, DateTime
+
+from app.db.session import Base
+
+class ServerKnowledge(Base):
+    """
+    Server knowledge per budget and entity type, advanced by the sync service
+    whenever it stored a delta. Useful as a version of the synced data.
+    """
+    __tablename__ = "server_knowledge"
+    
+    budget_id = Column(String, primary_key=True)
+    entity_type = Column(String, primary_key=True)
+    knowledge = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f"<ServerKnowledge {self.budget_id} {self.entity_type} {self.knowledge}>"
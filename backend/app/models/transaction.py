@@ -0,0 +1,57 @@
+from sqlalchemy import Column, String, Integer, Boolean, ForeignKey
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship
+
+from app.db.session import Base
+
+class Transaction(Base):
+    """
+    Transaction model.
+    """
+    __tablename__ = "transactions"
+    
+    id = Column(String, primary_key=True, index=True)
+    budget_id = Column(String, ForeignKey("budgets.id"), nullable=False)
+    account_id = Column(String, ForeignKey("accounts.id"), nullable=False)
+    category_id = Column(String, ForeignKey("categories.id"))
+    payee_id = Column(String, ForeignKey("payees.id"))
+    date = Column(String, nullable=False)
+    amount = Column(Integer, nullable=False)
+    memo = Column(String)
+    cleared = Column(String, nullable=False)
+    approved = Column(Boolean, nullable=False)
+    flag_color = Column(String)
+    flag_name = Column(String)
+    import_id = Column(String)
+    deleted = Column(Boolean, default=False)
+    server_knowledge = Column(Integer)
+    memo_tsv = Column(TSVECTOR)
+    
+    account = relationship("Account", lazy="raise")
+    category = relationship("Category", lazy="raise")
+    payee = relationship("Payee", lazy="raise")
+    subtransactions = relationship("Subtransaction", back_populates="transaction", lazy="raise")
+    
+    def __repr__(self):
+        return f"<Transaction {self.id} {self.date} {self.amount}>"
+
+class Subtransaction(Base):
+    """
+    Subtransaction model, one split of a transaction.
+    """
+    __tablename__ = "subtransactions"
+    
+    id = Column(String, primary_key=True, index=True)
+    transaction_id = Column(String, ForeignKey("transactions.id"), nullable=False)
+    category_id = Column(String, ForeignKey("categories.id"))
+    amount = Column(Integer, nullable=False)
+    memo = Column(String)
+    payee_id = Column(String, ForeignKey("payees.id"))
+    deleted = Column(Boolean, default=False)
+    
+    transaction = relationship("Transaction", back_populates="subtransactions", lazy="raise")
+    category = relationship("Category", lazy="raise")
+    payee = relationship("Payee", lazy="raise")
+    
+    def __repr__(self):
+        return f"<Subtransaction {self.id} {self.amount}>"
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, String, Integer, Float, ForeignKey
+
+from app.db.session import Base
+
+class TransactionMatch(Base):
+    """
+    Likely duplicate pair or unmatched transfer, written by the sync
+    service's match stage.
+    """
+    __tablename__ = "transaction_matches"
+    
+    id = Column(Integer, primary_key=True)
+    budget_id = Column(String, ForeignKey("budgets.id"), nullable=False)
+    kind = Column(String, nullable=False)
+    transaction_id = Column(String, nullable=False)
+    match_id = Column(String)
+    days_apart = Column(Integer)
+    score = Column(Float, nullable=False)
+    
+    def __repr__(self):
+        return f"<TransactionMatch {self.kind} {self.transaction_id} {self.match_id}>"
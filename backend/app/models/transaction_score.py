@@ -0,0 +1,24 @@
+from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey
+
+from app.db.session import Base
+
+class TransactionScore(Base):
+    """
+    Anomaly score of an outflow, written by the sync service's anomaly stage.
+    Flagged transactions have a comma-separated list of reasons.
+    """
+    __tablename__ = "transaction_scores"
+    
+    transaction_id = Column(String, primary_key=True)
+    budget_id = Column(String, ForeignKey("budgets.id"), nullable=False)
+    date = Column(String, nullable=False)
+    amount = Column(Integer, nullable=False)
+    payee_id = Column(String)
+    category_id = Column(String)
+    score = Column(Float, nullable=False)
+    expected_amount = Column(Integer)
+    reasons = Column(String)
+    scored_at = Column(DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f"<TransactionScore {self.transaction_id} {self.reasons}>"
@@ -1,2 +1,8 @@
 # Import schemas for easier access
-from app.schemas.budget import Budget, BudgetBase, BudgetResponse, BudgetList
\ No newline at end of file
+from app.schemas.budget import Budget, BudgetBase, BudgetResponse, BudgetList
+from app.schemas.account import Account, AccountBase, AccountList, BalancePoint, AccountBalanceSeries, NetWorthSeries
+from app.schemas.category import Category, CategoryBase, CategoryGroup, CategoryGroupList, CategoryMonth, CategoryMonthList
+from app.schemas.forecast import AccountForecast, CategoryForecast, CashFlowForecast
+from app.schemas.overview import AccountSummary, CategorySummary, CategoryGroupSummary, MonthSummary, RecentTransaction, BudgetOverview
+from app.schemas.payee import Payee, PayeeList
+from app.schemas.transaction import Transaction, TransactionBase, TransactionDetail, TransactionDetailResponse, Subtransaction, TransactionList, TransactionSearchResult, TransactionSearchResponse
\ No newline at end of file
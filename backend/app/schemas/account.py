@@ -0,0 +1,55 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+class AccountBase(BaseModel):
+    """
+    Base schema for account data.
+    """
+    name: str
+    type: str
+    on_budget: bool
+    closed: bool
+    note: Optional[str] = None
+    balance: int
+    cleared_balance: Optional[int] = None
+    uncleared_balance: Optional[int] = None
+    transfer_payee_id: Optional[str] = None
+
+class Account(AccountBase):
+    """
+    Schema for account data with ID.
+    """
+    id: str
+    
+    class Config:
+        from_attributes = True
+
+class AccountList(BaseModel):
+    """
+    Schema for list of accounts response.
+    """
+    accounts: List[Account]
+
+class BalancePoint(BaseModel):
+    """
+    Schema for a balance at the end of a day.
+    """
+    date: str
+    balance: int
+
+class AccountBalanceSeries(BaseModel):
+    """
+    Schema for an account balance series. Points are only included for days
+    with activity; the balance holds until the next point.
+    """
+    account_id: str
+    opening_balance: int
+    points: List[BalancePoint]
+
+class NetWorthSeries(BaseModel):
+    """
+    Schema for a net-worth series across all accounts of a budget.
+    """
+    budget_id: str
+    opening_balance: int
+    points: List[BalancePoint]
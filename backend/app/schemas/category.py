@@ -0,0 +1,64 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+class CategoryMonth(BaseModel):
+    """
+    Schema for category values of a single month.
+    """
+    month: str
+    budgeted: Optional[int] = None
+    activity: Optional[int] = None
+    balance: Optional[int] = None
+    
+    class Config:
+        from_attributes = True
+
+class CategoryBase(BaseModel):
+    """
+    Base schema for category data.
+    """
+    name: str
+    hidden: Optional[bool] = None
+    budgeted: Optional[int] = None
+    activity: Optional[int] = None
+    balance: Optional[int] = None
+    goal_type: Optional[str] = None
+    goal_target: Optional[int] = None
+    goal_target_month: Optional[str] = None
+    goal_percentage_complete: Optional[int] = None
+
+class Category(CategoryBase):
+    """
+    Schema for category data with ID and the values of the requested month.
+    """
+    id: str
+    category_group_id: str
+    months: List[CategoryMonth] = []
+    
+    class Config:
+        from_attributes = True
+
+class CategoryGroup(BaseModel):
+    """
+    Schema for a category group with its categories.
+    """
+    id: str
+    name: str
+    hidden: Optional[bool] = None
+    categories: List[Category]
+    
+    class Config:
+        from_attributes = True
+
+class CategoryGroupList(BaseModel):
+    """
+    Schema for list of category groups response.
+    """
+    category_groups: List[CategoryGroup]
+
+class CategoryMonthList(BaseModel):
+    """
+    Schema for the month history of a category.
+    """
+    category_id: str
+    months: List[CategoryMonth]
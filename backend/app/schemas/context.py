@@ -0,0 +1,31 @@
+from typing import List
+from pydantic import BaseModel, Field
+
+class BudgetContext(BaseModel):
+    """
+    Schema for the budget context assembled for a question.
+    """
+    budget_id: str
+    context: str
+    tokens: int
+    max_tokens: int
+    pieces: List[str]
+    candidates: int
+    summary_ms: float
+    assembly_ms: float
+
+class BudgetQuestion(BaseModel):
+    """
+    Schema for a question about a budget.
+    """
+    question: str = Field(..., min_length=1, max_length=2000)
+    max_tokens: int = Field(2000, ge=100, le=100000)
+
+class BudgetAnswer(BaseModel):
+    """
+    Schema for the answer to a question about a budget.
+    """
+    answer: str
+    model: str
+    context: BudgetContext
+    llm_ms: float
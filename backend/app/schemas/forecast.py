@@ -0,0 +1,28 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+class AccountForecast(BaseModel):
+    """
+    Schema for the projected daily cash flow and balance of an account.
+    """
+    account_id: str
+    flows: List[int]
+    projected_balance: List[int]
+
+class CategoryForecast(BaseModel):
+    """
+    Schema for the projected daily cash flow of a category.
+    """
+    category_id: str
+    flows: List[int]
+
+class CashFlowForecast(BaseModel):
+    """
+    Schema for a cash-flow forecast. All flow lists are aligned with dates.
+    """
+    budget_id: str
+    server_knowledge: Optional[int] = None
+    dates: List[str]
+    accounts: List[AccountForecast]
+    categories: List[CategoryForecast]
+    total: List[int]
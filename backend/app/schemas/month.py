@@ -0,0 +1,30 @@
+from typing import List, Optional
+from datetime import datetime
+from pydantic import BaseModel
+
+class CategoryMonthVersion(BaseModel):
+    """
+    Schema for a category's values of a month, as valid at a point in time.
+    """
+    category_id: str
+    budgeted: Optional[int] = None
+    activity: Optional[int] = None
+    balance: Optional[int] = None
+    valid_from: datetime
+    valid_to: Optional[datetime] = None
+
+class MonthSnapshot(BaseModel):
+    """
+    Schema for a budget month and its categories as they were at a point in time.
+    """
+    budget_id: str
+    month: str
+    as_of: Optional[datetime] = None
+    to_be_budgeted: Optional[int] = None
+    age_of_money: Optional[int] = None
+    income: Optional[int] = None
+    budgeted: Optional[int] = None
+    activity: Optional[int] = None
+    valid_from: datetime
+    valid_to: Optional[datetime] = None
+    categories: List[CategoryMonthVersion]
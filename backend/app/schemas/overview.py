@@ -0,0 +1,74 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+from app.schemas.budget import Budget
+
+class AccountSummary(BaseModel):
+    """
+    Schema for an account on the budget overview.
+    """
+    id: str
+    name: str
+    type: str
+    on_budget: bool
+    closed: bool
+    balance: int
+    cleared_balance: Optional[int] = None
+    uncleared_balance: Optional[int] = None
+
+class CategorySummary(BaseModel):
+    """
+    Schema for a category with its values for the overview month.
+    """
+    id: str
+    name: str
+    hidden: Optional[bool] = None
+    budgeted: Optional[int] = None
+    activity: Optional[int] = None
+    balance: Optional[int] = None
+
+class CategoryGroupSummary(BaseModel):
+    """
+    Schema for a category group with its categories.
+    """
+    id: str
+    name: str
+    hidden: Optional[bool] = None
+    categories: List[CategorySummary]
+
+class MonthSummary(BaseModel):
+    """
+    Schema for the budget month summary.
+    """
+    month: str
+    to_be_budgeted: Optional[int] = None
+    age_of_money: Optional[int] = None
+    income: Optional[int] = None
+    budgeted: Optional[int] = None
+    activity: Optional[int] = None
+
+class RecentTransaction(BaseModel):
+    """
+    Schema for a recent transaction with payee and category names.
+    """
+    id: str
+    date: str
+    amount: int
+    memo: Optional[str] = None
+    account_id: str
+    category_id: Optional[str] = None
+    cleared: str
+    payee_name: Optional[str] = None
+    category_name: Optional[str] = None
+
+class BudgetOverview(BaseModel):
+    """
+    Schema for the budget overview response. The version changes whenever
+    a sync stored new data for the budget and is also sent as the ETag.
+    """
+    version: str
+    budget: Budget
+    accounts: List[AccountSummary]
+    category_groups: List[CategoryGroupSummary]
+    month: Optional[MonthSummary] = None
+    recent_transactions: List[RecentTransaction]
@@ -0,0 +1,19 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+class Payee(BaseModel):
+    """
+    Schema for payee data.
+    """
+    id: str
+    name: str
+    transfer_account_id: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+class PayeeList(BaseModel):
+    """
+    Schema for list of payees response.
+    """
+    payees: List[Payee]
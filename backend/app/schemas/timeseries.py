@@ -0,0 +1,22 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+class SeriesPoints(BaseModel):
+    """
+    Schema for one downsampled daily series. Values are aligned with dates.
+    """
+    name: str
+    total_points: int
+    dates: List[str]
+    values: List[int]
+
+class TimeSeries(BaseModel):
+    """
+    Schema for chart-ready time series of a budget or account.
+    """
+    budget_id: str
+    account_id: Optional[str] = None
+    server_knowledge: Optional[int] = None
+    method: str
+    points: int
+    series: List[SeriesPoints]
@@ -0,0 +1,126 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+from app.schemas.payee import Payee
+
+class TransactionBase(BaseModel):
+    """
+    Base schema for transaction data.
+    """
+    date: str
+    amount: int
+    memo: Optional[str] = None
+    account_id: str
+    category_id: Optional[str] = None
+    payee_id: Optional[str] = None
+    cleared: str
+    approved: bool
+    flag_color: Optional[str] = None
+    import_id: Optional[str] = None
+
+class Transaction(TransactionBase):
+    """
+    Schema for transaction data with ID.
+    """
+    id: str
+    
+    class Config:
+        from_attributes = True
+
+class TransactionWithNames(Transaction):
+    """
+    Schema for transaction data with the names of its account, payee,
+    category and category group.
+    """
+    account_name: Optional[str] = None
+    payee_name: Optional[str] = None
+    category_name: Optional[str] = None
+    category_group_name: Optional[str] = None
+
+class Subtransaction(BaseModel):
+    """
+    Schema for a split of a transaction.
+    """
+    id: str
+    amount: int
+    memo: Optional[str] = None
+    category_id: Optional[str] = None
+    payee_id: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+class CategoryName(BaseModel):
+    """
+    Schema for the category reference of a transaction.
+    """
+    id: str
+    name: str
+    
+    class Config:
+        from_attributes = True
+
+class TransactionDetail(Transaction):
+    """
+    Schema for a transaction with its payee, category and splits.
+    """
+    payee: Optional[Payee] = None
+    category: Optional[CategoryName] = None
+    subtransactions: List[Subtransaction]
+
+class TransactionDetailResponse(BaseModel):
+    """
+    Schema for single transaction response.
+    """
+    transaction: TransactionDetail
+
+class TransactionList(BaseModel):
+    """
+    Schema for list of transactions response.
+    """
+    transactions: List[TransactionWithNames]
+
+class TransactionSearchResult(Transaction):
+    """
+    Schema for a ranked transaction search result.
+    """
+    payee_name: Optional[str] = None
+    score: float
+
+class TransactionSearchResponse(BaseModel):
+    """
+    Schema for transaction search response.
+    """
+    query: str
+    results: List[TransactionSearchResult]
+
+class TransactionAnomaly(TransactionWithNames):
+    """
+    Schema for a transaction flagged by the anomaly stage.
+    """
+    score: float
+    expected_amount: Optional[int] = None
+    reasons: List[str]
+
+class TransactionAnomalyList(BaseModel):
+    """
+    Schema for flagged transactions response.
+    """
+    anomalies: List[TransactionAnomaly]
+
+class TransactionMatch(BaseModel):
+    """
+    Schema for a likely duplicate pair, or a transfer whose other side is
+    missing with a candidate for it (if any) as the match.
+    """
+    kind: str
+    score: float
+    days_apart: Optional[int] = None
+    transaction: TransactionWithNames
+    match: Optional[TransactionWithNames] = None
+
+class TransactionMatchList(BaseModel):
+    """
+    Schema for transaction matches response.
+    """
+    matches: List[TransactionMatch]
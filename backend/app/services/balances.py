@@ -0,0 +1,98 @@
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.account import Account
+from app.models.account_balance import AccountDailyBalance
+
+def _in_range(query, start_date: Optional[date], end_date: Optional[date]):
+    """Restrict a daily balance query to a date range. Dates are stored as ISO strings."""
+    if start_date:
+        query = query.where(AccountDailyBalance.date >= start_date.isoformat())
+    if end_date:
+        query = query.where(AccountDailyBalance.date <= end_date.isoformat())
+    return query
+
+def account_balance_series(db: Session, account_id: str, start_date: Optional[date] = None, end_date: Optional[date] = None):
+    """
+    Balance of an account over time, read from the precomputed daily balances.
+
+    Args:
+        db (Session): Database session
+        account_id (str): The account ID
+        start_date (date, optional): First day of the series
+        end_date (date, optional): Last day of the series
+
+    Returns:
+        tuple: (balance before start_date, list of (date, balance) for days with activity)
+    """
+    opening = 0
+    if start_date:
+        opening = db.execute(
+            select(AccountDailyBalance.balance)
+            .where(AccountDailyBalance.account_id == account_id, AccountDailyBalance.date < start_date.isoformat())
+            .order_by(AccountDailyBalance.date.desc())
+            .limit(1)
+        ).scalar() or 0
+
+    points = db.execute(
+        _in_range(
+            select(AccountDailyBalance.date, AccountDailyBalance.balance)
+            .where(AccountDailyBalance.account_id == account_id),
+            start_date,
+            end_date
+        ).order_by(AccountDailyBalance.date)
+    ).all()
+    return opening, points
+
+def net_worth_series(db: Session, budget_id: str, start_date: Optional[date] = None, end_date: Optional[date] = None):
+    """
+    Net worth of a budget over time: the sum of all open and closed account balances.
+
+    Each account's balance is the stored balance of its last day before the
+    range plus its daily activity, so the series is a running sum of the
+    activity of all accounts per day, started from their combined opening balance.
+
+    Args:
+        db (Session): Database session
+        budget_id (str): The budget ID
+        start_date (date, optional): First day of the series
+        end_date (date, optional): Last day of the series
+
+    Returns:
+        tuple: (net worth before start_date, list of (date, net worth) for days with activity)
+    """
+    accounts = select(Account.id).where(Account.budget_id == budget_id, Account.deleted == False)
+
+    opening = 0
+    if start_date:
+        last_before_start = (
+            select(AccountDailyBalance.balance)
+            .where(
+                AccountDailyBalance.budget_id == budget_id,
+                AccountDailyBalance.account_id.in_(accounts),
+                AccountDailyBalance.date < start_date.isoformat()
+            )
+            .distinct(AccountDailyBalance.account_id)
+            .order_by(AccountDailyBalance.account_id, AccountDailyBalance.date.desc())
+            .subquery()
+        )
+        opening = db.execute(select(func.coalesce(func.sum(last_before_start.c.balance), 0))).scalar()
+
+    daily_activity = func.sum(AccountDailyBalance.activity)
+    points = db.execute(
+        _in_range(
+            select(
+                AccountDailyBalance.date,
+                (opening + func.sum(daily_activity).over(order_by=AccountDailyBalance.date)).label("balance")
+            ).where(
+                AccountDailyBalance.budget_id == budget_id,
+                AccountDailyBalance.account_id.in_(accounts)
+            ),
+            start_date,
+            end_date
+        ).group_by(AccountDailyBalance.date).order_by(AccountDailyBalance.date)
+    ).all()
+    return opening, points
@@ -0,0 +1,408 @@
+import calendar
+import math
+import re
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from sqlalchemy import case, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.single_flight import single_flight
+from app.models.budget import Budget
+from app.models.category import Category, CategoryGroup
+from app.models.month import CategoryMonth, Month
+from app.models.payee import Payee
+from app.models.server_knowledge import ServerKnowledge
+from app.models.transaction import Transaction
+from app.services.search import search_transactions
+
+# Rough BPE segmentation: runs of letters, digits in groups of three, single symbols
+TOKEN_PIECES = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+TERM_PATTERN = re.compile(r"[a-z0-9]+(?:-[0-9]+)?")
+MONTH_NAMES = {name.lower(): number for number, name in enumerate(calendar.month_name) if name}
+MONTH_NAMES.update({name.lower(): number for number, name in enumerate(calendar.month_abbr) if name})
+
+# Question words too common to search transactions for
+STOPWORDS = frozenset(
+    "a about all am an and any are as at be been by can could did do does for from had has have how i if in is it "
+    "its last me much my of on or our over spend spent spending than that the this to total was we were what when "
+    "where which who why will with year month months you your".split()
+)
+
+# Entities whose server knowledge invalidates cached summaries
+CONTEXT_ENTITIES = ["months", "categories", "payees", "transactions"]
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate the number of LLM tokens in a text without a tokenizer: one
+    token per word, number group of up to three digits or symbol, plus one
+    for every further six letters of a long word. Close enough to budget a
+    prompt, and orders of magnitude faster than real tokenization.
+    """
+    return sum(1 + (len(piece) - 1) // 6 for piece in TOKEN_PIECES.findall(text))
+
+def question_terms(text: str):
+    """Search terms of a question, with month names also as month numbers ("march" -> "03")."""
+    terms = set(TERM_PATTERN.findall(text.lower()))
+    terms.update(f"{MONTH_NAMES[term]:02d}" for term in list(terms) if term in MONTH_NAMES)
+    return terms
+
+def format_amount(milliunits) -> str:
+    """Format a YNAB milliunit amount as a decimal string."""
+    if milliunits is None:
+        return "n/a"
+    return f"{milliunits / 1000:,.2f}"
+
+def make_piece(piece_id: str, kind: str, text: str, extra_terms=(), order=0):
+    """
+    A context piece: a self-contained summary with its token count and search
+    terms computed once, so packing at query time only adds up numbers.
+    """
+    return {
+        "id": piece_id,
+        "kind": kind,
+        "text": text,
+        "tokens": estimate_tokens(text) + 1,
+        "terms": frozenset(question_terms(text)) | frozenset(extra_terms),
+        "order": order,
+    }
+
+def search_keywords(question: str, limit: int = 3):
+    """The longest non-stopword, non-date words of a question, to search transactions for."""
+    words = {
+        term for term in TERM_PATTERN.findall(question.lower())
+        if term not in STOPWORDS and term not in MONTH_NAMES and not term[0].isdigit()
+    }
+    return sorted(words, key=lambda term: (-len(term), term))[:limit]
+
+class BudgetContext:
+    """Cached summaries of a budget at a given server knowledge."""
+
+    def __init__(self, knowledge):
+        self.knowledge = knowledge
+        self.month_activity = {}
+        self.pieces = []
+        self.document_frequency = {}
+
+    def index(self, pieces):
+        self.pieces = pieces
+        frequency = {}
+        for piece in pieces:
+            for term in piece["terms"]:
+                frequency[term] = frequency.get(term, 0) + 1
+        self.document_frequency = frequency
+
+    def weight(self, term):
+        """Inverse document frequency of a term among the summaries."""
+        return math.log(1 + len(self.pieces) / (1 + self.document_frequency.get(term, 0)))
+
+class ContextService:
+    """
+    Assembles the budget context of an LLM question within a token budget.
+
+    Month, category and budget summaries are precomputed and cached per
+    budget and server knowledge of months, categories, payees and
+    transactions. When only transactions changed, the transaction totals of
+    the months the sync touched are recomputed and the rest are reused; a
+    payee change, or a transaction moved out of an untouched month, rebuilds
+    them all. A question then only scores the cached summaries against its
+    terms and packs the best ones into the budget, so assembling context
+    takes milliseconds.
+    """
+
+    def __init__(self, max_entries: int = 32, top_payees: int = 5, top_categories: int = 5):
+        """
+        Initialize the context service.
+
+        Args:
+            max_entries (int): Maximum number of cached budgets
+            top_payees (int): Payees named per month summary
+            top_categories (int): Spending categories named per month summary
+        """
+        self.max_entries = max_entries
+        self.top_payees = top_payees
+        self.top_categories = top_categories
+        self._cache = OrderedDict()
+        self._lock = Lock()
+
+    def _knowledge(self, db: Session, budget_id: str):
+        rows = db.execute(
+            select(ServerKnowledge.entity_type, ServerKnowledge.knowledge)
+            .where(ServerKnowledge.budget_id == budget_id, ServerKnowledge.entity_type.in_(CONTEXT_ENTITIES))
+        ).all()
+        return tuple(dict(rows).get(entity) for entity in CONTEXT_ENTITIES)
+
+    def summaries(self, db: Session, budget_id: str) -> BudgetContext:
+        """
+        Get the cached summaries of a budget, rebuilding them if a sync changed their inputs.
+
+        Args:
+            db (Session): Database session
+            budget_id (str): The budget ID
+
+        Returns:
+            BudgetContext: Summaries at the budget's current server knowledge
+        """
+        knowledge = self._knowledge(db, budget_id)
+        with self._lock:
+            cached = self._cache.get(budget_id)
+            if cached is not None and cached.knowledge == knowledge:
+                self._cache.move_to_end(budget_id)
+                return cached
+
+        # Concurrent misses, e.g. several questions right after a sync, build once
+        return single_flight.do(
+            ("context", budget_id, knowledge),
+            lambda: self._build(db, budget_id, knowledge, cached)
+        )
+
+    def _changed_months(self, db: Session, budget_id: str, since_knowledge):
+        """Months (YYYY-MM) with transactions written after the given server knowledge."""
+        month = func.left(Transaction.date, 7)
+        return {
+            value for (value,) in db.execute(
+                select(month).distinct()
+                .where(Transaction.budget_id == budget_id, Transaction.server_knowledge > since_knowledge)
+            )
+        }
+
+    def _month_activity(self, db: Session, budget_id: str, months=None):
+        """
+        Transaction totals and top payees per month, for all months or the given ones.
+
+        Returns:
+            dict: {YYYY-MM: {"count", "outflow", "inflow", "payees": [(name, outflow)]}}
+        """
+        month = func.left(Transaction.date, 7).label("month")
+        query = (
+            select(
+                month,
+                Payee.name,
+                func.count(),
+                func.sum(case((Transaction.amount < 0, Transaction.amount), else_=0)),
+                func.sum(case((Transaction.amount > 0, Transaction.amount), else_=0))
+            )
+            .outerjoin(Payee, Payee.id == Transaction.payee_id)
+            .where(Transaction.budget_id == budget_id, Transaction.deleted == False)
+            .group_by(month, Payee.name)
+        )
+        if months is not None:
+            # Date ranges rather than left(date, 7), so the budget/date index is used
+            query = query.where(or_(False, *[
+                Transaction.date.between(f"{month}-01", f"{month}-31") for month in sorted(months)
+            ]))
+
+        activity = {value: {"count": 0, "outflow": 0, "inflow": 0, "payees": []} for value in months or ()}
+        for value, payee_name, count, outflow, inflow in db.execute(query):
+            totals = activity.setdefault(value, {"count": 0, "outflow": 0, "inflow": 0, "payees": []})
+            totals["count"] += count
+            totals["outflow"] += outflow
+            totals["inflow"] += inflow
+            if outflow and payee_name:
+                totals["payees"].append((payee_name, outflow))
+        for totals in activity.values():
+            totals["payees"] = sorted(totals["payees"], key=lambda item: item[1])[:self.top_payees]
+        return activity
+
+    def _incremental_activity(self, db: Session, budget_id: str, knowledge, previous):
+        """
+        Month totals updated from the previous build for the months the
+        transactions delta touched, or None when they must be rebuilt in full:
+        on the first build, after a payee change (the totals name payees), and
+        when a transaction moved out of a month the delta did not touch.
+        """
+        transactions = CONTEXT_ENTITIES.index("transactions")
+        payees = CONTEXT_ENTITIES.index("payees")
+        if previous is None or previous.knowledge[transactions] is None or knowledge[transactions] is None:
+            return None
+        if previous.knowledge[payees] != knowledge[payees]:
+            return None
+
+        # Delta rows are in their new months, so those are recomputed
+        changed = self._changed_months(db, budget_id, previous.knowledge[transactions])
+        activity = {month: totals for month, totals in previous.month_activity.items() if month not in changed}
+        activity.update(self._month_activity(db, budget_id, changed))
+
+        # A row edited out of an untouched month still counts there, so the
+        # months then add up to more transactions than the budget has
+        live = db.execute(
+            select(func.count()).where(Transaction.budget_id == budget_id, Transaction.deleted == False)
+        ).scalar()
+        if sum(totals["count"] for totals in activity.values()) != live:
+            return None
+        return activity
+
+    def _build(self, db: Session, budget_id: str, knowledge, previous):
+        """Build the summaries of a budget, reusing the month totals of unchanged months."""
+        context = BudgetContext(knowledge)
+        context.month_activity = self._incremental_activity(db, budget_id, knowledge, previous)
+        if context.month_activity is None:
+            context.month_activity = self._month_activity(db, budget_id)
+
+        budget = db.execute(select(Budget.name, Budget.currency_format_iso_code).where(Budget.id == budget_id)).first()
+        categories = db.execute(
+            select(Category, CategoryGroup.name)
+            .join(CategoryGroup, CategoryGroup.id == Category.category_group_id)
+            .where(CategoryGroup.budget_id == budget_id, Category.deleted == False, CategoryGroup.deleted == False)
+            .order_by(CategoryGroup.name, Category.name)
+        ).all()
+        category_names = {category.id: category.name for category, _ in categories}
+        category_months = db.execute(
+            select(CategoryMonth.month, CategoryMonth.category_id, CategoryMonth.budgeted, CategoryMonth.activity)
+            .where(CategoryMonth.budget_id == budget_id)
+            .order_by(CategoryMonth.month)
+        ).all()
+        months = db.execute(select(Month).where(Month.budget_id == budget_id).order_by(Month.month)).scalars().all()
+
+        pieces = []
+        currency = budget.currency_format_iso_code if budget and budget.currency_format_iso_code else ""
+        if budget:
+            latest = months[-1] if months else None
+            text = (
+                f"Budget {budget.name} ({currency or 'no currency'}), amounts in currency units. "
+                f"{len(months)} months from {months[0].month[:7] if months else 'n/a'} "
+                f"to {latest.month[:7] if latest else 'n/a'}, {len(categories)} categories."
+            )
+            if latest is not None:
+                text += f" To be budgeted in {latest.month[:7]}: {format_amount(latest.to_be_budgeted)}."
+            pieces.append(make_piece("budget", "budget", text))
+
+        spending = {}
+        history = {}
+        for month, category_id, budgeted, activity in category_months:
+            if category_id in category_names and activity and activity < 0:
+                spending.setdefault(month, []).append((category_names[category_id], activity))
+            history.setdefault(category_id, []).append((month, budgeted, activity))
+
+        for order, month in enumerate(months):
+            key = month.month[:7]
+            text = (
+                f"Month {key}: income {format_amount(month.income)}, budgeted {format_amount(month.budgeted)}, "
+                f"activity {format_amount(month.activity)}, to be budgeted {format_amount(month.to_be_budgeted)}, "
+                f"age of money {month.age_of_money if month.age_of_money is not None else 'n/a'} days."
+            )
+            top = sorted(spending.get(month.month, []), key=lambda item: item[1])[:self.top_categories]
+            if top:
+                text += " Top spending: " + ", ".join(f"{name} {format_amount(amount)}" for name, amount in top) + "."
+            totals = context.month_activity.get(key)
+            if totals:
+                text += (
+                    f" {totals['count']} transactions, outflow {format_amount(totals['outflow'])}, "
+                    f"inflow {format_amount(totals['inflow'])}."
+                )
+                if totals["payees"]:
+                    text += " Top payees: " + ", ".join(
+                        f"{name} {format_amount(amount)}" for name, amount in totals["payees"]
+                    ) + "."
+            year, number = key.split("-")
+            pieces.append(make_piece(
+                f"month:{key}", "month", text,
+                extra_terms=(calendar.month_name[int(number)].lower(), year, number),
+                order=order
+            ))
+
+        for category, group_name in categories:
+            recent = history.get(category.id, [])[-12:]
+            text = (
+                f"Category {category.name} (group {group_name}): balance {format_amount(category.balance)}, "
+                f"budgeted this month {format_amount(category.budgeted)}, activity {format_amount(category.activity)}."
+            )
+            if recent:
+                average_activity = sum(activity or 0 for _, _, activity in recent) / len(recent)
+                average_budgeted = sum(budgeted or 0 for _, budgeted, _ in recent) / len(recent)
+                text += (
+                    f" Last {len(recent)} months: average activity {format_amount(average_activity)}, "
+                    f"average budgeted {format_amount(average_budgeted)}."
+                )
+            if category.goal_type:
+                text += (
+                    f" Goal {category.goal_type} of {format_amount(category.goal_target)}"
+                    f"{' by ' + category.goal_target_month[:7] if category.goal_target_month else ''}, "
+                    f"{category.goal_percentage_complete or 0}% complete."
+                )
+            pieces.append(make_piece(f"category:{category.id}", "category", text))
+
+        context.index(pieces)
+        with self._lock:
+            self._cache[budget_id] = context
+            self._cache.move_to_end(budget_id)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return context
+
+    def assemble(self, db: Session, budget_id: str, question: str, max_tokens: int = 2000, transactions: int = 20):
+        """
+        Pack the summaries and transactions most relevant to a question into a
+        token budget.
+
+        The budget summary always comes first. The other pieces are ranked by
+        the inverse document frequency of the question terms they contain, with
+        recent months ahead of older ones when nothing matches, and are added
+        greedily while they fit. Transactions come from the indexed transaction
+        search on the question's keywords.
+
+        Args:
+            db (Session): Database session
+            budget_id (str): The budget ID
+            question (str): The user's question
+            max_tokens (int): Token budget of the context
+            transactions (int): Maximum number of matching transactions considered
+
+        Returns:
+            dict: The context text, its estimated tokens, the IDs of the included
+                pieces and the time spent
+        """
+        started = time.perf_counter()
+        context = self.summaries(db, budget_id)
+        summarized = time.perf_counter()
+
+        candidates = list(context.pieces)
+        keywords = search_keywords(question) if transactions else []
+        found = set()
+        for keyword in keywords:
+            # One search per keyword: the search ANDs its words, and a question's words rarely all appear in a memo
+            for transaction, payee_name, _ in search_transactions(
+                db, budget_id, keyword, limit=max(1, transactions // len(keywords))
+            ):
+                if transaction.id in found:
+                    continue
+                found.add(transaction.id)
+                text = (
+                    f"Transaction {transaction.date}: {payee_name or 'unknown payee'} "
+                    f"{format_amount(transaction.amount)}{', memo ' + transaction.memo if transaction.memo else ''}."
+                )
+                candidates.append(make_piece(f"transaction:{transaction.id}", "transaction", text))
+
+        terms = question_terms(question)
+        newest = max((piece["order"] for piece in candidates if piece["kind"] == "month"), default=0)
+        def score(piece):
+            if piece["kind"] == "budget":
+                return math.inf
+            relevance = sum(context.weight(term) for term in terms & piece["terms"])
+            if piece["kind"] == "month":
+                # Prefer recent months, never above a piece matching a term
+                relevance += 0.1 / (1 + newest - piece["order"])
+            return relevance
+
+        selected = []
+        used = 0
+        for piece in sorted(candidates, key=score, reverse=True):
+            if used + piece["tokens"] <= max_tokens:
+                selected.append(piece)
+                used += piece["tokens"]
+
+        kinds = {"budget": 0, "month": 1, "category": 2, "transaction": 3}
+        selected.sort(key=lambda piece: (kinds[piece["kind"]], piece["order"], piece["id"]))
+        return {
+            "budget_id": budget_id,
+            "context": "\n".join(piece["text"] for piece in selected),
+            "tokens": used,
+            "max_tokens": max_tokens,
+            "pieces": [piece["id"] for piece in selected],
+            "candidates": len(candidates),
+            "summary_ms": (summarized - started) * 1000,
+            "assembly_ms": (time.perf_counter() - summarized) * 1000,
+        }
+
+context_service = ContextService()
@@ -0,0 +1,185 @@
+from array import array
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.single_flight import single_flight
+from app.models.account import Account
+from app.models.category import Category, CategoryGroup
+from app.models.payee import Payee
+from app.models.server_knowledge import ServerKnowledge
+
+# Server knowledge entity types the dimensions are synced under
+DIMENSION_ENTITIES = ["accounts", "categories", "payees"]
+
+class Dimension:
+    """
+    Names of one dimension of a budget. IDs map to positions in a name list,
+    and each position optionally to the position of its parent in another
+    dimension, e.g. a category to its group.
+    """
+
+    __slots__ = ("positions", "names", "parents")
+
+    def __init__(self, rows, parent: Optional["Dimension"] = None):
+        """
+        Args:
+            rows (list): (id, name) pairs, or (id, name, parent ID) with a parent dimension
+            parent (Dimension, optional): Dimension the parent IDs refer to
+        """
+        self.positions = {}
+        self.names = []
+        self.parents = array("i")
+        for row in rows:
+            self.positions[row[0]] = len(self.names)
+            self.names.append(row[1])
+            if parent is not None:
+                self.parents.append(parent.positions.get(row[2], -1))
+
+    def __len__(self):
+        return len(self.names)
+
+class BudgetDimensions:
+    """Account, category group, category and payee names of a budget, each at its server knowledge."""
+
+    def __init__(self, knowledge: dict, accounts: Dimension, category_groups: Dimension, categories: Dimension, payees: Dimension):
+        self.knowledge = knowledge
+        self.accounts = accounts
+        self.category_groups = category_groups
+        self.categories = categories
+        self.payees = payees
+
+    def enrich(self, rows: list) -> list:
+        """
+        Add account_name, payee_name, category_name and category_group_name to
+        transaction dicts in place, from their account_id, payee_id and category_id.
+
+        Args:
+            rows (list): Transaction dicts
+
+        Returns:
+            list: The same dicts
+        """
+        account_names = self.accounts.names
+        account_positions = self.accounts.positions
+        payee_names = self.payees.names
+        payee_positions = self.payees.positions
+        category_names = self.categories.names
+        category_positions = self.categories.positions
+        category_parents = self.categories.parents
+        group_names = self.category_groups.names
+        for row in rows:
+            position = account_positions.get(row["account_id"])
+            row["account_name"] = None if position is None else account_names[position]
+            position = payee_positions.get(row["payee_id"])
+            row["payee_name"] = None if position is None else payee_names[position]
+            position = category_positions.get(row["category_id"])
+            if position is None:
+                row["category_name"] = row["category_group_name"] = None
+            else:
+                row["category_name"] = category_names[position]
+                group = category_parents[position]
+                row["category_group_name"] = group_names[group] if group >= 0 else None
+        return rows
+
+class DimensionCache:
+    """
+    In-process cache of the names transaction responses show, so endpoints
+    select plain transaction columns and add the names from memory instead of
+    joining accounts, categories, category groups and payees on every request.
+
+    Dimensions are small and change rarely. They are cached per budget and
+    reloaded per entity type: a sync that only moved the payees' server
+    knowledge reloads the payees and keeps the accounts and categories.
+    Deleted rows are kept, since transactions can still refer to them.
+
+    The knowledge is read before the rows. The sync commits an entity's
+    knowledge together with its rows, so rows read afterwards are never older
+    than the knowledge they are cached under; at worst they are newer, and
+    the next sync's knowledge reloads them.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        """
+        Initialize the dimension cache.
+
+        Args:
+            max_entries (int): Maximum number of cached budgets
+        """
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = Lock()
+
+    def _knowledge(self, db: Session, budget_id: str):
+        rows = db.execute(
+            select(ServerKnowledge.entity_type, ServerKnowledge.knowledge)
+            .where(ServerKnowledge.budget_id == budget_id, ServerKnowledge.entity_type.in_(DIMENSION_ENTITIES))
+        ).all()
+        knowledge = dict(rows)
+        return {entity: knowledge.get(entity) for entity in DIMENSION_ENTITIES}
+
+    def get(self, db: Session, budget_id: str) -> BudgetDimensions:
+        """
+        Get the dimensions of a budget, reloading those a sync changed.
+
+        Args:
+            db (Session): Database session
+            budget_id (str): The budget ID
+
+        Returns:
+            BudgetDimensions: Names at the budget's current server knowledge
+        """
+        knowledge = self._knowledge(db, budget_id)
+        with self._lock:
+            cached = self._cache.get(budget_id)
+            if cached is not None and cached.knowledge == knowledge:
+                self._cache.move_to_end(budget_id)
+                return cached
+
+        # Concurrent misses, e.g. every list request right after a sync, load once
+        return single_flight.do(
+            ("dimensions", budget_id, tuple(knowledge.values())),
+            lambda: self._load(db, budget_id, knowledge, cached)
+        )
+
+    def _load(self, db: Session, budget_id: str, knowledge: dict, previous: Optional[BudgetDimensions]):
+        """Load the dimensions whose server knowledge changed, reuse the others, and cache the result."""
+        def stale(entity):
+            return previous is None or previous.knowledge[entity] != knowledge[entity]
+
+        if stale("accounts"):
+            accounts = Dimension(db.execute(
+                select(Account.id, Account.name).where(Account.budget_id == budget_id)
+            ).all())
+        else:
+            accounts = previous.accounts
+        if stale("categories"):
+            category_groups = Dimension(db.execute(
+                select(CategoryGroup.id, CategoryGroup.name).where(CategoryGroup.budget_id == budget_id)
+            ).all())
+            categories = Dimension(db.execute(
+                select(Category.id, Category.name, Category.category_group_id)
+                .join(CategoryGroup, CategoryGroup.id == Category.category_group_id)
+                .where(CategoryGroup.budget_id == budget_id)
+            ).all(), parent=category_groups)
+        else:
+            category_groups, categories = previous.category_groups, previous.categories
+        if stale("payees"):
+            payees = Dimension(db.execute(
+                select(Payee.id, Payee.name).where(Payee.budget_id == budget_id)
+            ).all())
+        else:
+            payees = previous.payees
+
+        dimensions = BudgetDimensions(knowledge, accounts, category_groups, categories, payees)
+        with self._lock:
+            self._cache[budget_id] = dimensions
+            self._cache.move_to_end(budget_id)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return dimensions
+
+dimension_cache = DimensionCache()
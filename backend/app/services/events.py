@@ -0,0 +1,132 @@
+import asyncio
+import json
+import logging
+from typing import Dict, Set
+
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Channel the sync service publishes change events on
+CHANGES_CHANNEL = "budgey_changes"
+
+class ChangeBroadcaster:
+    """
+    Fans out the sync's change events to subscribed clients.
+
+    A single LISTEN connection per process receives the Postgres notifications,
+    however many clients are subscribed, and puts each event on the queue of
+    every subscriber of its budget. The connection is opened with the first
+    subscription and re-established with backoff if it is lost.
+    """
+
+    def __init__(self, dsn: str, channel: str = CHANGES_CHANNEL, queue_size: int = 100):
+        """
+        Initialize the broadcaster.
+
+        Args:
+            dsn (str): asyncpg connection string
+            channel (str): Notification channel to listen on
+            queue_size (int): Events buffered per subscriber before it is told to resync
+        """
+        self.dsn = dsn
+        self.channel = channel
+        self.queue_size = queue_size
+        self.subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._task = None
+        self._listening = asyncio.Event()
+
+    async def subscribe(self, budget_id: str, timeout: float = 5.0) -> asyncio.Queue:
+        """
+        Register a subscriber for a budget's events, and wait until the listener
+        runs so that events committed after this returns are not missed. If the
+        listener cannot connect in time, the subscriber gets a resync event once
+        it does.
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.setdefault(budget_id, set()).add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._listen())
+        try:
+            await asyncio.wait_for(self._listening.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return queue
+
+    def unsubscribe(self, budget_id: str, queue: asyncio.Queue):
+        queues = self.subscribers.get(budget_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[budget_id]
+
+    def publish(self, event: dict):
+        """Put an event on the queues of its budget's subscribers."""
+        for queue in self.subscribers.get(event.get("budget_id"), ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # The client fell behind: drop its backlog and have it refetch everything
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"budget_id": event["budget_id"], "entity": "*", "server_knowledge": None})
+
+    def _on_notification(self, connection, pid, channel, payload):
+        try:
+            self.publish(json.loads(payload))
+        except (ValueError, AttributeError) as e:
+            logger.warning(f"Ignoring malformed change event {payload!r}: {str(e)}")
+
+    async def _listen(self):
+        """Hold the LISTEN connection, reconnecting until the broadcaster is stopped."""
+        import asyncpg
+
+        delay = 1
+        missed = False
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(self.channel, self._on_notification)
+            except Exception as e:
+                logger.error(f"Error connecting change listener, retrying in {delay}s: {str(e)}")
+                if connection is not None:
+                    connection.terminate()
+                missed = True
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60)
+                continue
+
+            try:
+                logger.info(f"Listening for change events on {self.channel}")
+                if missed:
+                    # Subscribers may have missed events while the listener was down
+                    for budget_id in list(self.subscribers):
+                        self.publish({"budget_id": budget_id, "entity": "*", "server_knowledge": None})
+                    missed = False
+                delay = 1
+                self._listening.set()
+                await lost.wait()
+                logger.warning("Change listener connection lost, reconnecting")
+                missed = True
+            finally:
+                self._listening.clear()
+                if not connection.is_closed():
+                    await connection.close()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+broadcaster = ChangeBroadcaster(
+    make_url(settings.ASYNC_DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+)
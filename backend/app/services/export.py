@@ -0,0 +1,194 @@
+from datetime import date
+from typing import Iterator, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import Date, cast, select
+from sqlalchemy.engine import Connection
+
+from app.models.month import CategoryMonth, Month
+from app.models.transaction import Subtransaction, Transaction
+
+FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+class ExportTable:
+    """A synced table as an export: its columns with Arrow types, and its budget and date filter."""
+
+    def __init__(self, columns, date_column, budget_column, joins=(), live=None):
+        """
+        Args:
+            columns (list): (SQL expression, Arrow field) pairs
+            date_column: Column filtered by since/until, an ISO date string in the database
+            budget_column: Column filtered by the budget ID
+            joins (tuple): (model, on clause) pairs needed by the filters
+            live: Extra condition excluding deleted rows
+        """
+        self.columns = columns
+        self.schema = pa.schema([field for _, field in columns])
+        self.date_column = date_column
+        self.budget_column = budget_column
+        self.joins = joins
+        self.live = live
+
+    def query(self, budget_id: str, since_date: Optional[date], until_date: Optional[date]):
+        query = select(*[column.label(field.name) for column, field in self.columns])
+        for model, on in self.joins:
+            query = query.join(model, on)
+        query = query.where(self.budget_column == budget_id)
+        if self.live is not None:
+            query = query.where(self.live)
+        if since_date:
+            query = query.where(self.date_column >= since_date.isoformat())
+        if until_date:
+            query = query.where(self.date_column <= until_date.isoformat())
+        return query.order_by(self.date_column)
+
+EXPORT_TABLES = {
+    "transactions": ExportTable(
+        [
+            (Transaction.id, pa.field("id", pa.string(), nullable=False)),
+            (cast(Transaction.date, Date), pa.field("date", pa.date32(), nullable=False)),
+            (Transaction.amount, pa.field("amount", pa.int64(), nullable=False)),
+            (Transaction.memo, pa.field("memo", pa.string())),
+            (Transaction.account_id, pa.field("account_id", pa.string(), nullable=False)),
+            (Transaction.category_id, pa.field("category_id", pa.string())),
+            (Transaction.payee_id, pa.field("payee_id", pa.string())),
+            (Transaction.cleared, pa.field("cleared", pa.string())),
+            (Transaction.approved, pa.field("approved", pa.bool_())),
+            (Transaction.flag_color, pa.field("flag_color", pa.string())),
+            (Transaction.import_id, pa.field("import_id", pa.string())),
+        ],
+        date_column=Transaction.date,
+        budget_column=Transaction.budget_id,
+        live=Transaction.deleted == False,
+    ),
+    "subtransactions": ExportTable(
+        [
+            (Subtransaction.id, pa.field("id", pa.string(), nullable=False)),
+            (Subtransaction.transaction_id, pa.field("transaction_id", pa.string(), nullable=False)),
+            (cast(Transaction.date, Date), pa.field("date", pa.date32(), nullable=False)),
+            (Subtransaction.amount, pa.field("amount", pa.int64(), nullable=False)),
+            (Subtransaction.memo, pa.field("memo", pa.string())),
+            (Subtransaction.category_id, pa.field("category_id", pa.string())),
+            (Subtransaction.payee_id, pa.field("payee_id", pa.string())),
+        ],
+        date_column=Transaction.date,
+        budget_column=Transaction.budget_id,
+        joins=((Transaction, Transaction.id == Subtransaction.transaction_id),),
+        live=(Subtransaction.deleted == False) & (Transaction.deleted == False),
+    ),
+    "category_months": ExportTable(
+        [
+            (cast(CategoryMonth.month, Date), pa.field("month", pa.date32(), nullable=False)),
+            (CategoryMonth.category_id, pa.field("category_id", pa.string(), nullable=False)),
+            (CategoryMonth.budgeted, pa.field("budgeted", pa.int64())),
+            (CategoryMonth.activity, pa.field("activity", pa.int64())),
+            (CategoryMonth.balance, pa.field("balance", pa.int64())),
+        ],
+        date_column=CategoryMonth.month,
+        budget_column=CategoryMonth.budget_id,
+    ),
+    "months": ExportTable(
+        [
+            (cast(Month.month, Date), pa.field("month", pa.date32(), nullable=False)),
+            (Month.to_be_budgeted, pa.field("to_be_budgeted", pa.int64())),
+            (Month.age_of_money, pa.field("age_of_money", pa.int64())),
+            (Month.income, pa.field("income", pa.int64())),
+            (Month.budgeted, pa.field("budgeted", pa.int64())),
+            (Month.activity, pa.field("activity", pa.int64())),
+        ],
+        date_column=Month.month,
+        budget_column=Month.budget_id,
+    ),
+}
+
+def record_batches(
+    conn: Connection,
+    table: ExportTable,
+    budget_id: str,
+    since_date: Optional[date] = None,
+    until_date: Optional[date] = None,
+    batch_size: int = 50000
+) -> Iterator[pa.RecordBatch]:
+    """
+    Read an export table through a server-side cursor, batch_size rows at a
+    time, so memory stays constant however large the budget is.
+
+    Args:
+        conn (Connection): Database connection, held until the iterator is exhausted
+        table (ExportTable): Table to export
+        budget_id (str): The budget ID
+        since_date (date, optional): First day to include
+        until_date (date, optional): Last day to include
+        batch_size (int): Rows per record batch
+
+    Yields:
+        RecordBatch: Rows in the table's Arrow schema
+    """
+    result = conn.execution_options(stream_results=True, max_row_buffer=batch_size).execute(
+        table.query(budget_id, since_date, until_date)
+    )
+    for rows in result.partitions(batch_size):
+        columns = zip(*rows)
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, table.schema)],
+            schema=table.schema
+        )
+
+class _ChunkSink:
+    """Write-only file collecting what a writer produced since the last take()."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+def encode_batches(batches: Iterator[pa.RecordBatch], schema: pa.Schema, file_format: str) -> Iterator[bytes]:
+    """
+    Encode record batches as a Parquet file (one row group per batch) or an
+    Arrow IPC stream, yielding the bytes as each batch is written.
+
+    Args:
+        batches (Iterator[RecordBatch]): Batches to encode
+        schema (Schema): Their schema
+        file_format (str): "parquet" or "arrow"
+
+    Yields:
+        bytes: Consecutive pieces of the encoded file
+    """
+    sink = _ChunkSink()
+    if file_format == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    for batch in batches:
+        if file_format == "parquet":
+            writer.write_batch(batch, row_group_size=batch.num_rows)
+        else:
+            writer.write_batch(batch)
+        yield sink.take()
+    writer.close()
+    yield sink.take()
@@ -0,0 +1,338 @@
+from collections import OrderedDict
+from datetime import date, timedelta
+from threading import Lock
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.single_flight import single_flight
+from app.models.account import Account
+from app.models.payee import Payee
+from app.models.scheduled_transaction import ScheduledTransaction, ScheduledSubtransaction
+from app.models.server_knowledge import ServerKnowledge
+
+# Recurrences with a fixed number of days between occurrences
+FREQUENCY_DAYS = {
+    "daily": 1,
+    "weekly": 7,
+    "everyOtherWeek": 14,
+    "every4Weeks": 28,
+}
+
+# Recurrences on the same day of the month every few months
+FREQUENCY_MONTHS = {
+    "monthly": 1,
+    "everyOtherMonth": 2,
+    "every3Months": 3,
+    "every4Months": 4,
+    "twiceAYear": 6,
+    "yearly": 12,
+    "everyOtherYear": 24,
+}
+
+def _ragged_arange(counts):
+    """
+    Concatenated aranges of the given lengths without a Python loop.
+
+    Returns:
+        tuple: (index of the range each element belongs to, position within that range)
+    """
+    counts = np.maximum(counts, 0)
+    owners = np.repeat(np.arange(len(counts)), counts)
+    starts = np.cumsum(counts) - counts
+    return owners, np.arange(counts.sum()) - starts[owners]
+
+def _days_in_month(months):
+    """Number of days of each datetime64[M] month."""
+    return ((months + 1).astype("datetime64[D]") - months.astype("datetime64[D]")).astype(np.int64)
+
+def _expand_day_steps(first, step, start, end):
+    """Occurrences every step days from first, within [start, end]."""
+    skip = np.maximum(-(-(start - first).astype(np.int64) // step), 0)
+    counts = (end - first).astype(np.int64) // step - skip + 1
+    owners, positions = _ragged_arange(counts)
+    return owners, first[owners] + (skip[owners] + positions) * step
+
+def _expand_month_steps(first, anchor_day, step, start, end):
+    """
+    Occurrences every step months from the month of first, on the anchor day
+    clamped to the month's length (a schedule on the 31st falls on the 30th
+    in 30-day months), within [max(first, start), end].
+    """
+    first_month = first.astype("datetime64[M]")
+    offsets = (start.astype("datetime64[M]") - first_month).astype(np.int64)
+    skip = np.maximum(offsets // step, 0)
+    counts = (end.astype("datetime64[M]") - first_month).astype(np.int64) // step - skip + 1
+    owners, positions = _ragged_arange(counts)
+
+    months = first_month[owners] + (skip[owners] + positions) * step
+    days = months.astype("datetime64[D]") + (np.minimum(anchor_day[owners], _days_in_month(months)) - 1)
+    keep = (days >= np.maximum(first[owners], start)) & (days <= end)
+    return owners[keep], days[keep]
+
+def expand_occurrences(first, anchor_day, frequency, start, end):
+    """
+    Expand scheduled transactions into their occurrence dates within a horizon.
+
+    All schedules with the same kind of recurrence are expanded together with
+    array arithmetic, so the cost grows with the number of occurrences rather
+    than with a Python loop per schedule and day.
+
+    Args:
+        first (np.ndarray): datetime64[D] date of the next occurrence of each schedule
+        anchor_day (np.ndarray): Day of the month monthly recurrences fall on
+        frequency (np.ndarray): YNAB frequency of each schedule
+        start (np.datetime64): First day of the horizon
+        end (np.datetime64): Last day of the horizon
+
+    Returns:
+        tuple: (schedule index, datetime64[D] date) per occurrence, ordered by schedule and date
+    """
+    owners = []
+    dates = []
+
+    def add(mask, expand):
+        indices = np.flatnonzero(mask)
+        if len(indices):
+            group_owners, group_dates = expand(indices)
+            owners.append(indices[group_owners])
+            dates.append(group_dates)
+
+    for name, step in FREQUENCY_DAYS.items():
+        add(frequency == name, lambda i: _expand_day_steps(first[i], step, start, end))
+    for name, step in FREQUENCY_MONTHS.items():
+        add(frequency == name, lambda i: _expand_month_steps(first[i], anchor_day[i], step, start, end))
+
+    # Twice a month: on the anchor day and half a month away from it
+    twice = frequency == "twiceAMonth"
+    second_day = np.where(anchor_day <= 15, anchor_day + 15, anchor_day - 15)
+    add(twice, lambda i: _expand_month_steps(first[i], anchor_day[i], 1, start, end))
+    add(twice, lambda i: _expand_month_steps(first[i], second_day[i], 1, start, end))
+
+    # Anything else, including "never", occurs once
+    once = ~np.isin(frequency, list(FREQUENCY_DAYS) + list(FREQUENCY_MONTHS) + ["twiceAMonth"])
+    add(once & (first >= start) & (first <= end), lambda i: (np.arange(len(i)), first[i]))
+
+    if not owners:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype="datetime64[D]")
+    owners = np.concatenate(owners)
+    dates = np.concatenate(dates)
+    order = np.lexsort((dates, owners))
+    return owners[order], dates[order]
+
+def project_cash_flow(schedules, lines, start, days, n_accounts, n_categories):
+    """
+    Project daily cash flow per account and category.
+
+    Args:
+        schedules (dict): Arrays 'first' (datetime64[D]), 'anchor_day' and 'frequency', one entry per schedule
+        lines (dict): Arrays 'schedule', 'account', 'category' (-1 for none), 'transfer_account' (-1 for none)
+            and 'amount', one entry per split of a schedule
+        start (np.datetime64): First day of the horizon
+        days (int): Number of days in the horizon
+        n_accounts (int): Number of accounts, the size of the account axis
+        n_categories (int): Number of categories, the size of the category axis
+
+    Returns:
+        tuple: (account flows of shape (n_accounts, days), category flows of shape (n_categories, days))
+    """
+    end = start + (days - 1)
+    owners, dates = expand_occurrences(schedules["first"], schedules["anchor_day"], schedules["frequency"], start, end)
+    day_index = (dates - start).astype(np.int64)
+
+    # Occurrences are grouped by schedule, so each line repeats its schedule's block
+    occurrence_counts = np.bincount(owners, minlength=len(schedules["first"]))
+    occurrence_offsets = np.cumsum(occurrence_counts) - occurrence_counts
+    line_owners, positions = _ragged_arange(occurrence_counts[lines["schedule"]])
+    line_days = day_index[occurrence_offsets[lines["schedule"]][line_owners] + positions]
+    amounts = lines["amount"][line_owners]
+
+    def accumulate(rows, mask, size):
+        flat = np.bincount(rows[mask] * days + line_days[mask], weights=amounts[mask], minlength=size * days)
+        return flat.reshape(size, days)
+
+    everything = np.ones(len(line_owners), dtype=bool)
+    account_flows = accumulate(lines["account"][line_owners], everything, n_accounts)
+
+    # The other side of a transfer moves the opposite amount
+    transfer_accounts = lines["transfer_account"][line_owners]
+    account_flows -= accumulate(transfer_accounts, transfer_accounts >= 0, n_accounts)
+
+    categories = lines["category"][line_owners]
+    category_flows = accumulate(categories, categories >= 0, n_categories)
+    return account_flows, category_flows
+
+class ForecastService:
+    """
+    Cash-flow forecast from scheduled transactions. Forecasts are cached per
+    budget and per server knowledge of scheduled transactions and accounts,
+    so they are only recomputed after a sync changed their inputs.
+    """
+
+    def __init__(self, max_entries: int = 128):
+        """
+        Initialize the forecast service.
+
+        Args:
+            max_entries (int): Maximum number of cached forecasts
+        """
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = Lock()
+
+    def _knowledge(self, db: Session, budget_id: str):
+        rows = (
+            db.query(ServerKnowledge.entity_type, ServerKnowledge.knowledge)
+            .filter(
+                ServerKnowledge.budget_id == budget_id,
+                ServerKnowledge.entity_type.in_(["scheduled_transactions", "accounts"])
+            )
+            .all()
+        )
+        knowledge = dict(rows)
+        return knowledge.get("scheduled_transactions"), knowledge.get("accounts")
+
+    def _load(self, db: Session, budget_id: str):
+        """
+        Load the live scheduled transactions of a budget as arrays.
+
+        Returns:
+            tuple: (schedules, lines, account IDs, account balances, category IDs)
+        """
+        accounts = (
+            db.query(Account.id, Account.balance)
+            .filter(Account.budget_id == budget_id, Account.deleted == False)
+            .order_by(Account.name)
+            .all()
+        )
+        account_ids = [account_id for account_id, _ in accounts]
+        account_index = {account_id: index for index, account_id in enumerate(account_ids)}
+        transfer_accounts = dict(
+            db.query(Payee.id, Payee.transfer_account_id)
+            .filter(Payee.budget_id == budget_id, Payee.transfer_account_id.isnot(None))
+            .all()
+        )
+
+        scheduled = (
+            db.query(ScheduledTransaction)
+            .filter(
+                ScheduledTransaction.budget_id == budget_id,
+                ScheduledTransaction.deleted == False,
+                ScheduledTransaction.date.isnot(None)
+            )
+            .all()
+        )
+        splits = {}
+        for sub in (
+            db.query(ScheduledSubtransaction)
+            .filter(
+                ScheduledSubtransaction.scheduled_transaction_id.in_([schedule.id for schedule in scheduled]),
+                ScheduledSubtransaction.deleted == False
+            )
+            .all()
+        ):
+            splits.setdefault(sub.scheduled_transaction_id, []).append(sub)
+
+        category_ids = []
+        category_index = {}
+        firsts, anchor_days, frequencies = [], [], []
+        line_rows = []
+        for schedule in scheduled:
+            if schedule.account_id not in account_index:
+                continue
+            schedule_index = len(firsts)
+            first = date.fromisoformat(schedule.date[:10])
+            anchor = date.fromisoformat(schedule.date_first[:10]) if schedule.date_first else first
+            firsts.append(first)
+            anchor_days.append(anchor.day)
+            frequencies.append(schedule.frequency)
+
+            for line in splits.get(schedule.id) or [schedule]:
+                if line.category_id and line.category_id not in category_index:
+                    category_index[line.category_id] = len(category_ids)
+                    category_ids.append(line.category_id)
+                line_rows.append((
+                    schedule_index,
+                    account_index[schedule.account_id],
+                    category_index.get(line.category_id, -1),
+                    account_index.get(transfer_accounts.get(line.payee_id), -1),
+                    line.amount
+                ))
+
+        schedules = {
+            "first": np.array(firsts, dtype="datetime64[D]"),
+            "anchor_day": np.array(anchor_days, dtype=np.int64),
+            "frequency": np.array(frequencies, dtype=object),
+        }
+        columns = list(zip(*line_rows)) or [[]] * 5
+        lines = {
+            name: np.array(values, dtype=np.int64)
+            for name, values in zip(["schedule", "account", "category", "transfer_account", "amount"], columns)
+        }
+        balances = np.array([balance for _, balance in accounts], dtype=np.int64)
+        return schedules, lines, account_ids, balances, category_ids
+
+    def forecast(self, db: Session, budget_id: str, start_date: date, days: int = 365):
+        """
+        Forecast daily cash flow and account balances of a budget.
+
+        Args:
+            db (Session): Database session
+            budget_id (str): The budget ID
+            start_date (date): First day of the forecast
+            days (int): Number of days to forecast
+
+        Returns:
+            dict: Dates, per-account flows and projected balances, per-category flows and daily totals
+        """
+        knowledge = self._knowledge(db, budget_id)
+        key = (budget_id, knowledge, start_date, days)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        # Concurrent cache misses, e.g. all dashboards refreshing after a sync, compute once
+        return single_flight.do(("forecast",) + key, lambda: self._compute(db, key))
+
+    def _compute(self, db: Session, key):
+        """Compute the forecast for a cache key and cache it."""
+        budget_id, knowledge, start_date, days = key
+        schedules, lines, account_ids, balances, category_ids = self._load(db, budget_id)
+        start = np.datetime64(start_date, "D")
+        account_flows, category_flows = project_cash_flow(
+            schedules, lines, start, days, len(account_ids), len(category_ids)
+        )
+        account_flows = account_flows.astype(np.int64)
+        category_flows = category_flows.astype(np.int64)
+        projected = balances[:, None] + np.cumsum(account_flows, axis=1)
+
+        result = {
+            "budget_id": budget_id,
+            "server_knowledge": knowledge[0],
+            "dates": [(start_date + timedelta(days=offset)).isoformat() for offset in range(days)],
+            "accounts": [
+                {
+                    "account_id": account_id,
+                    "flows": account_flows[index].tolist(),
+                    "projected_balance": projected[index].tolist()
+                }
+                for index, account_id in enumerate(account_ids)
+                if account_flows[index].any()
+            ],
+            "categories": [
+                {"category_id": category_id, "flows": category_flows[index].tolist()}
+                for index, category_id in enumerate(category_ids)
+                if category_flows[index].any()
+            ],
+            # Transfers between tracked accounts cancel out in the total
+            "total": account_flows.sum(axis=0).tolist(),
+        }
+
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return result
+
+forecast_service = ForecastService()
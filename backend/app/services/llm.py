@@ -0,0 +1,31 @@
+from app.services.context import estimate_tokens
+
+class StubLLM:
+    """
+    Local stand-in for the LLM of budget questions. It answers
+    deterministically from the prompt without a network call, so the
+    question flow can be developed and tested without an API key.
+    """
+
+    model = "stub"
+
+    def complete(self, system: str, context: str, question: str) -> str:
+        """
+        Answer a question from its context.
+
+        Args:
+            system (str): System prompt
+            context (str): Budget context assembled for the question
+            question (str): The user's question
+
+        Returns:
+            str: The answer
+        """
+        lines = [line for line in context.splitlines() if line]
+        prompt_tokens = estimate_tokens(system) + estimate_tokens(context) + estimate_tokens(question)
+        answer = f"Stub answer to {question!r} from {len(lines)} context lines ({prompt_tokens} prompt tokens)."
+        if len(lines) > 1:
+            answer += f" Most relevant: {lines[1]}"
+        return answer
+
+llm = StubLLM()
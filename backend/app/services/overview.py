@@ -0,0 +1,194 @@
+import asyncio
+import hashlib
+from datetime import date
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.db import session as db_session
+from app.models.account import Account
+from app.models.budget import Budget
+from app.models.category import Category, CategoryGroup
+from app.models.month import CategoryMonth, Month
+from app.models.payee import Payee
+from app.models.server_knowledge import ServerKnowledge
+from app.models.transaction import Transaction
+
+async def _fetch(statement):
+    """
+    Run one statement in its own session, so independent statements can run
+    concurrently on separate connections.
+
+    Returns:
+        list: Rows as dicts
+    """
+    async with db_session.AsyncSessionLocal() as session:
+        result = await session.execute(statement)
+        keys = tuple(result.keys())
+        return [dict(zip(keys, row)) for row in result]
+
+def version_tag(knowledge_rows):
+    """
+    Version of a budget's synced data, derived from its server knowledge per
+    entity type. It changes whenever a sync stored new data.
+
+    Args:
+        knowledge_rows (list): Rows with entity_type and knowledge
+
+    Returns:
+        str: Short hex digest
+    """
+    state = ",".join(f"{row['entity_type']}={row['knowledge']}" for row in sorted(knowledge_rows, key=lambda row: row["entity_type"]))
+    return hashlib.sha1(state.encode()).hexdigest()[:16]
+
+def current_version(db: Session, budget_id: str):
+    """
+    Version tag of a budget's synced data, for endpoints using a sync session.
+
+    Returns:
+        str: Version tag, see version_tag
+    """
+    knowledge = db.execute(
+        select(ServerKnowledge.entity_type, ServerKnowledge.knowledge)
+        .where(ServerKnowledge.budget_id == budget_id)
+    ).mappings().all()
+    return version_tag(knowledge)
+
+async def budget_version(budget_id: str):
+    """
+    Check that a budget exists and get its version tag, in two concurrent queries.
+
+    Returns:
+        tuple: (budget row or None, version tag)
+    """
+    budget, knowledge = await asyncio.gather(
+        _fetch(
+            select(
+                Budget.id,
+                Budget.name,
+                Budget.last_modified_on,
+                Budget.first_month,
+                Budget.last_month,
+                Budget.currency_format_iso_code,
+                Budget.date_format,
+                Budget.currency_format_symbol
+            ).where(Budget.id == budget_id)
+        ),
+        _fetch(
+            select(ServerKnowledge.entity_type, ServerKnowledge.knowledge)
+            .where(ServerKnowledge.budget_id == budget_id)
+        )
+    )
+    return (budget[0] if budget else None), version_tag(knowledge)
+
+async def budget_overview(budget_id: str, month: date, recent: int = 20):
+    """
+    Gather the dashboard data of a budget in four concurrent queries: accounts,
+    categories with their values for the month, the month summary and the
+    most recent transactions.
+
+    Args:
+        budget_id (str): The budget ID
+        month (date): Any day of the month to summarise; the latest synced month up to it is used
+        recent (int): Number of recent transactions
+
+    Returns:
+        dict: Accounts, category groups with categories, month summary and recent transactions
+    """
+    # Latest synced month up to the requested one, resolved inside each query that needs it
+    month_key = (
+        select(func.max(Month.month))
+        .where(Month.budget_id == budget_id, Month.month <= month.replace(day=1).isoformat())
+        .scalar_subquery()
+    )
+
+    accounts, categories, months, transactions = await asyncio.gather(
+        _fetch(
+            select(
+                Account.id,
+                Account.name,
+                Account.type,
+                Account.on_budget,
+                Account.closed,
+                Account.balance,
+                Account.cleared_balance,
+                Account.uncleared_balance
+            )
+            .where(Account.budget_id == budget_id, Account.deleted == False)
+            .order_by(Account.on_budget.desc(), Account.name)
+        ),
+        _fetch(
+            select(
+                CategoryGroup.id.label("group_id"),
+                CategoryGroup.name.label("group_name"),
+                CategoryGroup.hidden.label("group_hidden"),
+                Category.id,
+                Category.name,
+                Category.hidden,
+                CategoryMonth.budgeted,
+                CategoryMonth.activity,
+                CategoryMonth.balance
+            )
+            .join(Category, Category.category_group_id == CategoryGroup.id)
+            .outerjoin(
+                CategoryMonth,
+                (CategoryMonth.budget_id == budget_id) &
+                (CategoryMonth.category_id == Category.id) &
+                (CategoryMonth.month == month_key)
+            )
+            .where(CategoryGroup.budget_id == budget_id, CategoryGroup.deleted == False, Category.deleted == False)
+            .order_by(CategoryGroup.name, Category.name)
+        ),
+        _fetch(
+            select(
+                Month.month,
+                Month.to_be_budgeted,
+                Month.age_of_money,
+                Month.income,
+                Month.budgeted,
+                Month.activity
+            ).where(Month.budget_id == budget_id, Month.month == month_key)
+        ),
+        _fetch(
+            select(
+                Transaction.id,
+                Transaction.date,
+                Transaction.amount,
+                Transaction.memo,
+                Transaction.account_id,
+                Transaction.category_id,
+                Transaction.cleared,
+                Payee.name.label("payee_name"),
+                Category.name.label("category_name")
+            )
+            .outerjoin(Payee, Payee.id == Transaction.payee_id)
+            .outerjoin(Category, Category.id == Transaction.category_id)
+            .where(Transaction.budget_id == budget_id, Transaction.deleted == False)
+            .order_by(Transaction.date.desc(), Transaction.id)
+            .limit(recent)
+        )
+    )
+
+    groups = {}
+    for row in categories:
+        group = groups.setdefault(row["group_id"], {
+            "id": row["group_id"],
+            "name": row["group_name"],
+            "hidden": row["group_hidden"],
+            "categories": []
+        })
+        group["categories"].append({
+            "id": row["id"],
+            "name": row["name"],
+            "hidden": row["hidden"],
+            "budgeted": row["budgeted"],
+            "activity": row["activity"],
+            "balance": row["balance"]
+        })
+
+    return {
+        "accounts": accounts,
+        "category_groups": list(groups.values()),
+        "month": months[0] if months else None,
+        "recent_transactions": transactions
+    }
@@ -0,0 +1,521 @@
+import logging
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.embedding import Embedding
+from app.models.transaction import Transaction
+
+logger = logging.getLogger(__name__)
+
+NO_DATE = np.iinfo(np.int32).min
+NO_CODE = -1
+
+def _date_ordinal(value):
+    """
+    Convert a date or YYYY-MM-DD string to days since the epoch.
+    """
+    if value is None:
+        return NO_DATE
+    if isinstance(value, date):
+        value = value.isoformat()
+    return int(np.datetime64(str(value)[:10], "D").astype(np.int64))
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) approximate nearest-neighbour index over normalised embeddings.
+
+    Vectors are assigned to the nearest of n_lists k-means centroids and a query only
+    scores the vectors in its n_probe closest lists. Budget, date and category are kept
+    in parallel arrays so filters are applied before any distances are computed.
+    """
+
+    def __init__(self, dimensions, n_lists=256, n_probe=8, exact_threshold=10000):
+        self.dimensions = dimensions
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.exact_threshold = exact_threshold
+        self.centroids = None
+
+        self._size = 0
+        self._vectors = np.zeros((0, dimensions), dtype=np.float32)
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._budgets = np.zeros(0, dtype=np.int32)
+        self._dates = np.zeros(0, dtype=np.int32)
+        self._categories = np.zeros(0, dtype=np.int32)
+        self._ids = []
+        self._rows = {}
+        self._codes = {}
+        self._lists = []
+        self._list_arrays = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def live_vectors(self):
+        """Return the vectors that are not tombstoned."""
+        return self._vectors[:self._size][self._alive[:self._size]]
+
+    def ids(self):
+        """Return the IDs of all live vectors."""
+        return list(self._rows)
+
+    def _code(self, value):
+        """Map a budget or category ID to a compact integer code."""
+        if value is None:
+            return NO_CODE
+        return self._codes.setdefault(value, len(self._codes))
+
+    def _reserve(self, extra):
+        """Grow the backing arrays geometrically so appends stay amortised O(1)."""
+        needed = self._size + extra
+        capacity = len(self._vectors)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 1024)
+
+        def grow(array, fill=0):
+            grown = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+            grown[:self._size] = array[:self._size]
+            return grown
+
+        self._vectors = grow(self._vectors)
+        self._assign = grow(self._assign)
+        self._alive = grow(self._alive, False)
+        self._budgets = grow(self._budgets, NO_CODE)
+        self._dates = grow(self._dates, NO_DATE)
+        self._categories = grow(self._categories, NO_CODE)
+
+    @staticmethod
+    def _normalise(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _nearest_centroids(self, vectors, centroids=None):
+        """Assign vectors to their nearest centroid, in blocks to bound memory."""
+        centroids = self.centroids if centroids is None else centroids
+        assignments = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), 8192):
+            block = vectors[start:start + 8192]
+            assignments[start:start + 8192] = np.argmax(block @ centroids.T, axis=1)
+        return assignments
+
+    def train(self, vectors, iterations=10, sample_size=50000, seed=0):
+        """
+        Learn the coarse quantiser with spherical k-means on a sample of vectors.
+        Existing vectors are reassigned to the new lists. The centroids are
+        learnt aside and swapped in with the lists under the lock, so searches
+        never see centroids and lists of different trainings.
+
+        Args:
+            vectors (array): Training vectors, shape (n, dimensions)
+            iterations (int): Number of k-means iterations
+            sample_size (int): Maximum number of vectors sampled for training
+            seed (int): Random seed, so the same data always produces the same index
+        """
+        vectors = self._normalise(vectors)
+        rng = np.random.default_rng(seed)
+        if len(vectors) > sample_size:
+            vectors = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+
+        n_lists = min(self.n_lists, len(vectors))
+        centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = self._nearest_centroids(vectors, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, vectors)
+            counts = np.bincount(assignments, minlength=n_lists)
+            # Empty lists keep their previous centroid
+            empty = counts == 0
+            sums[empty] = centroids[empty]
+            centroids = self._normalise(sums)
+
+        with self._lock:
+            self.centroids = centroids
+            self.n_lists = n_lists
+            self._assign[:self._size] = self._nearest_centroids(self._vectors[:self._size]) if self._size else 0
+            self._rebuild_lists()
+
+    def _rebuild_lists(self):
+        """Rebuild the inverted lists from the list assignments of live rows."""
+        rows = np.flatnonzero(self._alive[:self._size]).astype(np.int64)
+        order = rows[np.argsort(self._assign[rows], kind="stable")]
+        bounds = np.searchsorted(self._assign[order], np.arange(self.n_lists + 1))
+        self._lists = [list(order[bounds[i]:bounds[i + 1]]) for i in range(self.n_lists)]
+        self._list_arrays = [np.asarray(rows_in_list, dtype=np.int64) for rows_in_list in self._lists]
+
+    def add(self, ids, vectors, budget_ids=None, dates=None, category_ids=None):
+        """
+        Insert or replace vectors. Replaced vectors are tombstoned and skipped
+        by searches; save and load compact them away.
+
+        Args:
+            ids (list): Source IDs
+            vectors (array): Vectors, shape (len(ids), dimensions)
+            budget_ids (list, optional): Budget ID per vector
+            dates (list, optional): Date per vector (date or YYYY-MM-DD string)
+            category_ids (list, optional): Category ID per vector
+        """
+        count = len(ids)
+        if count == 0:
+            return
+        vectors = self._normalise(vectors).reshape(count, self.dimensions)
+        budget_ids = budget_ids if budget_ids is not None else [None] * count
+        dates = dates if dates is not None else [None] * count
+        category_ids = category_ids if category_ids is not None else [None] * count
+
+        # An ID given more than once keeps its last vector, like consecutive calls would
+        last = {source_id: position for position, source_id in enumerate(ids)}
+        if len(last) < count:
+            keep = sorted(last.values())
+            ids = [ids[position] for position in keep]
+            vectors = vectors[keep]
+            budget_ids = [budget_ids[position] for position in keep]
+            dates = [dates[position] for position in keep]
+            category_ids = [category_ids[position] for position in keep]
+            count = len(keep)
+
+        with self._lock:
+            self._reserve(count)
+            start, end = self._size, self._size + count
+
+            for source_id in ids:
+                previous = self._rows.get(source_id)
+                if previous is not None:
+                    self._alive[previous] = False
+
+            self._vectors[start:end] = vectors
+            self._alive[start:end] = True
+            self._budgets[start:end] = [self._code(value) for value in budget_ids]
+            self._dates[start:end] = [_date_ordinal(value) for value in dates]
+            self._categories[start:end] = [self._code(value) for value in category_ids]
+            self._assign[start:end] = self._nearest_centroids(vectors) if self.is_trained else 0
+
+            for offset, source_id in enumerate(ids):
+                self._rows[source_id] = start + offset
+            self._ids.extend(ids)
+            self._size = end
+
+            if self.is_trained:
+                for row, list_number in zip(range(start, end), self._assign[start:end]):
+                    self._lists[list_number].append(row)
+                for list_number in set(self._assign[start:end].tolist()):
+                    self._list_arrays[list_number] = None
+
+    def remove(self, ids):
+        """
+        Remove vectors by source ID.
+
+        Args:
+            ids (list): Source IDs
+        """
+        with self._lock:
+            for source_id in ids:
+                row = self._rows.pop(source_id, None)
+                if row is not None:
+                    self._alive[row] = False
+
+    def _filter_mask(self, rows, budget_id, date_from, date_to, category_ids):
+        """Evaluate metadata filters for candidate rows, or for all rows if rows is None."""
+        select = slice(0, self._size) if rows is None else rows
+        mask = self._alive[select].copy()
+        if budget_id is not None:
+            mask &= self._budgets[select] == self._codes.get(budget_id, -2)
+        if date_from is not None:
+            mask &= self._dates[select] >= _date_ordinal(date_from)
+        if date_to is not None:
+            dates = self._dates[select]
+            mask &= (dates <= _date_ordinal(date_to)) & (dates != NO_DATE)
+        if category_ids is not None:
+            codes = [self._codes[value] for value in category_ids if value in self._codes]
+            mask &= np.isin(self._categories[select], codes)
+        return mask
+
+    def _top_k(self, rows, query, k):
+        """Score candidate rows against the query and return the best k."""
+        if len(rows) == 0:
+            return []
+        scores = self._vectors[rows] @ query
+        if len(rows) > k:
+            best = np.argpartition(-scores, k)[:k]
+        else:
+            best = np.arange(len(rows))
+        best = best[np.argsort(-scores[best])]
+        return [(self._ids[rows[i]], float(scores[i])) for i in best]
+
+    def exact_search(self, query, k=10, budget_id=None, date_from=None, date_to=None, category_ids=None):
+        """
+        Brute-force search over every live vector, used as the recall baseline
+        and for indexes too small to be worth probing.
+
+        Returns:
+            list: (source ID, cosine similarity) pairs, best first
+        """
+        query = self._normalise(query)
+        with self._lock:
+            rows = np.flatnonzero(self._filter_mask(None, budget_id, date_from, date_to, category_ids))
+        return self._top_k(rows, query, k)
+
+    def search(self, query, k=10, budget_id=None, date_from=None, date_to=None, category_ids=None, n_probe=None):
+        """
+        Approximate nearest-neighbour search with metadata pre-filtering.
+        Filters are evaluated over the metadata arrays first. If few vectors
+        match, they are scored exactly; otherwise more lists are probed until
+        about as many vectors pass the filters as an unfiltered search would
+        score, which keeps recall close to the unfiltered case.
+
+        Args:
+            query (array): Query vector
+            k (int): Number of results
+            budget_id (str, optional): Only return vectors of this budget
+            date_from (str, optional): Only return vectors dated on or after this date
+            date_to (str, optional): Only return vectors dated on or before this date
+            category_ids (list, optional): Only return vectors in these categories
+            n_probe (int, optional): Number of lists to probe, defaults to the index setting
+
+        Returns:
+            list: (source ID, cosine similarity) pairs, best first
+        """
+        if not self.is_trained:
+            return self.exact_search(query, k, budget_id, date_from, date_to, category_ids)
+
+        query = self._normalise(query)
+        # Candidates are picked under the lock, so a concurrent add or training
+        # never mixes versions of the metadata, centroids and lists; only the
+        # scoring runs outside it
+        with self._lock:
+            rows = self._candidates(query, k, budget_id, date_from, date_to, category_ids, n_probe)
+        return self._top_k(rows, query, k)
+
+    def _candidates(self, query, k, budget_id, date_from, date_to, category_ids, n_probe):
+        """Rows to score for a search: the filtered rows of the probed lists, or all filtered rows if few."""
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+
+        mask = None
+        if any(value is not None for value in (budget_id, date_from, date_to, category_ids)):
+            mask = self._filter_mask(None, budget_id, date_from, date_to, category_ids)
+            matching = np.flatnonzero(mask)
+            # Scoring a small filtered set exactly is both faster and exact
+            if len(matching) <= self.exact_threshold:
+                return matching
+
+        # Filters discard part of each probed list, so keep widening the probe
+        # until as many vectors pass the filters as an unfiltered probe would score
+        list_order = np.argsort(-(self.centroids @ query))
+        wanted = None
+        while True:
+            probed = []
+            for list_number in list_order[:n_probe]:
+                if self._list_arrays[list_number] is None:
+                    self._list_arrays[list_number] = np.asarray(self._lists[list_number], dtype=np.int64)
+                probed.append(self._list_arrays[list_number])
+            rows = np.concatenate(probed) if probed else np.zeros(0, dtype=np.int64)
+            if wanted is None:
+                wanted = max(len(rows), k) if mask is not None else k
+            rows = rows[mask[rows]] if mask is not None else rows[self._alive[rows]]
+
+            if len(rows) >= wanted or n_probe >= self.n_lists:
+                return rows
+            n_probe = min(n_probe * 2, self.n_lists)
+
+    def save(self, path):
+        """
+        Persist the index to a single .npz file, dropping tombstoned rows.
+
+        Args:
+            path (str): Destination file path
+        """
+        with self._lock:
+            rows = np.flatnonzero(self._alive[:self._size])
+            codes = sorted(self._codes, key=self._codes.get)
+            np.savez(
+                path,
+                dimensions=self.dimensions,
+                n_lists=self.n_lists,
+                n_probe=self.n_probe,
+                centroids=self.centroids if self.is_trained else np.zeros((0, self.dimensions), dtype=np.float32),
+                vectors=self._vectors[rows],
+                assign=self._assign[rows],
+                budgets=self._budgets[rows],
+                dates=self._dates[rows],
+                categories=self._categories[rows],
+                ids=np.array([self._ids[row] for row in rows], dtype=str),
+                codes=np.array(codes, dtype=str)
+            )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load an index saved with save().
+
+        Args:
+            path (str): Source file path
+
+        Returns:
+            IVFIndex: The loaded index
+        """
+        with np.load(path, allow_pickle=False) as data:
+            index = cls(int(data["dimensions"]), int(data["n_lists"]), int(data["n_probe"]))
+            count = len(data["ids"])
+            index._reserve(count)
+            index._size = count
+            index._vectors[:count] = data["vectors"]
+            index._assign[:count] = data["assign"]
+            index._alive[:count] = True
+            index._budgets[:count] = data["budgets"]
+            index._dates[:count] = data["dates"]
+            index._categories[:count] = data["categories"]
+            index._ids = data["ids"].tolist()
+            index._rows = {source_id: row for row, source_id in enumerate(index._ids)}
+            index._codes = {code: number for number, code in enumerate(data["codes"].tolist())}
+            if len(data["centroids"]):
+                index.centroids = data["centroids"]
+                index._rebuild_lists()
+        return index
+
+class TransactionRetriever:
+    """
+    Keeps an IVF index of transaction embeddings in sync with the embeddings
+    table. Refreshes only load embeddings updated since the previous refresh,
+    and the index is persisted to disk so restarts do not rebuild it.
+
+    updated_at is the writer's transaction start, so a batch committed after a
+    refresh can carry timestamps older than that refresh. Each refresh
+    therefore re-reads an overlap window before its watermark, and skips the
+    rows it already applied at the same updated_at.
+    """
+
+    def __init__(self, index_path=None, dimensions=256, n_lists=256, n_probe=8, train_threshold=10000,
+                 overlap_seconds=300):
+        """
+        Args:
+            index_path (str, optional): File the index is persisted to
+            dimensions (int): Embedding dimensions
+            n_lists (int): Number of IVF lists
+            n_probe (int): Number of lists probed per query
+            train_threshold (int): Index size at which the coarse quantiser is trained
+            overlap_seconds (float): Window before the watermark re-read on each refresh, longer than any embedding write
+        """
+        self.index_path = index_path
+        self.train_threshold = train_threshold
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self.refreshed_at = None
+        # updated_at of the rows applied within the overlap window, by source ID
+        self._applied = {}
+        self.index = IVFIndex(dimensions, n_lists, n_probe)
+
+        if index_path and os.path.exists(index_path):
+            self.index = IVFIndex.load(index_path)
+            refreshed_at_path = f"{index_path}.refreshed_at"
+            if os.path.exists(refreshed_at_path):
+                with open(refreshed_at_path) as f:
+                    self.refreshed_at = datetime.fromisoformat(f.read().strip())
+            logger.info(f"Loaded retrieval index with {len(self.index)} vectors from {index_path}")
+
+    def refresh(self, db: Session, batch_size=5000):
+        """
+        Load transaction embeddings changed since the last refresh into the index.
+
+        Args:
+            db (Session): Database session
+            batch_size (int): Number of rows fetched per batch
+
+        Returns:
+            int: Number of vectors inserted or removed
+        """
+        query = db.query(
+            Embedding.source_id,
+            Embedding.budget_id,
+            Embedding.embedding,
+            Embedding.updated_at,
+            Transaction.date,
+            Transaction.category_id,
+            Transaction.deleted
+        ).outerjoin(
+            Transaction, Transaction.id == Embedding.source_id
+        ).filter(Embedding.source_type == "transaction")
+        if self.refreshed_at is not None:
+            query = query.filter(Embedding.updated_at > self.refreshed_at - self.overlap)
+
+        changed = 0
+        batch = []
+        for row in query.yield_per(batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                changed += self._apply(batch)
+                batch = []
+        changed += self._apply(batch)
+
+        if self.refreshed_at is not None:
+            horizon = self.refreshed_at - self.overlap
+            self._applied = {source_id: at for source_id, at in self._applied.items() if at > horizon}
+
+        if not self.index.is_trained and len(self.index) >= self.train_threshold:
+            self.index.train(self.index.live_vectors())
+
+        if changed and self.index_path:
+            self.index.save(self.index_path)
+            with open(f"{self.index_path}.refreshed_at", "w") as f:
+                f.write(self.refreshed_at.isoformat())
+        return changed
+
+    def reconcile(self, db: Session):
+        """
+        Remove vectors whose embedding row no longer exists, e.g. after the
+        sync deleted a transaction. This reads only the IDs, so it is cheap
+        enough to run periodically rather than on every refresh.
+
+        Args:
+            db (Session): Database session
+
+        Returns:
+            int: Number of vectors removed
+        """
+        current = {
+            source_id for (source_id,) in
+            db.query(Embedding.source_id).filter(Embedding.source_type == "transaction")
+        }
+        stale = [source_id for source_id in self.index.ids() if source_id not in current]
+        self.index.remove(stale)
+        return len(stale)
+
+    def _apply(self, rows):
+        """Apply a batch of embedding rows to the index, skipping those already applied."""
+        rows = [row for row in rows if self._applied.get(row.source_id) != row.updated_at]
+        if not rows:
+            return 0
+        removed = [row.source_id for row in rows if row.deleted]
+        live = [row for row in rows if not row.deleted]
+        self.index.remove(removed)
+        if live:
+            self.index.add(
+                [row.source_id for row in live],
+                np.array([row.embedding for row in live], dtype=np.float32),
+                budget_ids=[row.budget_id for row in live],
+                dates=[row.date for row in live],
+                category_ids=[row.category_id for row in live]
+            )
+        self._applied.update((row.source_id, row.updated_at) for row in rows)
+        newest = max(row.updated_at for row in rows)
+        self.refreshed_at = newest if self.refreshed_at is None else max(self.refreshed_at, newest)
+        return len(rows)
+
+    def search(self, query_vector, k=10, **filters):
+        """
+        Search transaction embeddings, see IVFIndex.search for filters.
+
+        Returns:
+            list: (transaction ID, cosine similarity) pairs, best first
+        """
+        return self.index.search(query_vector, k, **filters)
@@ -0,0 +1,78 @@
+import re
+
+from sqlalchemy import func, union, select
+from sqlalchemy.orm import Session
+
+from app.models.payee import Payee
+from app.models.transaction import Transaction
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+def build_prefix_tsquery(text):
+    """
+    Turn free text into a prefix tsquery string ('coff & bean' -> 'coff:* & bean:*'),
+    dropping characters that have a meaning in tsquery syntax.
+    """
+    return " & ".join(f"{token}:*" for token in TOKEN_PATTERN.findall(text.lower()))
+
+def escape_like(text):
+    """Escape LIKE wildcards in user input."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def search_transactions(db: Session, budget_id: str, text: str, limit: int = 50, payee_matches: int = 20):
+    """
+    Ranked search over transaction memos and payee names.
+
+    Candidates are collected from three indexed lookups and unioned before any
+    ranking happens: memo words via the memo tsvector GIN index, memo fragments
+    via the memo trigram index, and transactions of payees whose names are
+    trigram-similar to the query, which tolerates misspellings. A row scores
+    its best match; the memo rank is normalised to rank / (rank + 1), so it is
+    on the 0-1 scale of the trigram similarities it is compared with.
+
+    Args:
+        db (Session): Database session
+        budget_id (str): The budget ID
+        text (str): Search text
+        limit (int): Maximum number of results
+        payee_matches (int): Maximum number of fuzzy-matched payees considered
+
+    Returns:
+        list: Rows of (Transaction, payee_name, score), best first
+    """
+    tsquery_text = build_prefix_tsquery(text)
+    if not tsquery_text:
+        return []
+    tsquery = func.to_tsquery("simple", tsquery_text)
+
+    matched_payees = (
+        select(Payee.id, func.similarity(Payee.name, text).label("similarity"))
+        .where(Payee.budget_id == budget_id, Payee.deleted == False, Payee.name.op("%")(text))
+        .order_by(func.similarity(Payee.name, text).desc())
+        .limit(payee_matches)
+        .subquery()
+    )
+
+    live = (Transaction.budget_id == budget_id, Transaction.deleted == False)
+    candidates = union(
+        select(Transaction.id).where(*live, Transaction.memo_tsv.op("@@")(tsquery)),
+        select(Transaction.id).where(*live, Transaction.memo.ilike(f"%{escape_like(text)}%", escape="\\")),
+        select(Transaction.id).where(*live, Transaction.payee_id.in_(select(matched_payees.c.id))),
+    ).subquery()
+
+    score = func.greatest(
+        func.ts_rank(Transaction.memo_tsv, tsquery, 32),
+        func.coalesce(func.word_similarity(text, Transaction.memo), 0),
+        func.coalesce(matched_payees.c.similarity, 0),
+    ).label("score")
+
+    return (
+        db.query(Transaction, Payee.name.label("payee_name"), score)
+        .join(candidates, candidates.c.id == Transaction.id)
+        .outerjoin(Payee, Payee.id == Transaction.payee_id)
+        .outerjoin(matched_payees, matched_payees.c.id == Transaction.payee_id)
+        .filter(Transaction.budget_id == budget_id)
+        .order_by(score.desc(), Transaction.date.desc())
+        .limit(limit)
+        .all()
+    )
@@ -0,0 +1,278 @@
+from collections import OrderedDict
+from datetime import date
+from threading import Lock
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+from app.core.single_flight import single_flight
+from app.models.account import Account
+from app.models.payee import Payee
+from app.models.server_knowledge import ServerKnowledge
+from app.models.transaction import Transaction
+
+# Entities whose server knowledge invalidates the cached daily series:
+# transactions for the amounts, accounts for deletions, payees for transfers
+SERIES_ENTITIES = ["transactions", "accounts", "payees"]
+
+SERIES_NAMES = ["balance", "spending", "income"]
+
+def lttb(values: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling of an evenly spaced series.
+
+    The first and last points are kept. The points in between are split into
+    threshold - 2 buckets, and each bucket keeps the point forming the largest
+    triangle with the point kept from the previous bucket and the average of
+    the next bucket, which preserves the peaks and dips a chart must show.
+    The area is linear in the previous pick, so its per-point terms are
+    computed for all buckets at once; the selection then walks the points
+    once, since each bucket depends on the previous one's pick.
+
+    Args:
+        values (np.ndarray): Series values, one per day
+        threshold (int): Number of points to keep
+
+    Returns:
+        np.ndarray: Indices of the kept points, ascending
+    """
+    n = len(values)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1][:threshold], dtype=np.int64)
+
+    values = values.astype(np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    counts = np.diff(edges)
+    next_y = np.append(np.add.reduceat(values[:-1], edges[:-1]) / counts, values[-1])
+    next_x = np.append((edges[:-1] + edges[1:] - 1) / 2, n - 1)
+
+    # Twice the area of the triangle from the previous pick (ax, ay) over point
+    # (x, y) to the next bucket's average (nx, ny) is |ax * a + ay * b + c|,
+    # with a = y - ny, b = nx - x and c = x * ny - nx * y
+    x = np.arange(1, n - 1, dtype=np.float64)
+    y = values[1:n - 1]
+    owner = np.repeat(np.arange(1, threshold - 1), counts)
+    nx, ny = next_x[owner], next_y[owner]
+    a, b, c = (y - ny).tolist(), (nx - x).tolist(), (x * ny - nx * y).tolist()
+
+    # Buckets hold a handful of points, so plain Python beats a numpy call per bucket
+    points = values.tolist()
+    bounds = edges.tolist()
+    selected = [0]
+    anchor = 0
+    for bucket in range(threshold - 2):
+        ax, ay = anchor, points[anchor]
+        best, pick = -1.0, bounds[bucket]
+        for i in range(bounds[bucket] - 1, bounds[bucket + 1] - 1):
+            area = abs(ax * a[i] + ay * b[i] + c[i])
+            if area > best:
+                best, pick = area, i + 1
+        anchor = pick
+        selected.append(anchor)
+    selected.append(n - 1)
+    return np.array(selected, dtype=np.int64)
+
+def min_max(values: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Bucketed min/max downsampling: the lowest and highest point of each of
+    (threshold - 2) / 2 equal buckets, plus the first and last point, fully
+    vectorized. Below four points there is no room for a bucket's pair, so
+    the series is downsampled with LTTB instead.
+
+    Args:
+        values (np.ndarray): Series values, one per day
+        threshold (int): Number of points to keep, at most
+
+    Returns:
+        np.ndarray: Indices of the kept points, ascending
+    """
+    n = len(values)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 4:
+        return lttb(values, threshold)
+
+    edges = np.linspace(0, n, (threshold - 2) // 2 + 1).astype(np.int64)
+    buckets = np.repeat(np.arange(len(edges) - 1), np.diff(edges))
+    # Sorted by bucket, then value: each bucket's run starts with its minimum and ends with its maximum
+    order = np.lexsort((values, buckets))
+    return np.unique(np.concatenate(([0, n - 1], order[edges[:-1]], order[edges[1:] - 1])))
+
+DOWNSAMPLERS = {"lttb": lttb, "minmax": min_max}
+
+class DailySeries:
+    """Dense daily balance, spending and income of a budget or account, from its first to its last transaction."""
+
+    def __init__(self, knowledge, first_day, columns):
+        self.knowledge = knowledge
+        self.first_day = first_day
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns["balance"])
+
+class TimeSeriesService:
+    """
+    Chart-ready time series of a budget, downsampled server-side.
+
+    Daily balance, spending and income are aggregated per day in SQL and
+    expanded to dense arrays once per budget (or account) and server
+    knowledge. Requests then only slice their date range and downsample it
+    to the requested number of points, and the downsampled results are
+    cached too, so a dashboard refresh without a sync costs one knowledge
+    lookup.
+    """
+
+    def __init__(self, max_entries: int = 64, max_results: int = 256):
+        """
+        Initialize the time series service.
+
+        Args:
+            max_entries (int): Maximum number of cached daily series
+            max_results (int): Maximum number of cached downsampled results
+        """
+        self.max_entries = max_entries
+        self.max_results = max_results
+        self._cache = OrderedDict()
+        self._results = OrderedDict()
+        self._lock = Lock()
+
+    def _knowledge(self, db: Session, budget_id: str):
+        rows = db.execute(
+            select(ServerKnowledge.entity_type, ServerKnowledge.knowledge)
+            .where(ServerKnowledge.budget_id == budget_id, ServerKnowledge.entity_type.in_(SERIES_ENTITIES))
+        ).all()
+        return tuple(dict(rows).get(entity) for entity in SERIES_ENTITIES)
+
+    def _load(self, db: Session, budget_id: str, account_id: Optional[str], knowledge):
+        """Aggregate the transactions per day and expand them to dense daily arrays."""
+        not_transfer = Payee.transfer_account_id.is_(None)
+        query = (
+            select(
+                Transaction.date,
+                func.sum(Transaction.amount),
+                func.coalesce(func.sum(Transaction.amount).filter(and_(Transaction.amount < 0, not_transfer)), 0),
+                func.coalesce(func.sum(Transaction.amount).filter(and_(Transaction.amount > 0, not_transfer)), 0)
+            )
+            .join(Account, Account.id == Transaction.account_id)
+            .outerjoin(Payee, Payee.id == Transaction.payee_id)
+            .where(Transaction.budget_id == budget_id, Transaction.deleted == False, Account.deleted == False)
+        )
+        if account_id:
+            query = query.where(Transaction.account_id == account_id)
+        rows = db.execute(query.group_by(Transaction.date).order_by(Transaction.date)).all()
+
+        if not rows:
+            empty = np.zeros(0, dtype=np.int64)
+            return DailySeries(knowledge, None, {name: empty for name in SERIES_NAMES})
+        days, net, outflow, inflow = zip(*rows)
+        days = np.array([day[:10] for day in days], dtype="datetime64[D]")
+        offsets = (days - days[0]).astype(np.int64)
+        length = int(offsets[-1]) + 1
+
+        def dense(values):
+            column = np.zeros(length, dtype=np.int64)
+            np.add.at(column, offsets, np.array(values, dtype=np.int64))
+            return column
+
+        return DailySeries(knowledge, days[0], {
+            "balance": np.cumsum(dense(net)),
+            "spending": -dense(outflow),
+            "income": dense(inflow),
+        })
+
+    def _daily(self, db: Session, budget_id: str, account_id: Optional[str], knowledge) -> DailySeries:
+        key = (budget_id, account_id)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached.knowledge == knowledge:
+                self._cache.move_to_end(key)
+                return cached
+
+        def load():
+            series = self._load(db, budget_id, account_id, knowledge)
+            with self._lock:
+                self._cache[key] = series
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+            return series
+
+        # Concurrent misses, e.g. every chart of a dashboard right after a sync, load once
+        return single_flight.do(("daily-series", key, knowledge), load)
+
+    def series(
+        self,
+        db: Session,
+        budget_id: str,
+        names: list,
+        points: int = 500,
+        method: str = "lttb",
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        account_id: Optional[str] = None
+    ):
+        """
+        Daily series of a budget, or of one of its accounts, downsampled to at most points points.
+
+        Args:
+            db (Session): Database session
+            budget_id (str): The budget ID
+            names (list): Series to return: "balance", "spending" and/or "income"
+            points (int): Most points per series
+            method (str): "lttb" or "minmax"
+            start_date (date, optional): First day of the series
+            end_date (date, optional): Last day of the series
+            account_id (str, optional): Restrict the series to one account
+
+        Returns:
+            dict: Per series its dates, values and number of daily points before downsampling
+        """
+        knowledge = self._knowledge(db, budget_id)
+        key = (budget_id, account_id, knowledge, tuple(names), points, method, start_date, end_date)
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+
+        daily = self._daily(db, budget_id, account_id, knowledge)
+        start, end = 0, len(daily)
+        if daily.first_day is not None:
+            if start_date:
+                start = max(int((np.datetime64(start_date, "D") - daily.first_day).astype(np.int64)), 0)
+            if end_date:
+                end = min(int((np.datetime64(end_date, "D") - daily.first_day).astype(np.int64)) + 1, end)
+        end = max(end, start)
+
+        downsample = DOWNSAMPLERS[method]
+        series = []
+        for name in names:
+            values = daily.columns[name][start:end]
+            kept = downsample(values, points)
+            dates = daily.first_day + start + kept if len(kept) else np.zeros(0, dtype="datetime64[D]")
+            series.append({
+                "name": name,
+                "total_points": len(values),
+                "dates": np.datetime_as_string(dates).tolist(),
+                "values": values[kept].tolist(),
+            })
+        result = {
+            "budget_id": budget_id,
+            "account_id": account_id,
+            "server_knowledge": knowledge[0],
+            "method": method,
+            "points": points,
+            "series": series,
+        }
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+        return result
+
+timeseries_service = TimeSeriesService()
@@ -0,0 +1,80 @@
+"""
+Scratch budget scaffolding shared by the benchmarks: a session whose scratch
+budget is removed again on exit, seeding it with SQL statements in the
+database configured by DATABASE_URL (tables must already exist, i.e. the sync
+service has run once), and timing calls.
+"""
+import statistics
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import text
+
+from app.db.session import SessionLocal
+
+SEED_BUDGET = "INSERT INTO budgets (id, name, currency_format_iso_code) VALUES (:budget_id, :budget_name, 'USD')"
+
+# Everything a scratch budget may have seeded, children before their parents
+CLEANUP = [
+    "DELETE FROM server_knowledge WHERE budget_id = :budget_id",
+    "DELETE FROM category_month_history WHERE budget_id = :budget_id",
+    "DELETE FROM month_history WHERE budget_id = :budget_id",
+    "DELETE FROM subtransactions WHERE transaction_id IN (SELECT id FROM transactions WHERE budget_id = :budget_id)",
+    "DELETE FROM transactions WHERE budget_id = :budget_id",
+    "DELETE FROM payees WHERE budget_id = :budget_id",
+    "DELETE FROM category_months WHERE budget_id = :budget_id",
+    "DELETE FROM months WHERE budget_id = :budget_id",
+    "DELETE FROM categories WHERE category_group_id IN (SELECT id FROM category_groups WHERE budget_id = :budget_id)",
+    "DELETE FROM category_groups WHERE budget_id = :budget_id",
+    "DELETE FROM accounts WHERE budget_id = :budget_id",
+    "DELETE FROM budgets WHERE id = :budget_id",
+]
+
+@contextmanager
+def scratch_session(budget_id):
+    """A session for benchmarking a scratch budget, whose rows are deleted on exit, even after a failure."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.rollback()
+        for statement in CLEANUP:
+            db.execute(text(statement), {"budget_id": budget_id})
+        db.commit()
+        db.close()
+
+def seed(db, budget_id, budget_name, statements, params=None, analyze=("transactions",)):
+    """
+    Insert the scratch budget and run the seed statements, then analyze the seeded tables.
+
+    Args:
+        db (Session): Session from scratch_session
+        budget_id (str): The scratch budget ID, bound as :budget_id
+        budget_name (str): Name of the scratch budget
+        statements (list): SQL statements inserting the budget's rows
+        params (dict, optional): Further parameters of the statements
+        analyze (tuple): Tables to analyze after seeding, all tables if empty
+
+    Returns:
+        float: Seconds the seeding took
+    """
+    started = time.perf_counter()
+    params = {"budget_id": budget_id, **(params or {})}
+    db.execute(text(SEED_BUDGET), {"budget_id": budget_id, "budget_name": budget_name})
+    for statement in statements:
+        db.execute(text(statement), params)
+    db.commit()
+    for statement in [f"ANALYZE {table}" for table in analyze] or ["ANALYZE"]:
+        db.execute(text(statement))
+    return time.perf_counter() - started
+
+def timed(callable_):
+    """Call callable_, returning its result and how long it took in milliseconds."""
+    started = time.perf_counter()
+    result = callable_()
+    return result, (time.perf_counter() - started) * 1000
+
+def summary(timings):
+    """Median and 95th percentile of timings in milliseconds."""
+    timings = sorted(timings)
+    return f"p50 {statistics.median(timings):.2f}ms, p95 {timings[int(len(timings) * 0.95)]:.2f}ms"
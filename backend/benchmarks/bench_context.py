@@ -0,0 +1,125 @@
+"""
+Latency benchmark of the budget context assembly for LLM questions.
+
+Seeds a scratch budget with categories, months and synthetic transactions in
+the database configured by DATABASE_URL (tables must already exist, i.e. the
+sync service has run once), then measures building the cached summaries from
+scratch, assembling context for a set of questions from the warm cache, and
+refreshing the cache after a sync touched one month. Removes the scratch data
+again.
+
+Usage:
+    poetry run python -m benchmarks.bench_context [--transactions 200000] [--months 60] [--max-tokens 2000]
+"""
+import argparse
+
+from sqlalchemy import text
+
+from app.services.context import ContextService
+from benchmarks._scratch import scratch_session, seed, summary, timed
+
+BUDGET_ID = "bench-context"
+
+QUESTIONS = [
+    "How much did I spend on groceries in March?",
+    "Which categories am I overspending in?",
+    "What were my biggest payees last month?",
+    "How is my emergency fund goal going?",
+    "Compare dining out in 2023-06 and 2023-07",
+]
+
+SEED = [
+    """
+    INSERT INTO accounts (id, budget_id, name, type, on_budget, closed, balance, deleted)
+    VALUES (:budget_id || '-account', :budget_id, 'Checking', 'checking', true, false, 0, false)
+    """,
+    """
+    INSERT INTO category_groups (id, budget_id, name, hidden, deleted)
+    SELECT :budget_id || '-group-' || g, :budget_id, 'Group ' || g, false, false FROM generate_series(0, 7) AS g
+    """,
+    """
+    INSERT INTO categories (id, category_group_id, name, hidden, budgeted, activity, balance, deleted)
+    SELECT :budget_id || '-category-' || c, :budget_id || '-group-' || (c % 8),
+           (ARRAY['Groceries', 'Dining Out', 'Rent', 'Fuel', 'Emergency Fund', 'Utilities', 'Fun Money',
+                  'Insurance'])[1 + c % 8] || ' ' || c,
+           false, 100000, -80000, 20000, false
+    FROM generate_series(0, 79) AS c
+    """,
+    """
+    INSERT INTO months (budget_id, month, income, budgeted, activity, to_be_budgeted, age_of_money)
+    SELECT :budget_id, to_char(DATE '2024-12-01' - make_interval(months => m), 'YYYY-MM-DD'),
+           5000000, 4800000, -4500000, 200000, 30
+    FROM generate_series(0, :months - 1) AS m
+    """,
+    """
+    INSERT INTO category_months (budget_id, month, category_id, budgeted, activity, balance)
+    SELECT :budget_id, to_char(DATE '2024-12-01' - make_interval(months => m), 'YYYY-MM-DD'),
+           :budget_id || '-category-' || c, 60000, -50000 - (c * 997 + m * 31) % 40000, 10000
+    FROM generate_series(0, :months - 1) AS m, generate_series(0, 79) AS c
+    """,
+    """
+    INSERT INTO payees (id, budget_id, name, deleted)
+    SELECT :budget_id || '-payee-' || p, :budget_id, 'Payee ' || p, false FROM generate_series(0, 499) AS p
+    """,
+    """
+    INSERT INTO transactions (id, budget_id, account_id, category_id, payee_id, date, amount, memo,
+                              cleared, approved, deleted, server_knowledge)
+    SELECT :budget_id || '-txn-' || i, :budget_id, :budget_id || '-account', :budget_id || '-category-' || (i % 80),
+           :budget_id || '-payee-' || (i % 500),
+           to_char(DATE '2024-12-31' - (i % (:months * 30)), 'YYYY-MM-DD'), -(i % 200000),
+           'memo ' || (i % 5000), 'cleared', true, false, 1
+    FROM generate_series(1, :transactions) AS i
+    """,
+    """
+    INSERT INTO server_knowledge (budget_id, entity_type, knowledge)
+    SELECT :budget_id, entity, 1 FROM unnest(ARRAY['months', 'categories', 'payees', 'transactions']) AS entity
+    """,
+]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--transactions", type=int, default=200000)
+    parser.add_argument("--months", type=int, default=60)
+    parser.add_argument("--max-tokens", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    params = {"budget_id": BUDGET_ID, "transactions": args.transactions, "months": args.months}
+
+    with scratch_session(BUDGET_ID) as db:
+        seconds = seed(db, BUDGET_ID, "Context benchmark", SEED, params)
+        print(f"Seeded {args.transactions} transactions over {args.months} months in {seconds:.1f}s")
+
+        service = ContextService()
+        context, build_ms = timed(lambda: service.summaries(db, BUDGET_ID))
+        print(f"Cold build: {build_ms:.0f}ms for {len(context.pieces)} summaries")
+
+        timings = []
+        for _ in range(args.repeat):
+            for question in QUESTIONS:
+                result, assemble_ms = timed(
+                    lambda: service.assemble(db, BUDGET_ID, question, args.max_tokens, transactions=0)
+                )
+                timings.append(assemble_ms)
+        print(
+            f"Warm assembly: {summary(timings)} "
+            f"({result['tokens']} of {args.max_tokens} tokens, {len(result['pieces'])} pieces)"
+        )
+
+        # A sync touching one month only rebuilds that month's transaction totals
+        db.execute(
+            text(
+                "UPDATE transactions SET amount = amount - 1000, server_knowledge = 2 "
+                "WHERE budget_id = :budget_id AND date LIKE '2024-12-%'"
+            ),
+            params
+        )
+        db.execute(
+            text("UPDATE server_knowledge SET knowledge = 2 WHERE budget_id = :budget_id AND entity_type = 'transactions'"),
+            params
+        )
+        db.commit()
+        _, refresh_ms = timed(lambda: service.summaries(db, BUDGET_ID))
+        print(f"Refresh after a one-month delta: {refresh_ms:.0f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Latency benchmark of the dimension cache against joining the names in SQL.
+
+Seeds a scratch budget with accounts, category groups, categories, payees and
+synthetic transactions in the database configured by DATABASE_URL (tables
+must already exist, i.e. the sync service has run once). Then it reads pages
+of transactions with their account, payee, category and category group names
+two ways: joined in SQL, and selected plain with the names added from the
+dimension cache. It also times loading the cache cold and after a payee
+change. Removes the scratch data again.
+
+Usage:
+    poetry run python -m benchmarks.bench_dimensions [--transactions 200000] [--payees 5000] [--limit 1000]
+"""
+import argparse
+import statistics
+
+from sqlalchemy import select, text
+
+from app.core.serialization import rows_as_dicts
+from app.models.account import Account
+from app.models.category import Category, CategoryGroup
+from app.models.payee import Payee
+from app.models.transaction import Transaction
+from app.api.api_v1.endpoints.transactions import TRANSACTION_COLUMNS
+from app.services.dimensions import DimensionCache
+from benchmarks._scratch import scratch_session, seed, summary, timed
+
+BUDGET_ID = "bench-dimensions"
+
+SEED = [
+    """
+    INSERT INTO accounts (id, budget_id, name, type, on_budget, closed, balance, deleted)
+    SELECT :budget_id || '-account-' || a, :budget_id, 'Account ' || a, 'checking', true, false, 0, false
+    FROM generate_series(0, 19) AS a
+    """,
+    """
+    INSERT INTO category_groups (id, budget_id, name, hidden, deleted)
+    SELECT :budget_id || '-group-' || g, :budget_id, 'Group ' || g, false, false FROM generate_series(0, 9) AS g
+    """,
+    """
+    INSERT INTO categories (id, category_group_id, name, hidden, deleted)
+    SELECT :budget_id || '-category-' || c, :budget_id || '-group-' || (c % 10), 'Category ' || c, false, false
+    FROM generate_series(0, 99) AS c
+    """,
+    """
+    INSERT INTO payees (id, budget_id, name, deleted)
+    SELECT :budget_id || '-payee-' || p, :budget_id, 'Payee ' || p, false FROM generate_series(0, :payees - 1) AS p
+    """,
+    """
+    INSERT INTO transactions (id, budget_id, account_id, category_id, payee_id, date, amount, memo,
+                              cleared, approved, deleted, server_knowledge)
+    SELECT :budget_id || '-txn-' || i, :budget_id, :budget_id || '-account-' || (i % 20),
+           :budget_id || '-category-' || (i % 100), :budget_id || '-payee-' || (i % :payees),
+           to_char(DATE '2024-12-31' - (i % 1500), 'YYYY-MM-DD'), -(i % 200000),
+           'memo ' || (i % 5000), 'cleared', true, false, 1
+    FROM generate_series(1, :transactions) AS i
+    """,
+    """
+    INSERT INTO server_knowledge (budget_id, entity_type, knowledge)
+    SELECT :budget_id, entity, 1 FROM unnest(ARRAY['accounts', 'categories', 'payees', 'transactions']) AS entity
+    """,
+]
+
+def page(offset, limit):
+    return (
+        select(*TRANSACTION_COLUMNS)
+        .where(Transaction.budget_id == BUDGET_ID, Transaction.deleted == False)
+        .order_by(Transaction.date.desc(), Transaction.id)
+        .offset(offset)
+        .limit(limit)
+    )
+
+def joined_page(offset, limit):
+    """The names joined in SQL, as the endpoints would without the cache."""
+    return (
+        select(
+            *TRANSACTION_COLUMNS,
+            Account.name.label("account_name"),
+            Payee.name.label("payee_name"),
+            Category.name.label("category_name"),
+            CategoryGroup.name.label("category_group_name")
+        )
+        .outerjoin(Account, Account.id == Transaction.account_id)
+        .outerjoin(Payee, Payee.id == Transaction.payee_id)
+        .outerjoin(Category, Category.id == Transaction.category_id)
+        .outerjoin(CategoryGroup, CategoryGroup.id == Category.category_group_id)
+        .where(Transaction.budget_id == BUDGET_ID, Transaction.deleted == False)
+        .order_by(Transaction.date.desc(), Transaction.id)
+        .offset(offset)
+        .limit(limit)
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--transactions", type=int, default=200000)
+    parser.add_argument("--payees", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    params = {"budget_id": BUDGET_ID, "transactions": args.transactions, "payees": args.payees}
+
+    with scratch_session(BUDGET_ID) as db:
+        seconds = seed(db, BUDGET_ID, "Dimension benchmark", SEED, params, analyze=())
+        print(f"Seeded {args.transactions} transactions and {args.payees} payees in {seconds:.1f}s")
+
+        cache = DimensionCache()
+        dimensions, cold_ms = timed(lambda: cache.get(db, BUDGET_ID))
+        print(
+            f"Cold cache load: {cold_ms:.1f}ms for {len(dimensions.accounts)} accounts, "
+            f"{len(dimensions.category_groups)} groups, {len(dimensions.categories)} categories, "
+            f"{len(dimensions.payees)} payees"
+        )
+
+        offsets = [(i * 7919) % max(args.transactions - args.limit, 1) for i in range(args.repeat)]
+        joined, cached = [], []
+        for offset in offsets:
+            _, ms = timed(lambda: rows_as_dicts(db.execute(joined_page(offset, args.limit))))
+            joined.append(ms)
+            _, ms = timed(lambda: cache.get(db, BUDGET_ID).enrich(rows_as_dicts(db.execute(page(offset, args.limit)))))
+            cached.append(ms)
+        print(f"Pages of {args.limit} with names joined in SQL: {summary(joined)}")
+        print(f"Pages of {args.limit} with names from the cache: {summary(cached)}")
+        print(f"Saved per page: {statistics.median(joined) - statistics.median(cached):.2f}ms at the median")
+
+        # A sync that renamed a payee reloads the payees only
+        db.execute(text("UPDATE payees SET name = name || ' renamed' WHERE id = :budget_id || '-payee-0'"), params)
+        db.execute(
+            text("UPDATE server_knowledge SET knowledge = 2 WHERE budget_id = :budget_id AND entity_type = 'payees'"),
+            params
+        )
+        db.commit()
+        _, reload_ms = timed(lambda: cache.get(db, BUDGET_ID))
+        print(f"Reload after a payee change: {reload_ms:.1f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Throughput benchmark of the columnar export against the JSON list path.
+
+Seeds a scratch budget with synthetic transactions in the database configured
+by DATABASE_URL (tables must already exist, i.e. the sync service has run
+once), exports them as JSON (the transaction list's fast path, without its
+page limit), Parquet and Arrow IPC, and removes the scratch data again.
+Reports rows per second, bytes per row and peak memory: Python heap from
+tracemalloc plus Arrow buffers sampled after every batch.
+
+Usage:
+    poetry run python -m benchmarks.bench_export [--transactions 1000000] [--batch-size 50000]
+"""
+import argparse
+import time
+import tracemalloc
+
+import pyarrow as pa
+from sqlalchemy import select
+
+from app.api.api_v1.endpoints.transactions import TRANSACTION_COLUMNS
+from app.core.serialization import FastJSONResponse, rows_as_dicts
+from app.db.session import engine
+from app.models.transaction import Transaction
+from app.services.export import EXPORT_TABLES, encode_batches, record_batches
+from benchmarks._scratch import scratch_session, seed
+
+BUDGET_ID = "bench-export"
+
+SEED = [
+    """
+    INSERT INTO accounts (id, budget_id, name, type, on_budget, closed, balance, deleted)
+    SELECT :budget_id || '-account-' || i, :budget_id, 'Account ' || i, 'checking', true, false, 0, false
+    FROM generate_series(0, 4) AS i
+    """,
+    "INSERT INTO category_groups (id, budget_id, name, hidden, deleted) VALUES (:budget_id || '-group', :budget_id, 'Group', false, false)",
+    """
+    INSERT INTO categories (id, category_group_id, name, hidden, deleted)
+    SELECT :budget_id || '-category-' || i, :budget_id || '-group', 'Category ' || i, false, false
+    FROM generate_series(0, 79) AS i
+    """,
+    """
+    INSERT INTO payees (id, budget_id, name, deleted)
+    SELECT :budget_id || '-payee-' || i, :budget_id, 'Payee ' || i, false
+    FROM generate_series(0, 1999) AS i
+    """,
+    """
+    INSERT INTO transactions (id, budget_id, account_id, category_id, payee_id, date, amount, memo,
+                              cleared, approved, deleted)
+    SELECT :budget_id || '-txn-' || i, :budget_id, :budget_id || '-account-' || (i % 5),
+           :budget_id || '-category-' || (i % 80), :budget_id || '-payee-' || (i % 2000),
+           (DATE '2015-01-01' + (i % 3650))::text, -(i % 200000),
+           CASE WHEN i % 3 = 0 THEN NULL ELSE 'memo ' || (i % 5000) END,
+           'cleared', true, false
+    FROM generate_series(1, :transactions) AS i
+    """,
+]
+
+def json_export(batch_size):
+    with engine.connect() as conn:
+        result = conn.execute(
+            select(*TRANSACTION_COLUMNS)
+            .where(Transaction.budget_id == BUDGET_ID, Transaction.deleted == False)
+            .order_by(Transaction.date)
+        )
+        yield FastJSONResponse({"transactions": rows_as_dicts(result)}).body
+
+def columnar_export(file_format, batch_size):
+    table = EXPORT_TABLES["transactions"]
+    with engine.connect() as conn:
+        yield from encode_batches(record_batches(conn, table, BUDGET_ID, batch_size=batch_size), table.schema, file_format)
+
+def measure(export, batch_size, rows):
+    """Time an export, then rerun it under tracemalloc for its peak memory."""
+    started = time.perf_counter()
+    size = sum(len(chunk) for chunk in export(batch_size))
+    seconds = time.perf_counter() - started
+
+    arrow_peak = 0
+    def sampled(chunks):
+        nonlocal arrow_peak
+        for chunk in chunks:
+            arrow_peak = max(arrow_peak, pa.total_allocated_bytes())
+            yield chunk
+
+    tracemalloc.start()
+    # Chunks are dropped as they are produced, like a streamed response
+    for _ in sampled(export(batch_size)):
+        pass
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows / seconds, size / rows, (python_peak + arrow_peak) / 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--transactions", type=int, default=1000000)
+    parser.add_argument("--batch-size", type=int, default=50000)
+    args = parser.parse_args()
+
+    with scratch_session(BUDGET_ID) as db:
+        seconds = seed(db, BUDGET_ID, "Export benchmark", SEED, {"transactions": args.transactions})
+        print(f"Seeded {args.transactions} transactions in {seconds:.1f}s")
+
+        print(f"{'format':<8} {'rows/s':>12} {'bytes/row':>10} {'peak MB':>8}")
+        for name, export in [
+            ("json", json_export),
+            ("parquet", lambda batch_size: columnar_export("parquet", batch_size)),
+            ("arrow", lambda batch_size: columnar_export("arrow", batch_size)),
+        ]:
+            rows_per_second, bytes_per_row, peak_mb = measure(export, args.batch_size, args.transactions)
+            print(f"{name:<8} {rows_per_second:>12,.0f} {bytes_per_row:>10.1f} {peak_mb:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Latency benchmark of the vectorized cash-flow forecast.
+
+Usage:
+    poetry run python -m benchmarks.bench_forecast [--schedules 500] [--days 365]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.forecast import FREQUENCY_DAYS, FREQUENCY_MONTHS, project_cash_flow
+
+def synthetic_schedules(count, accounts, categories, rng):
+    """Schedules with a realistic mix of frequencies, a quarter of them split in three."""
+    frequencies = np.array(list(FREQUENCY_DAYS) + list(FREQUENCY_MONTHS) + ["twiceAMonth", "never"], dtype=object)
+    weights = np.array([1, 8, 4, 2, 30, 3, 4, 1, 2, 5, 1, 6, 2], dtype=float)
+    first = np.datetime64("2024-01-01") + rng.integers(0, 60, size=count)
+    schedules = {
+        "first": first,
+        "anchor_day": rng.integers(1, 32, size=count),
+        "frequency": rng.choice(frequencies, size=count, p=weights / weights.sum()),
+    }
+
+    splits = np.where(rng.random(count) < 0.25, 3, 1)
+    schedule = np.repeat(np.arange(count), splits)
+    account = rng.integers(0, accounts, size=count)[schedule]
+    transfer = np.where(rng.random(len(schedule)) < 0.05, rng.integers(0, accounts, size=len(schedule)), -1)
+    lines = {
+        "schedule": schedule,
+        "account": account,
+        "category": np.where(transfer >= 0, -1, rng.integers(0, categories, size=len(schedule))),
+        "transfer_account": transfer,
+        "amount": -rng.integers(1000, 500000, size=len(schedule)),
+    }
+    return schedules, lines
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--schedules", type=int, default=500)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--accounts", type=int, default=20)
+    parser.add_argument("--categories", type=int, default=80)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    schedules, lines = synthetic_schedules(args.schedules, args.accounts, args.categories, rng)
+    start = np.datetime64("2024-03-01")
+
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        account_flows, category_flows = project_cash_flow(
+            schedules, lines, start, args.days, args.accounts, args.categories
+        )
+        timings.append(time.perf_counter() - started)
+
+    timings = np.array(timings) * 1000
+    print(
+        f"{args.schedules} schedules ({len(lines['schedule'])} lines) over {args.days} days: "
+        f"p50 {np.percentile(timings, 50):.2f}ms, p95 {np.percentile(timings, 95):.2f}ms, "
+        f"projected outflow {-account_flows.sum() / 1000:,.0f}"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark of point-in-time reads of month history.
+
+Seeds a scratch budget's month_history and category_month_history in the
+database configured by DATABASE_URL (tables must already exist, i.e. the
+sync service has run once) with the versions daily syncs leave behind: a
+category month changes on some days of its month and never afterwards.
+Then it reads months as they were at random points in time, the way the
+month snapshot endpoint does, prints the plan of that read, and compares the
+number of stored versions with keeping a full snapshot per sync. Removes the
+scratch data again.
+
+Usage:
+    poetry run python -m benchmarks.bench_month_history [--months 120] [--categories 200]
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, select, text
+
+from app.core.serialization import rows_as_dicts
+from app.models.month import CategoryMonthHistory, MonthHistory
+from app.api.api_v1.endpoints.budgets import CATEGORY_MONTH_VERSION_COLUMNS, MONTH_VERSION_COLUMNS
+from benchmarks._scratch import scratch_session, seed, summary, timed
+
+BUDGET_ID = "bench-month-history"
+
+# A version on the first day of each month and on the days its values changed, each valid until the next
+SEED = [
+    """
+    INSERT INTO month_history (budget_id, month, valid_from, valid_to, knowledge, to_be_budgeted, age_of_money,
+                               income, budgeted, activity)
+    SELECT :budget_id, to_char(DATE '2010-01-01' + make_interval(months => m), 'YYYY-MM-DD'), valid_from,
+           lead(valid_from) OVER (PARTITION BY m ORDER BY valid_from), d, 0, 30, 500000, 400000, -d * 1000
+    FROM generate_series(0, :months - 1) AS m,
+         LATERAL (
+             SELECT d, TIMESTAMP '2010-01-01' + make_interval(months => m, days => d) AS valid_from
+             FROM generate_series(0, 29) AS d WHERE d % 3 = 0
+         ) AS versions
+    """,
+    """
+    INSERT INTO category_month_history (budget_id, month, category_id, valid_from, valid_to, knowledge, budgeted,
+                                        activity, balance)
+    SELECT :budget_id, to_char(DATE '2010-01-01' + make_interval(months => m), 'YYYY-MM-DD'),
+           :budget_id || '-category-' || c, valid_from,
+           lead(valid_from) OVER (PARTITION BY m, c ORDER BY valid_from), d, 10000, -d * 100, 10000 - d * 100
+    FROM generate_series(0, :months - 1) AS m,
+         generate_series(0, :categories - 1) AS c,
+         LATERAL (
+             SELECT d, TIMESTAMP '2010-01-01' + make_interval(months => m, days => d) AS valid_from
+             FROM generate_series(0, 29) AS d WHERE d = 0 OR (c + d) % 5 = 0
+         ) AS versions
+    """,
+]
+
+def valid(model, as_of):
+    return and_(model.valid_from <= as_of, or_(model.valid_to.is_(None), model.valid_to > as_of))
+
+def snapshot(db, month_key, as_of):
+    """The month and its categories as of a point in time, as the endpoint reads them."""
+    month = rows_as_dicts(db.execute(
+        select(*MONTH_VERSION_COLUMNS)
+        .where(MonthHistory.budget_id == BUDGET_ID, MonthHistory.month == month_key, valid(MonthHistory, as_of))
+    ))
+    categories = rows_as_dicts(db.execute(
+        select(*CATEGORY_MONTH_VERSION_COLUMNS)
+        .where(
+            CategoryMonthHistory.budget_id == BUDGET_ID,
+            CategoryMonthHistory.month == month_key,
+            valid(CategoryMonthHistory, as_of)
+        )
+        .order_by(CategoryMonthHistory.category_id)
+    ))
+    return month, categories
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--months", type=int, default=120)
+    parser.add_argument("--categories", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    params = {"budget_id": BUDGET_ID, "months": args.months, "categories": args.categories}
+
+    with scratch_session(BUDGET_ID) as db:
+        seconds = seed(
+            db, BUDGET_ID, "Month history benchmark", SEED, params,
+            analyze=("month_history", "category_month_history")
+        )
+        versions = db.execute(
+            text("SELECT count(*) FROM category_month_history WHERE budget_id = :budget_id"), params
+        ).scalar()
+        print(f"Seeded {versions} category month versions in {seconds:.1f}s")
+
+        # Every daily sync during a month fetches it again
+        snapshots = args.months * args.categories * 30
+        print(
+            f"Stored versions: {versions} ({versions / (args.months * args.categories):.1f} per category month), "
+            f"full snapshots per sync: {snapshots} ({snapshots / versions:.1f}x more rows)"
+        )
+
+        rng = random.Random(0)
+        first = datetime(2010, 1, 1)
+        timings = []
+        for _ in range(args.repeat):
+            month = rng.randrange(args.months)
+            month_key = f"{2010 + month // 12}-{month % 12 + 1:02d}-01"
+            as_of = first + timedelta(days=month * 30.5 + rng.uniform(0, 60))
+            (_, categories), ms = timed(lambda: snapshot(db, month_key, as_of))
+            timings.append(ms)
+            assert len(categories) <= args.categories
+        print(f"Point-in-time month reads ({args.categories} categories): {summary(timings)}")
+
+        plan = db.execute(
+            text(
+                "EXPLAIN SELECT * FROM category_month_history WHERE budget_id = :budget_id AND month = '2015-06-01' "
+                "AND valid_from <= TIMESTAMP '2015-06-15' AND (valid_to IS NULL OR valid_to > TIMESTAMP '2015-06-15')"
+            ),
+            params
+        ).scalars().all()
+        print("Plan of a point-in-time read:")
+        for line in plan:
+            print(f"  {line}")
+
+if __name__ == "__main__":
+    main()
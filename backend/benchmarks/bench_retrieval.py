@@ -0,0 +1,93 @@
+"""
+Recall and latency benchmark of the IVF retrieval index against exact search.
+
+Usage:
+    poetry run python -m benchmarks.bench_retrieval [--vectors 200000] [--queries 200]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app.services.retrieval import IVFIndex
+
+def synthetic_embeddings(count, dimensions, clusters, rng):
+    """Clustered unit vectors, a rough stand-in for real text embeddings."""
+    centers = rng.normal(size=(clusters, dimensions)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=count)
+    vectors = centers[labels] + 0.6 * rng.normal(size=(count, dimensions)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def percentile_ms(timings, percentile):
+    return np.percentile(np.array(timings) * 1000, percentile)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=200000)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--lists", type=int, default=512)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    vectors = synthetic_embeddings(args.vectors, args.dimensions, 400, rng)
+    ids = [f"t{i}" for i in range(args.vectors)]
+    budgets = rng.choice(["budget-a", "budget-b", "budget-c"], size=args.vectors, p=[0.6, 0.3, 0.1]).tolist()
+    dates = (np.datetime64("2020-01-01") + rng.integers(0, 5 * 365, size=args.vectors)).astype(str).tolist()
+    categories = [f"c{value}" for value in rng.integers(0, 60, size=args.vectors)]
+
+    index = IVFIndex(args.dimensions, n_lists=args.lists)
+    started = time.perf_counter()
+    index.train(vectors)
+    trained = time.perf_counter()
+    half = args.vectors // 2
+    index.add(ids[:half], vectors[:half], budgets[:half], dates[:half], categories[:half])
+    # Second half arrives as incremental inserts, like rows added by later syncs
+    for start in range(half, args.vectors, 5000):
+        end = start + 5000
+        index.add(ids[start:end], vectors[start:end], budgets[start:end], dates[start:end], categories[start:end])
+    built = time.perf_counter()
+    print(f"{args.vectors} vectors: train {trained - started:.2f}s, insert {built - trained:.2f}s")
+
+    queries = synthetic_embeddings(args.queries, args.dimensions, 400, rng)
+    scenarios = {
+        "no filter": {},
+        "budget": {"budget_id": "budget-c"},
+        "budget + date range": {"budget_id": "budget-a", "date_from": "2023-03-01", "date_to": "2023-06-01"},
+        "budget + categories": {"budget_id": "budget-b", "category_ids": ["c1", "c2", "c3"]},
+    }
+
+    print(f"{'scenario':<22}{'n_probe':>8}{'recall@k':>10}{'ann p50':>10}{'ann p95':>10}{'exact p50':>11}")
+    for name, filters in scenarios.items():
+        for n_probe in (8, 16, 32):
+            hits, ann_timings, exact_timings = 0, [], []
+            for query in queries:
+                started = time.perf_counter()
+                approximate = index.search(query, args.k, n_probe=n_probe, **filters)
+                ann_timings.append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                exact = index.exact_search(query, args.k, **filters)
+                exact_timings.append(time.perf_counter() - started)
+
+                hits += len({source_id for source_id, _ in approximate} & {source_id for source_id, _ in exact})
+            recall = hits / (args.k * len(queries))
+            print(
+                f"{name:<22}{n_probe:>8}{recall:>10.3f}"
+                f"{percentile_ms(ann_timings, 50):>8.2f}ms{percentile_ms(ann_timings, 95):>8.2f}ms"
+                f"{percentile_ms(exact_timings, 50):>9.2f}ms"
+            )
+
+    path = os.path.join(tempfile.mkdtemp(), "index.npz")
+    started = time.perf_counter()
+    index.save(path)
+    saved = time.perf_counter()
+    IVFIndex.load(path)
+    loaded = time.perf_counter()
+    print(f"persist: save {saved - started:.2f}s, load {loaded - saved:.2f}s, {os.path.getsize(path) / 1e6:.0f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Latency benchmark of ranked transaction search against a naive LIKE scan.
+
+Seeds a scratch budget with synthetic payees and transactions in the database
+configured by DATABASE_URL (tables must already exist, i.e. the unpartitioned
+sync service has run once), times both approaches and removes the scratch
+data again.
+
+Usage:
+    poetry run python -m benchmarks.bench_search [--transactions 1000000] [--repeat 20]
+"""
+import argparse
+
+import numpy as np
+from sqlalchemy import text
+
+from app.services.search import escape_like, search_transactions
+from benchmarks._scratch import scratch_session, seed, timed
+
+BUDGET_ID = "bench-search"
+
+QUERIES = ["coffee", "grocer", "starbuks", "rent payment", "amazn", "gym"]
+
+SEED_ACCOUNT = """
+INSERT INTO accounts (id, budget_id, name, type, on_budget, closed, balance, deleted)
+VALUES ('bench-account', :budget_id, 'Checking', 'checking', true, false, 0, false)
+"""
+
+SEED_PAYEES = """
+INSERT INTO payees (id, budget_id, name, deleted)
+SELECT 'bench-payee-' || i, :budget_id,
+       (ARRAY['Starbucks', 'Whole Foods Market', 'Amazon', 'Shell', 'Landlord', 'Planet Fitness',
+              'Trader Joes', 'Netflix', 'Uber', 'Costco'])[1 + i % 10] || ' #' || i,
+       false
+FROM generate_series(1, :payees) AS i
+"""
+
+SEED_TRANSACTIONS = """
+INSERT INTO transactions (id, budget_id, account_id, payee_id, date, amount, memo, cleared, approved, deleted)
+SELECT 'bench-txn-' || i, :budget_id, 'bench-account', 'bench-payee-' || (1 + i % :payees),
+       (DATE '2015-01-01' + (i % 3650))::text, -(i % 200000),
+       (ARRAY['morning coffee', 'weekly groceries', 'rent payment', 'fuel', 'gym membership',
+              'online order', NULL, 'dinner with friends', 'monthly subscription', 'bulk groceries'])[1 + i % 10]
+           || ' ref ' || md5(i::text),
+       'cleared', true, false
+FROM generate_series(1, :transactions) AS i
+"""
+
+def repeated(callable_, repeat):
+    results = [timed(callable_) for _ in range(repeat)]
+    return np.array([ms for _, ms in results]), results[-1][0]
+
+def naive_search(db, query, limit):
+    return db.execute(
+        text(
+            "SELECT t.id FROM transactions t LEFT JOIN payees p ON p.id = t.payee_id "
+            "WHERE t.budget_id = :budget_id AND NOT t.deleted "
+            "AND (t.memo LIKE :pattern OR p.name LIKE :pattern) "
+            "ORDER BY t.date DESC LIMIT :limit"
+        ),
+        {"budget_id": BUDGET_ID, "pattern": f"%{escape_like(query)}%", "limit": limit}
+    ).all()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--transactions", type=int, default=1000000)
+    parser.add_argument("--payees", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    with scratch_session(BUDGET_ID) as db:
+        seconds = seed(
+            db, BUDGET_ID, "Search benchmark", [SEED_ACCOUNT, SEED_PAYEES, SEED_TRANSACTIONS],
+            {"payees": args.payees, "transactions": args.transactions}, analyze=("transactions", "payees")
+        )
+        print(f"Seeded {args.transactions} transactions in {seconds:.1f}s")
+
+        print(f"{'query':<14} {'search p50':>11} {'search p95':>11} {'LIKE p50':>9} {'LIKE p95':>9} {'hits':>5}")
+        for query in QUERIES:
+            search_ms, rows = repeated(lambda: search_transactions(db, BUDGET_ID, query, limit=args.limit), args.repeat)
+            naive_ms, _ = repeated(lambda: naive_search(db, query, args.limit), args.repeat)
+            print(
+                f"{query:<14} {np.percentile(search_ms, 50):>9.1f}ms {np.percentile(search_ms, 95):>9.1f}ms "
+                f"{np.percentile(naive_ms, 50):>7.1f}ms {np.percentile(naive_ms, 95):>7.1f}ms {len(rows):>5}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Serialization benchmark of the fast JSON path against validating ORM objects
+through the response_model schema.
+
+Both paths start from in-memory data so only serialization is measured:
+the default path from ORM instances with their names already set, as a
+joined query would load them, the fast path from result tuples, adding the
+names from a BudgetDimensions as the endpoint does.
+
+Usage:
+    poetry run python -m benchmarks.bench_serialization [--rows 10000] [--repeat 20]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+
+from app.api.api_v1.endpoints.transactions import TRANSACTION_COLUMNS
+from app.core.serialization import FastJSONResponse
+from app.models.transaction import Transaction as TransactionModel
+from app.schemas.transaction import TransactionList
+from app.services.dimensions import BudgetDimensions, Dimension
+
+NAME_KEYS = ("account_name", "payee_name", "category_name", "category_group_name")
+
+def synthetic_rows(count, rng):
+    """Result tuples in the column order of the fast list path."""
+    dates = (np.datetime64("2020-01-01") + rng.integers(0, 5 * 365, size=count)).astype(str).tolist()
+    amounts = (-rng.integers(100, 500000, size=count)).tolist()
+    return [
+        (
+            f"txn-{index:08d}", dates[index], amounts[index],
+            "weekly groceries" if index % 3 else None,
+            f"account-{index % 8}", f"category-{index % 60}", f"payee-{index % 500}",
+            "cleared", True, None, f"YNAB:{amounts[index]}:{dates[index]}:1"
+        )
+        for index in range(count)
+    ]
+
+def synthetic_dimensions():
+    """Names of the accounts, categories, category groups and payees the synthetic rows refer to."""
+    accounts = Dimension([(f"account-{index}", f"Account {index}") for index in range(8)])
+    groups = Dimension([(f"group-{index}", f"Group {index}") for index in range(6)])
+    categories = Dimension(
+        [(f"category-{index}", f"Category {index}", f"group-{index % 6}") for index in range(60)],
+        parent=groups
+    )
+    payees = Dimension([(f"payee-{index}", f"Payee {index}") for index in range(500)])
+    return BudgetDimensions({}, accounts, groups, categories, payees)
+
+def default_path(transactions):
+    """What FastAPI does for a response_model: validate, encode to builtins, then json.dumps."""
+    validated = TransactionList.model_validate({"transactions": transactions})
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+def fast_path(keys, rows, dimensions):
+    return FastJSONResponse({"transactions": dimensions.enrich([dict(zip(keys, row)) for row in rows])}).body
+
+def timed(callable_, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = callable_()
+        timings.append(time.perf_counter() - started)
+    return np.array(timings) * 1000, body
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    keys = tuple(column.key for column in TRANSACTION_COLUMNS)
+    rows = synthetic_rows(args.rows, rng)
+    dimensions = synthetic_dimensions()
+    transactions = []
+    for row in dimensions.enrich([dict(zip(keys, row)) for row in rows]):
+        transaction = TransactionModel(**{key: row[key] for key in keys})
+        for key in NAME_KEYS:
+            setattr(transaction, key, row[key])
+        transactions.append(transaction)
+
+    default_ms, default_body = timed(lambda: default_path(transactions), args.repeat)
+    fast_ms, fast_body = timed(lambda: fast_path(keys, rows, dimensions), args.repeat)
+    assert json.loads(default_body) == json.loads(fast_body)
+
+    for name, timings in (("response_model", default_ms), ("fast path", fast_ms)):
+        print(
+            f"{name:<15} {args.rows} rows: p50 {np.percentile(timings, 50):7.1f}ms, "
+            f"p95 {np.percentile(timings, 95):7.1f}ms"
+        )
+    print(f"speedup: {np.percentile(default_ms, 50) / np.percentile(fast_ms, 50):.1f}x")
+
+if __name__ == "__main__":
+    main()
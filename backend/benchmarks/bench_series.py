@@ -0,0 +1,89 @@
+"""
+Benchmark of the downsampled time series behind the charts.
+
+Seeds a scratch budget with years of synthetic daily transactions in the
+database configured by DATABASE_URL (tables must already exist, i.e. the
+sync service has run once). Then it measures loading the dense daily series,
+downsampling them with LTTB and with bucketed min/max, and serving a cached
+result. It also compares the response size with sending every daily point.
+Removes the scratch data again.
+
+Usage:
+    poetry run python -m benchmarks.bench_series [--transactions 500000] [--years 10] [--points 500]
+"""
+import argparse
+import statistics
+
+import numpy as np
+import orjson
+
+from app.services.timeseries import DOWNSAMPLERS, SERIES_NAMES, TimeSeriesService
+from benchmarks._scratch import scratch_session, seed, timed
+
+BUDGET_ID = "bench-series"
+
+SEED = [
+    """
+    INSERT INTO accounts (id, budget_id, name, type, on_budget, closed, balance, deleted)
+    SELECT :budget_id || '-account-' || a, :budget_id, 'Account ' || a, 'checking', true, false, 0, false
+    FROM generate_series(0, 4) AS a
+    """,
+    """
+    INSERT INTO payees (id, budget_id, name, deleted)
+    SELECT :budget_id || '-payee-' || p, :budget_id, 'Payee ' || p, false FROM generate_series(0, 199) AS p
+    """,
+    """
+    INSERT INTO transactions (id, budget_id, account_id, payee_id, date, amount, cleared, approved, deleted,
+                              server_knowledge)
+    SELECT :budget_id || '-txn-' || i, :budget_id, :budget_id || '-account-' || (i % 5),
+           :budget_id || '-payee-' || (i % 200),
+           to_char(DATE '2024-12-31' - (i % (:years * 365)), 'YYYY-MM-DD'),
+           CASE WHEN i % 40 = 0 THEN 2500000 ELSE -((i::bigint * 7919) % 150000)::int END,
+           'cleared', true, false, 1
+    FROM generate_series(1, :transactions) AS i
+    """,
+    """
+    INSERT INTO server_knowledge (budget_id, entity_type, knowledge)
+    SELECT :budget_id, entity, 1 FROM unnest(ARRAY['accounts', 'payees', 'transactions']) AS entity
+    """,
+]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--transactions", type=int, default=500000)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--points", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    params = {"budget_id": BUDGET_ID, "transactions": args.transactions, "years": args.years}
+
+    with scratch_session(BUDGET_ID) as db:
+        seconds = seed(db, BUDGET_ID, "Series benchmark", SEED, params)
+        print(f"Seeded {args.transactions} transactions over {args.years} years in {seconds:.1f}s")
+
+        service = TimeSeriesService()
+        knowledge = service._knowledge(db, BUDGET_ID)
+        daily, load_ms = timed(lambda: service._daily(db, BUDGET_ID, None, knowledge))
+        print(f"Daily series load: {load_ms:.0f}ms for {len(daily)} days")
+
+        for method, downsample in DOWNSAMPLERS.items():
+            timings = []
+            for _ in range(args.repeat):
+                _, ms = timed(lambda: [downsample(daily.columns[name], args.points) for name in SERIES_NAMES])
+                timings.append(ms)
+            print(f"Downsampling {len(SERIES_NAMES)} series to {args.points} points with {method}: p50 {statistics.median(timings):.2f}ms")
+
+        result, first_ms = timed(lambda: service.series(db, BUDGET_ID, SERIES_NAMES, args.points))
+        timings = [timed(lambda: service.series(db, BUDGET_ID, SERIES_NAMES, args.points))[1] for _ in range(args.repeat)]
+        print(f"First request: {first_ms:.1f}ms, cached requests: p50 {statistics.median(timings):.2f}ms")
+
+        dates = np.datetime_as_string(daily.first_day + np.arange(len(daily))).tolist()
+        full = {name: {"dates": dates, "values": daily.columns[name].tolist()} for name in SERIES_NAMES}
+        full_bytes, sampled_bytes = len(orjson.dumps(full)), len(orjson.dumps(result))
+        print(
+            f"Response size: {full_bytes / 1024:.0f} KiB with every daily point, "
+            f"{sampled_bytes / 1024:.0f} KiB downsampled ({full_bytes / sampled_bytes:.1f}x smaller)"
+        )
+
+if __name__ == "__main__":
+    main()
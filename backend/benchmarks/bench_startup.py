@@ -0,0 +1,133 @@
+"""
+Cold-start benchmark of the backend and sync containers.
+
+Starts every measurement in a fresh interpreter, as a new Cloud Run instance
+would. For the backend it measures the import time of app.main, the time from
+spawning uvicorn to the first /health response, and the latency of the first
+database request once the instance is up, with the startup warm-up enabled
+and disabled. For the sync service it measures the import time of src.main
+and the time until its services are ready for the first YNAB request. Both
+report which heavy modules were loaded by the import alone.
+
+Uses the database configured by DATABASE_URL (tables must already exist,
+i.e. the sync service has run once). No YNAB request is made.
+
+Usage:
+    poetry run python -m benchmarks.bench_startup [--runs 5] [--settle 1.0] [--sync-dir ../sync]
+        [--sync-python python]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["numpy", "pyarrow", "asyncpg", "psycopg2", "ynab"]
+
+IMPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+print(json.dumps({{
+    "seconds": time.perf_counter() - started,
+    "loaded": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+SYNC_START_SCRIPT = """
+import json, logging, time
+logging.disable(logging.CRITICAL)
+started = time.perf_counter()
+from src.main import start_services
+start_services()
+print(json.dumps({"seconds": time.perf_counter() - started}))
+"""
+
+def run_json(python, script, cwd, env=None):
+    output = subprocess.run(
+        [python, "-c", script], cwd=cwd, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def measure_import(python, module, cwd, runs):
+    results = [run_json(python, IMPORT_SCRIPT.format(module=module, heavy=HEAVY_MODULES), cwd) for _ in range(runs)]
+    return statistics.median(result["seconds"] for result in results), results[-1]["loaded"]
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def get(url, timeout=10):
+    started = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        response.read()
+    return time.perf_counter() - started
+
+def measure_backend_start(warmup, settle):
+    """
+    Spawn uvicorn and time the first /health response, then the first database request.
+
+    Returns:
+        tuple: (seconds to the first response, seconds of the first database request)
+    """
+    port = free_port()
+    env = {**os.environ, "WARMUP_ENABLED": "true" if warmup else "false"}
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+    try:
+        while True:
+            try:
+                get(f"http://127.0.0.1:{port}/health", timeout=1)
+                break
+            except OSError:
+                if server.poll() is not None:
+                    raise RuntimeError("uvicorn exited before answering")
+                time.sleep(0.005)
+        first_response = time.perf_counter() - started
+        time.sleep(settle)
+        first_query = get(f"http://127.0.0.1:{port}/api/v1/budgets/")
+        return first_response, first_query
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--settle", type=float, default=1.0, help="Seconds between the first response and the first database request")
+    parser.add_argument("--sync-dir", default=os.path.join(os.path.dirname(BACKEND_DIR), "sync"))
+    parser.add_argument("--sync-python", default=sys.executable, help="Interpreter with the sync service's dependencies")
+    args = parser.parse_args()
+
+    print(f"Backend, median of {args.runs} runs")
+    seconds, loaded = measure_import(sys.executable, "app.main", BACKEND_DIR, args.runs)
+    print(f"  import app.main:        {seconds * 1000:8.1f} ms  heavy modules loaded: {', '.join(loaded) or 'none'}")
+    for warmup in (True, False):
+        runs = [measure_backend_start(warmup, args.settle) for _ in range(args.runs)]
+        label = "warm-up on " if warmup else "warm-up off"
+        print(
+            f"  {label}  first response: {statistics.median(run[0] for run in runs) * 1000:8.1f} ms  "
+            f"first database request: {statistics.median(run[1] for run in runs) * 1000:8.1f} ms"
+        )
+
+    print(f"Sync, median of {args.runs} runs")
+    seconds, loaded = measure_import(args.sync_python, "src.main", args.sync_dir, args.runs)
+    print(f"  import src.main:        {seconds * 1000:8.1f} ms  heavy modules loaded: {', '.join(loaded) or 'none'}")
+    env = {**os.environ, "YNAB_PERSONAL_ACCESS_TOKEN": os.environ.get("YNAB_PERSONAL_ACCESS_TOKEN", "benchmark")}
+    seconds = statistics.median(
+        run_json(args.sync_python, SYNC_START_SCRIPT, args.sync_dir, env)["seconds"] for _ in range(args.runs)
+    )
+    print(f"  services ready:         {seconds * 1000:8.1f} ms  (import and start, before the first YNAB request)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+Fixtures for tests against PostgreSQL. Set TEST_DATABASE_URL to a database
+whose tables already exist, i.e. the sync service has run once against it;
+tests seed scratch budgets and remove them again. Without it, database
+tests are skipped.
+"""
+import os
+
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    # Settings are read at import, so point the app at the test database first
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+# The startup warm-up would run its statements while tests count theirs
+os.environ["WARMUP_ENABLED"] = "false"
+
+@pytest.fixture(scope="session")
+def client():
+    """A test client of the app, with its startup and shutdown run once per session."""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
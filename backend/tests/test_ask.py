@@ -0,0 +1,118 @@
+import re
+
+import pytest
+from sqlalchemy import insert
+
+from app.models.account import Account
+from app.models.budget import Budget
+from app.models.category import Category, CategoryGroup
+from app.models.month import CategoryMonth, Month
+from app.models.payee import Payee
+from app.models.transaction import Transaction
+from app.services.context import estimate_tokens, format_amount
+from benchmarks._scratch import scratch_session
+
+BUDGET_ID = "test-ask"
+MONTHS = ["2024-01-01", "2024-02-01", "2024-03-01"]
+
+def seed(db):
+    """A budget with three months, a coffee habit recorded in memos and monthly rent."""
+    db.execute(insert(Budget), [{"id": BUDGET_ID, "name": "Household", "currency_format_iso_code": "USD"}])
+    db.execute(insert(Account), [
+        {"id": f"{BUDGET_ID}-checking", "budget_id": BUDGET_ID, "name": "Checking", "type": "checking",
+         "on_budget": True, "closed": False, "balance": 0, "deleted": False}
+    ])
+    db.execute(insert(CategoryGroup), [
+        {"id": f"{BUDGET_ID}-bills", "budget_id": BUDGET_ID, "name": "Bills", "hidden": False, "deleted": False}
+    ])
+    db.execute(insert(Category), [
+        {"id": f"{BUDGET_ID}-{name.lower()}", "category_group_id": f"{BUDGET_ID}-bills", "name": name,
+         "hidden": False, "deleted": False}
+        for name in ("Coffee", "Rent")
+    ])
+    db.execute(insert(Month), [
+        {"budget_id": BUDGET_ID, "month": month, "income": 3000000, "budgeted": 2500000, "activity": -2200000,
+         "to_be_budgeted": 500000, "age_of_money": 20}
+        for month in MONTHS
+    ])
+    db.execute(insert(CategoryMonth), [
+        {"budget_id": BUDGET_ID, "month": month, "category_id": f"{BUDGET_ID}-{name}", "budgeted": budgeted,
+         "activity": -budgeted, "balance": 0}
+        for month in MONTHS for name, budgeted in (("coffee", 200000), ("rent", 2000000))
+    ])
+    db.execute(insert(Payee), [
+        {"id": f"{BUDGET_ID}-{name.lower()}", "budget_id": BUDGET_ID, "name": name, "deleted": False}
+        for name in ("Cafe", "Landlord")
+    ])
+    db.execute(insert(Transaction), [
+        {"id": f"{BUDGET_ID}-coffee-{t}", "budget_id": BUDGET_ID, "account_id": f"{BUDGET_ID}-checking",
+         "category_id": f"{BUDGET_ID}-coffee", "payee_id": f"{BUDGET_ID}-cafe", "date": f"2024-0{1 + t % 3}-{1 + t:02d}",
+         "amount": -4500 - 10 * t, "memo": "oat latte" if t % 2 else "espresso", "cleared": "cleared",
+         "approved": True, "deleted": False}
+        for t in range(24)
+    ] + [
+        {"id": f"{BUDGET_ID}-rent-{m}", "budget_id": BUDGET_ID, "account_id": f"{BUDGET_ID}-checking",
+         "category_id": f"{BUDGET_ID}-rent", "payee_id": f"{BUDGET_ID}-landlord", "date": month,
+         "amount": -2000000, "memo": "rent", "cleared": "cleared", "approved": True, "deleted": False}
+        for m, month in enumerate(MONTHS)
+    ])
+    db.commit()
+    return {
+        transaction.id: transaction
+        for transaction in db.query(Transaction).filter(Transaction.budget_id == BUDGET_ID)
+    }
+
+@pytest.fixture(scope="module")
+def transactions(client):
+    with scratch_session(BUDGET_ID) as db:
+        yield seed(db)
+
+def ask(client, question, **body):
+    response = client.post(f"/api/v1/budgets/{BUDGET_ID}/ask", json={"question": question, **body})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+@pytest.mark.parametrize("max_tokens", [100, 250, 2000])
+def test_context_fits_max_tokens(client, transactions, max_tokens):
+    answer = ask(client, "How much did I spend on latte in February?", max_tokens=max_tokens)
+
+    context = answer["context"]
+    assert context["max_tokens"] == max_tokens
+    assert estimate_tokens(context["context"]) <= context["tokens"] <= max_tokens
+    assert context["pieces"][0] == "budget"
+    assert len(context["context"].splitlines()) == len(context["pieces"])
+
+def test_small_budget_keeps_fewer_pieces(client, transactions):
+    small = ask(client, "How much did I spend on latte?", max_tokens=100)["context"]
+    large = ask(client, "How much did I spend on latte?", max_tokens=2000)["context"]
+
+    assert set(small["pieces"]) < set(large["pieces"])
+    assert large["candidates"] > len(small["pieces"])
+
+def test_max_tokens_is_bounded(client, transactions):
+    response = client.post(f"/api/v1/budgets/{BUDGET_ID}/ask", json={"question": "latte", "max_tokens": 50})
+
+    assert response.status_code == 422
+
+def test_answer_is_grounded_in_retrieved_rows(client, transactions):
+    answer = ask(client, "How much did I spend on latte?")
+
+    assert answer["model"] == "stub"
+    context = answer["context"]
+    lines = context["context"].splitlines()
+    retrieved = [piece.split(":", 1)[1] for piece in context["pieces"] if piece.startswith("transaction:")]
+    assert retrieved
+    # Every retrieved transaction matches the question and is rendered from its stored row
+    for transaction_id in retrieved:
+        transaction = transactions[transaction_id]
+        assert transaction.memo == "oat latte"
+        line = f"Transaction {transaction.date}: Cafe {format_amount(transaction.amount)}, memo oat latte."
+        assert line in lines
+    # The answer is built from exactly that context
+    assert re.search(rf"from {len(lines)} context lines", answer["answer"])
+    assert answer["answer"].endswith(f"Most relevant: {lines[1]}")
+
+def test_unknown_budget(client):
+    response = client.post("/api/v1/budgets/no-such-budget/ask", json={"question": "latte"})
+
+    assert response.status_code == 404
@@ -0,0 +1,97 @@
+"""
+Query budgets: every read endpoint, requested against a seeded scratch
+budget, may execute at most its budget of SQL statements. A budget that
+holds for a budget of this size catches N+1 loading patterns, because those
+grow with the number of rows.
+"""
+import pytest
+from sqlalchemy import insert
+
+from app.db.query_counter import count_queries
+from app.db import session as db_session
+from app.models.account import Account
+from app.models.budget import Budget
+from app.models.category import Category, CategoryGroup
+from app.models.month import CategoryMonth, Month
+from app.models.payee import Payee
+from app.models.transaction import Subtransaction, Transaction
+from benchmarks._scratch import scratch_session
+
+BUDGET_ID = "test-queries"
+MONTHS = ["2024-01-01", "2024-02-01", "2024-03-01"]
+
+# (path, query parameters, maximum number of SQL statements)
+ENDPOINT_BUDGETS = [
+    ("/api/v1/budgets/", {}, 1),
+    (f"/api/v1/budgets/{BUDGET_ID}", {}, 1),
+    (f"/api/v1/budgets/{BUDGET_ID}/overview", {"month": "2024-03-15"}, 6),
+    ("/api/v1/accounts/", {"budget_id": BUDGET_ID}, 1),
+    (f"/api/v1/accounts/{BUDGET_ID}-account-0/balances", {"start_date": "2024-02-01"}, 3),
+    ("/api/v1/accounts/net-worth", {"budget_id": BUDGET_ID, "start_date": "2024-02-01"}, 3),
+    ("/api/v1/categories/", {"budget_id": BUDGET_ID, "month": "2024-02-01"}, 3),
+    (f"/api/v1/categories/{BUDGET_ID}-category-0-0/months", {}, 2),
+    ("/api/v1/payees/", {"budget_id": BUDGET_ID}, 1),
+    # The first transaction list loads the dimension cache: knowledge, accounts,
+    # category groups, categories and payees; later ones only check the knowledge
+    ("/api/v1/transactions/", {"budget_id": BUDGET_ID}, 6),
+    ("/api/v1/transactions/anomalies", {"budget_id": BUDGET_ID}, 2),
+    ("/api/v1/transactions/matches", {"budget_id": BUDGET_ID}, 2),
+    (f"/api/v1/transactions/{BUDGET_ID}-txn-0", {}, 2),
+]
+
+def seed(db, groups=5, categories=10, accounts=4, payees=50, transactions=200):
+    db.execute(insert(Budget), [{"id": BUDGET_ID, "name": "Query budgets"}])
+    db.execute(insert(Account), [
+        {"id": f"{BUDGET_ID}-account-{a}", "budget_id": BUDGET_ID, "name": f"Account {a}", "type": "checking",
+         "on_budget": True, "closed": False, "balance": 0, "deleted": False}
+        for a in range(accounts)
+    ])
+    db.execute(insert(CategoryGroup), [
+        {"id": f"{BUDGET_ID}-group-{g}", "budget_id": BUDGET_ID, "name": f"Group {g}", "hidden": False, "deleted": False}
+        for g in range(groups)
+    ])
+    category_ids = [f"{BUDGET_ID}-category-{g}-{c}" for g in range(groups) for c in range(categories)]
+    db.execute(insert(Category), [
+        {"id": category_id, "category_group_id": category_id.replace("category", "group").rsplit("-", 1)[0],
+         "name": category_id, "hidden": False, "deleted": False}
+        for category_id in category_ids
+    ])
+    db.execute(insert(Month), [{"budget_id": BUDGET_ID, "month": month} for month in MONTHS])
+    db.execute(insert(CategoryMonth), [
+        {"budget_id": BUDGET_ID, "month": month, "category_id": category_id, "budgeted": 1000, "activity": -500, "balance": 500}
+        for month in MONTHS for category_id in category_ids
+    ])
+    db.execute(insert(Payee), [
+        {"id": f"{BUDGET_ID}-payee-{p}", "budget_id": BUDGET_ID, "name": f"Payee {p}", "deleted": False}
+        for p in range(payees)
+    ])
+    db.execute(insert(Transaction), [
+        {"id": f"{BUDGET_ID}-txn-{t}", "budget_id": BUDGET_ID, "account_id": f"{BUDGET_ID}-account-{t % accounts}",
+         "category_id": category_ids[t % len(category_ids)], "payee_id": f"{BUDGET_ID}-payee-{t % payees}",
+         "date": f"2024-0{1 + t % 3}-{1 + t % 28:02d}", "amount": -1000 * (1 + t % 50), "cleared": "cleared",
+         "approved": True, "deleted": False}
+        for t in range(transactions)
+    ])
+    db.execute(insert(Subtransaction), [
+        {"id": f"{BUDGET_ID}-sub-{s}", "transaction_id": f"{BUDGET_ID}-txn-0", "category_id": category_ids[s],
+         "amount": -500, "deleted": False}
+        for s in range(2)
+    ])
+    db.commit()
+
+@pytest.fixture(scope="module")
+def seeded(client):
+    with scratch_session(BUDGET_ID) as db:
+        seed(db)
+        yield
+
+@pytest.mark.parametrize("path, params, budget", ENDPOINT_BUDGETS, ids=[path for path, _, _ in ENDPOINT_BUDGETS])
+def test_query_budget(client, seeded, path, params, budget):
+    with count_queries(
+        db_session.engine, db_session.analytics_engine, *db_session.replica_engines, db_session.async_engine.sync_engine
+    ) as counter:
+        response = client.get(path, params=params)
+
+    assert response.status_code == 200, response.text
+    statements = "\n".join(" ".join(statement.split())[:160] for statement in counter.statements)
+    assert counter.count <= budget, f"{counter.count} statements, budget {budget}:\n{statements}"
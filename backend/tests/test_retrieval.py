@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+from app.services.retrieval import IVFIndex
+
+@pytest.mark.parametrize("trained", [False, True])
+def test_add_keeps_the_last_vector_of_a_repeated_id(trained):
+    rng = np.random.default_rng(0)
+    index = IVFIndex(dimensions=8, n_lists=4, n_probe=4)
+    if trained:
+        index.train(rng.normal(size=(64, 8)))
+    first, last, other = np.eye(8)[:3]
+
+    index.add(["a", "b", "a"], np.stack([first, other, last]), budget_ids=["b1", "b1", "b2"])
+
+    assert len(index) == 2
+    results = index.search(first, k=3)
+    assert sorted(source_id for source_id, _ in results) == ["a", "b"]
+    assert dict(results)["a"] == pytest.approx(0.0, abs=1e-6)
+    assert index.search(last, k=1, budget_id="b2")[0] == ("a", pytest.approx(1.0))
+    assert index.search(last, k=1, budget_id="b1")[0][0] == "b"
@@ -0,0 +1,3 @@
+#!/bin/sh
+# Allow streaming replication connections, used by the optional postgres-replica service
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
@@ -1,11 +1,18 @@
+import importlib
 import os
+import threading
 import time
 import logging
 import schedule
 from dotenv import load_dotenv
 
-from src.services.ynab_service import YNABService
 from src.services.db_service import DatabaseService
+from src.services.job_queue_service import JobQueueService
+from src.services.balance_service import BalanceService
+from src.services.match_service import MatchService
+from src.services.maintenance_service import MaintenanceService
+from src.services.verify_service import VerificationService
+from src.services.embedding_service import EmbeddingService, load_embedding_function
 
 # Configure logging
 logging.basicConfig(
@@ -17,83 +24,300 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
-def sync_ynab_data():
+# Queue settings
+SYNC_INTERVAL_SECONDS = int(os.getenv("SYNC_INTERVAL_SECONDS", "3600"))
+SYNC_POLL_SECONDS = int(os.getenv("SYNC_POLL_SECONDS", "10"))
+SYNC_LEASE_SECONDS = int(os.getenv("SYNC_LEASE_SECONDS", "900"))
+SYNC_MAX_ATTEMPTS = int(os.getenv("SYNC_MAX_ATTEMPTS", "5"))
+SYNC_CHUNK_SIZE = int(os.getenv("SYNC_CHUNK_SIZE", "1000"))
+SYNC_PARTITIONED = os.getenv("SYNC_PARTITIONED", "false").lower() == "true"
+SYNC_SLOW_QUERY_MS = float(os.getenv("SYNC_SLOW_QUERY_MS", "1000"))
+
+# Post-sync stage settings
+BALANCES_ENABLED = os.getenv("BALANCES_ENABLED", "true").lower() == "true"
+ANOMALIES_ENABLED = os.getenv("ANOMALIES_ENABLED", "true").lower() == "true"
+ANOMALY_MIN_HISTORY = int(os.getenv("ANOMALY_MIN_HISTORY", "3"))
+ANOMALY_Z_THRESHOLD = float(os.getenv("ANOMALY_Z_THRESHOLD", "3.0"))
+ANOMALY_RATIO_THRESHOLD = float(os.getenv("ANOMALY_RATIO_THRESHOLD", "3.0"))
+MATCHES_ENABLED = os.getenv("MATCHES_ENABLED", "true").lower() == "true"
+MATCH_WINDOW_DAYS = int(os.getenv("MATCH_WINDOW_DAYS", "3"))
+EMBEDDINGS_ENABLED = os.getenv("EMBEDDINGS_ENABLED", "false").lower() == "true"
+EMBEDDING_FUNCTION = os.getenv("EMBEDDING_FUNCTION", "src.services.embedding_service:hashing_embedding")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "hashing-256")
+MAINTENANCE_ENABLED = os.getenv("MAINTENANCE_ENABLED", "true").lower() == "true"
+TOMBSTONE_RETENTION_DAYS = float(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+TOMBSTONE_ARCHIVE = os.getenv("TOMBSTONE_ARCHIVE", "false").lower() == "true"
+MAINTENANCE_BATCH_SIZE = int(os.getenv("MAINTENANCE_BATCH_SIZE", "5000"))
+VACUUM_RATIO = float(os.getenv("VACUUM_RATIO", "0.05"))
+VACUUM_MIN_ROWS = int(os.getenv("VACUUM_MIN_ROWS", "1000"))
+PARTITION_ARCHIVE_MONTHS = int(os.getenv("PARTITION_ARCHIVE_MONTHS", "0"))
+
+# Consistency verification settings
+VERIFY_ENABLED = os.getenv("VERIFY_ENABLED", "true").lower() == "true"
+VERIFY_INTERVAL_HOURS = float(os.getenv("VERIFY_INTERVAL_HOURS", "24"))
+VERIFY_MAX_SLICES = int(os.getenv("VERIFY_MAX_SLICES", "10"))
+
+def sync_budget(ynab_service, db_service, budget_id, heartbeat=None):
     """
-    Main function to sync YNAB data to the database.
+    Sync all data for a single budget.
     Uses delta sync when possible to minimize API calls.
+    
+    Args:
+        ynab_service (YNABService): YNAB API service
+        db_service (DatabaseService): Database service
+        budget_id (str): The budget ID
+        heartbeat (callable, optional): Called between entity syncs to keep the job lease alive
     """
-    try:
-        logger.info("Starting YNAB data sync")
-        
-        # Initialize services
-        ynab_service = YNABService(
-            access_token=os.getenv("YNAB_PERSONAL_ACCESS_TOKEN")
-        )
-        db_service = DatabaseService(
-            db_url=os.getenv("DATABASE_URL")
-        )
-        
-        # Get budgets
-        budgets = ynab_service.get_budgets()
-        db_service.save_budgets(budgets)
+    heartbeat = heartbeat or (lambda: None)
+    logger.info(f"Syncing data for budget {budget_id}")
+    
+    # Get server knowledge from database
+    server_knowledge = db_service.get_server_knowledge(budget_id)
+    phase = db_service.query_stats.phase
+    
+    # Sync accounts
+    with phase('accounts'):
+        accounts = ynab_service.get_accounts(budget_id, server_knowledge.get('accounts'))
+        db_service.save_accounts(budget_id, accounts)
+    heartbeat()
+    
+    # Sync categories
+    with phase('categories'):
+        categories = ynab_service.get_categories(budget_id, server_knowledge.get('categories'))
+        db_service.save_categories(budget_id, categories)
+    heartbeat()
+    
+    # Sync payees
+    with phase('payees'):
+        payees = ynab_service.get_payees(budget_id, server_knowledge.get('payees'))
+        db_service.save_payees(budget_id, payees)
+    heartbeat()
+    
+    # Sync transactions (most frequently updated)
+    with phase('transactions'):
+        sync_transactions(ynab_service, db_service, budget_id, server_knowledge.get('transactions'))
+    heartbeat()
+    
+    # Sync scheduled transactions
+    with phase('scheduled_transactions'):
+        scheduled_transactions = ynab_service.get_scheduled_transactions(budget_id, server_knowledge.get('scheduled_transactions'))
+        db_service.save_scheduled_transactions(budget_id, scheduled_transactions)
+    heartbeat()
+    
+    # Sync months
+    with phase('months'):
+        months = ynab_service.get_months(budget_id, server_knowledge.get('months'))
+        db_service.save_months(budget_id, months)
+    
+    logger.info(f"Completed sync for budget {budget_id}")
+
+def sync_transactions(ynab_service, db_service, budget_id, last_knowledge):
+    """
+    Sync transactions for a budget, resuming an interrupted write if one was checkpointed.
+    
+    A resumed write refetches from the knowledge the interrupted fetch started at
+    and only writes the rows past the checkpoint cursor. Rows before the cursor were
+    written at the checkpoint's knowledge, so a follow-up delta from that knowledge
+    picks up anything that changed in the meantime.
+    
+    Args:
+        ynab_service (YNABService): YNAB API service
+        db_service (DatabaseService): Database service
+        budget_id (str): The budget ID
+        last_knowledge (int): Stored server knowledge for transactions
+    """
+    checkpoint = db_service.get_checkpoint(budget_id, 'transactions')
+    if checkpoint:
+        transactions = ynab_service.get_transactions(budget_id, checkpoint['start_knowledge'])
+        db_service.save_transactions(budget_id, transactions, checkpoint=checkpoint)
         
-        # For each budget, sync all data
-        for budget in budgets:
-            budget_id = budget.id
-            logger.info(f"Syncing data for budget: {budget.name} ({budget_id})")
-            
-            # Get server knowledge from database
-            server_knowledge = db_service.get_server_knowledge(budget_id)
-            
-            # Sync accounts
-            accounts = ynab_service.get_accounts(budget_id, server_knowledge.get('accounts'))
-            db_service.save_accounts(budget_id, accounts)
-            
-            # Sync categories
-            categories = ynab_service.get_categories(budget_id, server_knowledge.get('categories'))
-            db_service.save_categories(budget_id, categories)
-            
-            # Sync payees
-            payees = ynab_service.get_payees(budget_id, server_knowledge.get('payees'))
-            db_service.save_payees(budget_id, payees)
-            
-            # Sync transactions (most frequently updated)
-            transactions = ynab_service.get_transactions(budget_id, server_knowledge.get('transactions'))
-            db_service.save_transactions(budget_id, transactions)
+        if transactions['server_knowledge'] == checkpoint['target_knowledge']:
+            return
+        last_knowledge = checkpoint['target_knowledge']
+    
+    transactions = ynab_service.get_transactions(budget_id, last_knowledge)
+    db_service.save_transactions(budget_id, transactions)
+
+def build_post_sync_stages(db_service):
+    """
+    Build the enabled post-sync pipeline stages.
+    
+    Returns:
+        list: Stage objects with a run(budget_id) method, in execution order
+    """
+    stages = []
+    if BALANCES_ENABLED:
+        stages.append(BalanceService(db_service))
+    if ANOMALIES_ENABLED:
+        # Imported here, numpy is only loaded when the stage is enabled
+        from src.services.anomaly_service import AnomalyService
+        stages.append(AnomalyService(
+            db_service,
+            min_history=ANOMALY_MIN_HISTORY,
+            z_threshold=ANOMALY_Z_THRESHOLD,
+            ratio_threshold=ANOMALY_RATIO_THRESHOLD
+        ))
+    if MATCHES_ENABLED:
+        stages.append(MatchService(db_service, window_days=MATCH_WINDOW_DAYS))
+    if EMBEDDINGS_ENABLED:
+        stages.append(EmbeddingService(
+            db_service,
+            embed_fn=load_embedding_function(EMBEDDING_FUNCTION),
+            model_name=EMBEDDING_MODEL
+        ))
+    if MAINTENANCE_ENABLED:
+        # Last, so the other stages have seen a deletion before its tombstone is purged
+        stages.append(MaintenanceService(
+            db_service,
+            retention_days=TOMBSTONE_RETENTION_DAYS,
+            archive=TOMBSTONE_ARCHIVE,
+            batch_size=MAINTENANCE_BATCH_SIZE,
+            wait_for=[stage.STAGE for stage in stages],
+            vacuum_ratio=VACUUM_RATIO,
+            vacuum_min_rows=VACUUM_MIN_ROWS,
+            partition_archive_months=PARTITION_ARCHIVE_MONTHS
+        ))
+    return stages
+
+def run_post_sync_stages(stages, budget_id, db_service):
+    """
+    Run post-sync pipeline stages for a budget.
+    A failing stage is logged and retried on the next sync; it does not fail the sync itself.
+    """
+    for stage in stages:
+        try:
+            with db_service.query_stats.phase(f"stage {stage.STAGE}"):
+                stage.run(budget_id)
+        except Exception as e:
+            logger.error(f"Error in post-sync stage {type(stage).__name__} for budget {budget_id}: {str(e)}")
+
+def enqueue_sync_jobs(ynab_service, db_service, job_queue):
+    """
+    Enqueue one sync job per budget.
+    Only one replica enqueues per interval; the others just work the queue.
+    """
+    try:
+        with job_queue.scheduler_lock() as acquired:
+            if not acquired or not job_queue.is_enqueue_due(SYNC_INTERVAL_SECONDS):
+                return
             
-            # Sync scheduled transactions
-            scheduled_transactions = ynab_service.get_scheduled_transactions(budget_id, server_knowledge.get('scheduled_transactions'))
-            db_service.save_scheduled_transactions(budget_id, scheduled_transactions)
+            logger.info("Enqueueing YNAB sync jobs")
             
-            # Sync months
-            months = ynab_service.get_months(budget_id, server_knowledge.get('months'))
-            db_service.save_months(budget_id, months)
+            # Get budgets
+            budgets = ynab_service.get_budgets()
+            db_service.save_budgets(budgets)
             
-            logger.info(f"Completed sync for budget: {budget.name}")
-        
-        logger.info("YNAB data sync completed successfully")
+            job_queue.enqueue_budget_jobs([budget.id for budget in budgets])
     
     except Exception as e:
-        logger.error(f"Error during YNAB data sync: {str(e)}")
-        raise
+        logger.error(f"Error enqueueing YNAB sync jobs: {str(e)}")
+
+def process_next_job(ynab_service, db_service, job_queue, stages=(), verifier=None):
+    """
+    Claim and run the next sync job from the queue.
+    When a verifier is given, the budget is verified against YNAB after its
+    post-sync stages once its verification interval has passed.
+    
+    Returns:
+        bool: True if a job was claimed, False if the queue was empty
+    """
+    job = job_queue.claim_job()
+    if job is None:
+        return False
+    
+    with job_queue.budget_lock(job['budget_id']) as acquired:
+        if not acquired:
+            logger.info(f"Budget {job['budget_id']} is being synced by another worker, releasing job {job['id']}")
+            job_queue.release_job(job['id'])
+            return True
+        
+        try:
+            sync_budget(
+                ynab_service,
+                db_service,
+                job['budget_id'],
+                heartbeat=lambda: job_queue.extend_lease(job['id'])
+            )
+            job_queue.complete_job(job['id'])
+        except Exception as e:
+            logger.error(f"Error during YNAB data sync for budget {job['budget_id']}: {str(e)}")
+            job_queue.fail_job(job, e)
+            return True
+        
+        run_post_sync_stages(stages, job['budget_id'], db_service)
+        
+        if verifier is not None:
+            try:
+                verifier.run_if_due(job['budget_id'])
+            except Exception as e:
+                logger.error(f"Error verifying budget {job['budget_id']}: {str(e)}")
+    
+    return True
+
+def start_services():
+    """
+    Create the services of the sync loop.
+    The YNAB SDK, the slowest import by far, is loaded on a background thread
+    while the database tables are checked, so a cold container spends the
+    longer of the two rather than their sum before its first YNAB request.
+    
+    Returns:
+        tuple: YNAB service, database service, job queue, post-sync stages and verifier
+    """
+    started = time.perf_counter()
+    ynab_import = threading.Thread(target=importlib.import_module, args=('src.services.ynab_service',), daemon=True)
+    ynab_import.start()
+    
+    db_service = DatabaseService(
+        db_url=os.getenv("DATABASE_URL"),
+        chunk_size=SYNC_CHUNK_SIZE,
+        partitioned=SYNC_PARTITIONED,
+        slow_query_ms=SYNC_SLOW_QUERY_MS
+    )
+    job_queue = JobQueueService(
+        db_service,
+        lease_seconds=SYNC_LEASE_SECONDS,
+        max_attempts=SYNC_MAX_ATTEMPTS
+    )
+    stages = build_post_sync_stages(db_service)
+    
+    ynab_import.join()
+    from src.services.ynab_service import YNABService
+    ynab_service = YNABService(
+        access_token=os.getenv("YNAB_PERSONAL_ACCESS_TOKEN")
+    )
+    verifier = VerificationService(
+        ynab_service,
+        db_service,
+        interval_hours=VERIFY_INTERVAL_HOURS,
+        max_slices=VERIFY_MAX_SLICES
+    ) if VERIFY_ENABLED else None
+    
+    logger.info(f"Sync services started in {time.perf_counter() - started:.2f}s")
+    return ynab_service, db_service, job_queue, stages, verifier
 
 def main():
     """
     Main entry point for the sync service.
-    Performs initial sync and then schedules hourly updates.
+    Every replica runs the same loop: enqueue budget jobs when due and
+    work the shared job queue, so replicas can be added to scale out.
     """
     logger.info("Starting YNAB sync service")
+    ynab_service, db_service, job_queue, stages, verifier = start_services()
     
-    # Perform initial sync
-    sync_ynab_data()
-    
-    # Schedule hourly sync
-    schedule.every(1).hour.do(sync_ynab_data)
+    # Enqueue initial jobs, then check every minute whether the next round is due
+    enqueue_sync_jobs(ynab_service, db_service, job_queue)
+    schedule.every(1).minutes.do(enqueue_sync_jobs, ynab_service, db_service, job_queue)
     
     # Keep the script running
     while True:
         schedule.run_pending()
-        time.sleep(60)  # Check every minute
+        try:
+            if process_next_job(ynab_service, db_service, job_queue, stages, verifier):
+                continue
+        except Exception as e:
+            logger.error(f"Error processing sync queue: {str(e)}")
+        time.sleep(SYNC_POLL_SECONDS)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
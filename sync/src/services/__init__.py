@@ -1,3 +1,22 @@
-# Import services for easier access
-from src.services.ynab_service import YNABService
-from src.services.db_service import DatabaseService
\ No newline at end of file
+# Services for easier access, imported on first use so that importing one
+# service does not load the YNAB SDK or numpy along with all the others
+import importlib
+
+_SERVICES = {
+    'YNABService': 'src.services.ynab_service',
+    'DatabaseService': 'src.services.db_service',
+    'JobQueueService': 'src.services.job_queue_service',
+    'PartitionService': 'src.services.partition_service',
+    'EmbeddingService': 'src.services.embedding_service',
+    'BalanceService': 'src.services.balance_service',
+    'AnomalyService': 'src.services.anomaly_service',
+    'MatchService': 'src.services.match_service',
+    'MaintenanceService': 'src.services.maintenance_service',
+    'VerificationService': 'src.services.verify_service',
+    'QueryStatsService': 'src.services.query_stats_service'
+}
+
+def __getattr__(name):
+    if name not in _SERVICES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_SERVICES[name]), name)
\ No newline at end of file
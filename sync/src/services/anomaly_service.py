@@ -0,0 +1,384 @@
+import logging
+import time
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+logger = logging.getLogger(__name__)
+
+def batch_moments(index, values, size):
+    """
+    Count, mean and sum of squared deviations (M2) of values grouped by index.
+
+    Args:
+        index (ndarray): Group of each value, in range(size)
+        values (ndarray): The values
+        size (int): Number of groups
+
+    Returns:
+        tuple: (count, mean, m2) arrays of length size
+    """
+    count = np.bincount(index, minlength=size).astype(float)
+    total = np.bincount(index, weights=values, minlength=size)
+    mean = np.divide(total, count, out=np.zeros(size), where=count > 0)
+    m2 = np.bincount(index, weights=(values - mean[index]) ** 2, minlength=size)
+    return count, mean, m2
+
+def combine_moments(count_a, mean_a, m2_a, count_b, mean_b, m2_b):
+    """Moments of the union of two sets, by the parallel form of Welford's update."""
+    count = count_a + count_b
+    total = np.where(count > 0, count, 1)
+    delta = mean_b - mean_a
+    mean = mean_a + delta * count_b / total
+    m2 = m2_a + m2_b + delta ** 2 * count_a * count_b / total
+    return count, mean, m2
+
+def remove_moments(count, mean, m2, count_b, mean_b, m2_b):
+    """Inverse of combine_moments: moments after taking the set b out again."""
+    count_a = count - count_b
+    rest = np.where(count_a > 0, count_a, 1)
+    mean_a = np.where(count_a > 0, (count * mean - count_b * mean_b) / rest, 0.0)
+    delta = mean_b - mean_a
+    m2_a = m2 - m2_b - delta ** 2 * count_a * count_b / np.where(count > 0, count, 1)
+    return count_a, mean_a, np.where(count_a > 0, np.maximum(m2_a, 0.0), 0.0)
+
+def to_days(dates):
+    """ISO date strings as day numbers."""
+    return np.array(dates, dtype='datetime64[D]').astype(np.int64)
+
+class AnomalyService:
+    """
+    Post-sync pipeline stage that flags unusual outflows: an amount far above
+    what a payee or category usually charges, or a payee that has just become
+    a recurring charge.
+
+    Running statistics per payee and category (count, mean and M2 of the
+    amounts, and the same for the days between a payee's charges) are kept in
+    anomaly_stats and updated only from the transactions changed since the
+    stage's watermark, so a run costs as much as the delta, not the history.
+    Every absorbed outflow is recorded in transaction_scores, so an edited or
+    deleted transaction can take its old contribution out of the statistics
+    again. New transactions are scored against the statistics before the delta
+    is added, all at once with numpy.
+    """
+
+    STAGE = 'anomalies'
+
+    # Key types with amount statistics; intervals are only tracked per payee
+    KEY_TYPES = ('payee', 'category')
+
+    def __init__(self, db_service, min_history=3, z_threshold=3.0, ratio_threshold=3.0,
+                 recurring_cv=0.15, recurring_min_days=6):
+        """
+        Initialize the anomaly service.
+
+        Args:
+            db_service (DatabaseService): Database service owning the synced tables
+            min_history (int): Outflows a payee or category needs before its amounts are scored
+            z_threshold (float): Standard deviations above the mean an amount must be to be flagged
+            ratio_threshold (float): Multiple of the mean an amount must be to be flagged
+            recurring_cv (float): Largest standard deviation of a payee's intervals, relative
+                to their mean, for its charges to count as recurring
+            recurring_min_days (int): Shortest mean interval of a recurring charge
+        """
+        self.db = db_service
+        self.min_history = min_history
+        self.z_threshold = z_threshold
+        self.ratio_threshold = ratio_threshold
+        self.recurring_cv = recurring_cv
+        self.recurring_min_days = recurring_min_days
+
+    def _load_delta(self, session, budget_id, watermark):
+        """
+        Load transactions changed since the watermark and the previous
+        contributions of those that were absorbed before.
+
+        Returns:
+            tuple: (changed transaction rows, previous transaction_scores rows)
+        """
+        db = self.db
+        query = select(
+            db.transactions.c.id,
+            db.transactions.c.date,
+            db.transactions.c.amount,
+            db.transactions.c.payee_id,
+            db.transactions.c.category_id,
+            db.transactions.c.deleted
+        ).where(db.transactions.c.budget_id == budget_id)
+        if watermark is not None:
+            query = query.where(db.transactions.c.server_knowledge > watermark)
+        rows = session.execute(query).all()
+
+        previous = []
+        if watermark is not None:
+            ids = [row.id for row in rows]
+            for start in range(0, len(ids), 10000):
+                previous.extend(session.execute(
+                    select(
+                        db.transaction_scores.c.transaction_id,
+                        db.transaction_scores.c.amount,
+                        db.transaction_scores.c.payee_id,
+                        db.transaction_scores.c.category_id,
+                        db.transaction_scores.c.reasons
+                    ).where(db.transaction_scores.c.transaction_id.in_(ids[start:start + 10000]))
+                ).all())
+        return rows, previous
+
+    def _load_stats(self, session, budget_id, key_type, keys):
+        """
+        Load the statistics of the given keys as arrays aligned with keys; keys
+        without statistics yet start empty.
+        """
+        stats = self.db.anomaly_stats
+        size = len(keys)
+        state = {
+            'count': np.zeros(size), 'mean': np.zeros(size), 'm2': np.zeros(size),
+            'last_day': np.zeros(size, dtype=np.int64), 'has_last': np.zeros(size, dtype=bool),
+            'interval_count': np.zeros(size), 'interval_mean': np.zeros(size), 'interval_m2': np.zeros(size),
+            'recurring': np.zeros(size, dtype=bool)
+        }
+        position = {key: i for i, key in enumerate(keys)}
+        key_list = list(keys)
+        for start in range(0, size, 10000):
+            for row in session.execute(
+                select(stats).where(
+                    (stats.c.budget_id == budget_id) &
+                    (stats.c.key_type == key_type) &
+                    stats.c.key_id.in_(key_list[start:start + 10000])
+                )
+            ):
+                i = position[row.key_id]
+                for column in ('count', 'mean', 'm2', 'interval_count', 'interval_mean', 'interval_m2', 'recurring'):
+                    state[column][i] = getattr(row, column)
+                if row.last_date is not None:
+                    state['last_day'][i] = to_days([row.last_date])[0]
+                    state['has_last'][i] = True
+        return state
+
+    def _update_intervals(self, state, index, days, positions):
+        """
+        Extend the interval statistics of payees with newly seen charges, in
+        place. Charges dated before a payee's last known charge do not add
+        intervals.
+
+        Returns:
+            ndarray: Positions of the newest charge of each payee that just became recurring
+        """
+        size = len(state['count'])
+        kept = ~state['has_last'][index] | (days >= state['last_day'][index])
+        index, days, positions = index[kept], days[kept], positions[kept]
+        order = np.lexsort((days, index))
+        index, days, positions = index[order], days[order], positions[order]
+
+        first = np.r_[True, index[1:] != index[:-1]] if len(index) else np.zeros(0, dtype=bool)
+        previous_day = np.where(first, state['last_day'][index], np.r_[0, days[:-1]] if len(days) else days)
+        valid = ~first | state['has_last'][index]
+        intervals = (days - previous_day)[valid].astype(float)
+        state['interval_count'], state['interval_mean'], state['interval_m2'] = combine_moments(
+            state['interval_count'], state['interval_mean'], state['interval_m2'],
+            *batch_moments(index[valid], intervals, size)
+        )
+        np.maximum.at(state['last_day'], index, days)
+        state['has_last'][index] = True
+
+        was_recurring = state['recurring']
+        spread = np.sqrt(np.divide(
+            state['interval_m2'], state['interval_count'],
+            out=np.zeros(size), where=state['interval_count'] > 0
+        ))
+        state['recurring'] = (
+            (state['interval_count'] >= 2) &
+            (state['interval_mean'] >= self.recurring_min_days) &
+            (spread <= self.recurring_cv * state['interval_mean'])
+        )
+        last = np.r_[index[1:] != index[:-1], True] if len(index) else np.zeros(0, dtype=bool)
+        newly_recurring = state['recurring'] & ~was_recurring
+        return positions[last & newly_recurring[index]]
+
+    def _stats_rows(self, budget_id, key_type, keys, state):
+        """Rows of anomaly_stats for the given keys and state arrays."""
+        return [
+            {
+                'budget_id': budget_id,
+                'key_type': key_type,
+                'key_id': key,
+                'count': int(state['count'][i]),
+                'mean': float(state['mean'][i]),
+                'm2': float(state['m2'][i]),
+                'last_date': str(np.datetime64(int(state['last_day'][i]), 'D')) if state['has_last'][i] else None,
+                'interval_count': int(state['interval_count'][i]),
+                'interval_mean': float(state['interval_mean'][i]),
+                'interval_m2': float(state['interval_m2'][i]),
+                'recurring': bool(state['recurring'][i])
+            }
+            for i, key in enumerate(keys)
+        ]
+
+    def run(self, budget_id):
+        """
+        Absorb the transactions changed since the last run into the anomaly
+        statistics of a budget and score the new ones.
+
+        The first run builds the statistics from all transactions without
+        flagging any, as they are history rather than new charges.
+
+        Args:
+            budget_id (str): The budget ID
+
+        Returns:
+            dict: Statistics with the number of absorbed, revised and flagged outflows
+        """
+        db = self.db
+        # Read the target knowledge first so rows written during the run are picked up next time
+        target_knowledge = db.get_server_knowledge(budget_id).get('transactions')
+        watermark = db.get_stage_watermark(budget_id, self.STAGE)
+        backfill = watermark is None
+
+        started = time.perf_counter()
+        session = db.Session()
+        try:
+            if backfill:
+                # Start over, in case the watermark was reset
+                session.execute(db.anomaly_stats.delete().where(db.anomaly_stats.c.budget_id == budget_id))
+                session.execute(db.transaction_scores.delete().where(db.transaction_scores.c.budget_id == budget_id))
+            rows, previous = self._load_delta(session, budget_id, watermark)
+
+            # Only live outflows contribute; amounts are scored as positive magnitudes
+            outflows = [row for row in rows if not row.deleted and row.amount < 0]
+            size = len(outflows)
+            magnitude = np.array([-row.amount for row in outflows], dtype=float)
+            days = to_days([row.date for row in outflows])
+            seen = {row.transaction_id for row in previous}
+            new = np.array([row.id not in seen for row in outflows], dtype=bool)
+
+            score = np.zeros(size)
+            expected = np.full(size, np.nan)
+            # An edited transaction keeps being the one that started a recurring charge
+            recurring_before = {
+                row.transaction_id for row in previous if row.reasons and 'new_recurring' in row.reasons.split(',')
+            }
+            reasons = [[] for _ in range(size)]
+            for key_type in self.KEY_TYPES:
+                column = f'{key_type}_id'
+                has_key = np.array([getattr(row, column) is not None for row in outflows], dtype=bool)
+                old = [row for row in previous if getattr(row, column) is not None]
+                key_ids = np.array(
+                    [getattr(row, column) for row in outflows if getattr(row, column) is not None] +
+                    [getattr(row, column) for row in old],
+                    dtype=object
+                )
+                if not len(key_ids):
+                    continue
+                keys, inverse = np.unique(key_ids, return_inverse=True)
+                positions = np.flatnonzero(has_key)
+                index, old_index = inverse[:len(positions)], inverse[len(positions):]
+                state = self._load_stats(session, budget_id, key_type, keys)
+
+                # Take out what edited or deleted transactions contributed before
+                state['count'], state['mean'], state['m2'] = remove_moments(
+                    state['count'], state['mean'], state['m2'],
+                    *batch_moments(old_index, np.array([-row.amount for row in old], dtype=float), len(keys))
+                )
+
+                # Score against the history before this delta
+                count, mean = state['count'][index], state['mean'][index]
+                spread = np.sqrt(np.divide(state['m2'][index], count, out=np.zeros(len(index)), where=count > 0))
+                spread = np.maximum(spread, 0.1 * mean)
+                z = np.divide(magnitude[positions] - mean, spread, out=np.zeros(len(index)), where=spread > 0)
+                history = count >= self.min_history
+                flagged = (
+                    history &
+                    (z >= self.z_threshold) &
+                    (magnitude[positions] >= self.ratio_threshold * mean)
+                )
+                score[positions] = np.maximum(score[positions], np.where(history, z, 0.0))
+                expected[positions] = np.where(np.isnan(expected[positions]) & history, mean, expected[positions])
+                for position in positions[flagged]:
+                    reasons[position].append(f'{key_type}_amount')
+
+                state['count'], state['mean'], state['m2'] = combine_moments(
+                    state['count'], state['mean'], state['m2'],
+                    *batch_moments(index, magnitude[positions], len(keys))
+                )
+                if key_type == 'payee':
+                    fresh = new[positions]
+                    for position in self._update_intervals(state, index[fresh], days[positions][fresh], positions[fresh]):
+                        reasons[position].append('new_recurring')
+
+                stmt = insert(db.anomaly_stats)
+                session.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=['budget_id', 'key_type', 'key_id'],
+                        set_={
+                            column.name: stmt.excluded[column.name]
+                            for column in db.anomaly_stats.columns if not column.primary_key
+                        }
+                    ),
+                    self._stats_rows(budget_id, key_type, keys, state)
+                )
+
+            # Edited transactions that are no longer outflows leave the ledger
+            gone = seen - {row.id for row in outflows}
+            gone_ids = list(gone)
+            for start in range(0, len(gone_ids), 10000):
+                session.execute(
+                    db.transaction_scores.delete().where(
+                        db.transaction_scores.c.transaction_id.in_(gone_ids[start:start + 10000])
+                    )
+                )
+
+            flagged = 0
+            score_rows = []
+            for i, row in enumerate(outflows):
+                if row.id in recurring_before:
+                    reasons[i].append('new_recurring')
+                flag = ','.join(reasons[i]) if reasons[i] and not backfill else None
+                flagged += flag is not None
+                score_rows.append({
+                    'transaction_id': row.id,
+                    'budget_id': budget_id,
+                    'date': row.date,
+                    'amount': row.amount,
+                    'payee_id': row.payee_id,
+                    'category_id': row.category_id,
+                    'score': float(score[i]),
+                    'expected_amount': None if np.isnan(expected[i]) else -int(round(expected[i])),
+                    'reasons': flag
+                })
+            stmt = insert(db.transaction_scores)
+            for start in range(0, len(score_rows), db.chunk_size):
+                session.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=['transaction_id'],
+                        set_={
+                            column.name: stmt.excluded[column.name]
+                            for column in db.transaction_scores.columns if column.name != 'transaction_id'
+                        }
+                    ),
+                    score_rows[start:start + db.chunk_size]
+                )
+
+            if flagged:
+                db.notify_change(session, budget_id, 'anomalies', target_knowledge)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error updating anomaly statistics: {str(e)}")
+            raise
+        finally:
+            session.close()
+
+        if target_knowledge is not None:
+            db.set_stage_watermark(budget_id, self.STAGE, target_knowledge)
+
+        stats = {
+            'absorbed': size,
+            'revised': len(previous),
+            'flagged': flagged,
+            'seconds': time.perf_counter() - started
+        }
+        logger.info(
+            f"Absorbed {stats['absorbed']} outflows into anomaly statistics for budget {budget_id}, "
+            f"flagged {stats['flagged']} in {stats['seconds']:.2f}s"
+        )
+        return stats
@@ -0,0 +1,123 @@
+import logging
+import time
+from sqlalchemy import select, text
+
+logger = logging.getLogger(__name__)
+
+# Daily balances are rebuilt from the first dirty date onwards: the balance on the
+# day before is the opening value, and a window sum over the daily activity adds
+# the prefix sums on top of it
+RECOMPUTE_DAILY_BALANCES = text("""
+INSERT INTO account_daily_balances (account_id, date, budget_id, activity, balance)
+SELECT
+    t.account_id,
+    t.date,
+    :budget_id,
+    sum(t.amount),
+    coalesce(opening.balance, 0) + sum(sum(t.amount)) OVER (PARTITION BY t.account_id ORDER BY t.date)
+FROM balance_dirty_ranges d
+JOIN transactions t
+    ON t.budget_id = d.budget_id AND t.account_id = d.account_id AND t.date >= d.from_date
+LEFT JOIN LATERAL (
+    SELECT b.balance FROM account_daily_balances b
+    WHERE b.account_id = d.account_id AND b.date < d.from_date
+    ORDER BY b.date DESC
+    LIMIT 1
+) opening ON true
+WHERE d.budget_id = :budget_id AND t.deleted = false
+GROUP BY t.account_id, t.date, opening.balance
+""")
+
+class BalanceService:
+    """
+    Post-sync pipeline stage that maintains per-account daily running balances.
+    Transaction writers record the earliest changed date per account, and only
+    days on or after that date are recomputed, so a delta touching last week
+    does not rescan years of history.
+    """
+
+    STAGE = 'balances'
+
+    def __init__(self, db_service):
+        """
+        Initialize the balance service.
+
+        Args:
+            db_service (DatabaseService): Database service owning the synced tables
+        """
+        self.db = db_service
+
+    def _mark_all_dirty(self, session, budget_id):
+        """
+        Mark every account of a budget dirty from its first transaction, used
+        to backfill balances for transactions synced before this stage existed.
+        """
+        session.execute(
+            text(
+                "INSERT INTO balance_dirty_ranges (budget_id, account_id, from_date) "
+                "SELECT budget_id, account_id, min(date) FROM transactions "
+                "WHERE budget_id = :budget_id GROUP BY budget_id, account_id "
+                "ON CONFLICT (budget_id, account_id) DO UPDATE SET from_date = excluded.from_date"
+            ),
+            {'budget_id': budget_id}
+        )
+
+    def run(self, budget_id):
+        """
+        Recompute the dirty part of the daily balances of a budget.
+
+        Args:
+            budget_id (str): The budget ID
+
+        Returns:
+            dict: Statistics with the number of recomputed accounts and days
+        """
+        db = self.db
+        target_knowledge = db.get_server_knowledge(budget_id).get('transactions')
+        backfill = db.get_stage_watermark(budget_id, self.STAGE) is None
+
+        started = time.perf_counter()
+        session = db.Session()
+        try:
+            if backfill:
+                self._mark_all_dirty(session, budget_id)
+
+            # Lock the dirty ranges so a concurrent writer waits until they are consumed
+            dirty = session.execute(
+                select(db.balance_dirty_ranges.c.account_id, db.balance_dirty_ranges.c.from_date)
+                .where(db.balance_dirty_ranges.c.budget_id == budget_id)
+                .with_for_update()
+            ).all()
+
+            days = 0
+            if dirty:
+                session.execute(
+                    text(
+                        "DELETE FROM account_daily_balances b USING balance_dirty_ranges d "
+                        "WHERE d.budget_id = :budget_id AND b.account_id = d.account_id AND b.date >= d.from_date"
+                    ),
+                    {'budget_id': budget_id}
+                )
+                days = session.execute(RECOMPUTE_DAILY_BALANCES, {'budget_id': budget_id}).rowcount
+                session.execute(
+                    db.balance_dirty_ranges.delete().where(db.balance_dirty_ranges.c.budget_id == budget_id)
+                )
+                db.notify_change(session, budget_id, 'balances', target_knowledge)
+
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error recomputing daily balances: {str(e)}")
+            raise
+        finally:
+            session.close()
+
+        if backfill and target_knowledge is not None:
+            db.set_stage_watermark(budget_id, self.STAGE, target_knowledge)
+
+        stats = {'accounts': len(dirty), 'days': days, 'seconds': time.perf_counter() - started}
+        logger.info(
+            f"Recomputed {stats['days']} daily balances of {stats['accounts']} accounts "
+            f"for budget {budget_id} in {stats['seconds']:.2f}s"
+        )
+        return stats
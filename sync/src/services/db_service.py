@@ -1,39 +1,119 @@
+import json
 import logging
-from sqlalchemy import create_engine, MetaData, Table, Column, String, Integer, Boolean, DateTime, ForeignKey, text
+from sqlalchemy import create_engine, event, MetaData, Table, Column, Computed, DDL, String, Integer, Float, Boolean, DateTime, ForeignKey, Index, or_, select, func, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.dialects.postgresql import insert, ARRAY, JSONB, TSVECTOR
+from sqlalchemy.schema import CreateColumn
+
+from src.services.partition_service import PartitionService
+from src.services.query_stats_service import QueryStatsService
 
 logger = logging.getLogger(__name__)
 Base = declarative_base()
 
+# Channel of the change events that the backend fans out to clients
+CHANGES_CHANNEL = 'budgey_changes'
+
+# Columns added to the schema after a database's tables were created, which create_all skips
+ADDED_COLUMNS = [('transactions', 'memo_tsv')]
+
 class DatabaseService:
     """
     Service for interacting with the PostgreSQL database.
     Handles saving YNAB data and tracking server knowledge.
     """
     
-    def __init__(self, db_url):
+    def __init__(self, db_url, chunk_size=1000, partitioned=False, slow_query_ms=1000):
         """
         Initialize the database service with the provided connection URL.
         
         Args:
             db_url (str): PostgreSQL connection URL
+            chunk_size (int): Number of rows committed per chunk for large entity writes
+            partitioned (bool): Create transactions and category_months as partitioned tables
+            slow_query_ms (float): Log statements slower than this with their EXPLAIN plan, 0 disables it
         """
         self.engine = create_engine(db_url)
+        self.query_stats = QueryStatsService(self.engine, slow_query_ms)
+        self.chunk_size = chunk_size
         self.Session = sessionmaker(bind=self.engine)
         self.metadata = MetaData()
         
+        # One catalog query for the existing tables, rather than a round trip per table
+        with self.engine.connect() as connection:
+            existing = dict(connection.execute(
+                text(
+                    "SELECT relname, relkind FROM pg_class "
+                    "WHERE relnamespace = to_regnamespace(current_schema()) AND relkind IN ('r', 'p')"
+                )
+            ).all())
+        
+        # Partitioning only applies when the tables are created, so follow the existing layout
+        existing_layout = existing['transactions'] == 'p' if 'transactions' in existing else None
+        if existing_layout is not None and existing_layout != partitioned:
+            logger.warning(
+                f"Table transactions already exists {'with' if existing_layout else 'without'} partitioning, "
+                f"ignoring partitioned={partitioned}"
+            )
+            partitioned = existing_layout
+        self.partitioned = partitioned
+        self.partitions = PartitionService(self.engine, {
+            'transactions': 'date',
+            'category_months': 'month'
+        })
+        
+        # Trigram indexes need the pg_trgm extension
+        event.listen(self.metadata, 'before_create', DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+        
         # Initialize tables
         self._init_tables()
         
         # Create tables if they don't exist
-        Base.metadata.create_all(self.engine)
+        missing = [table for table in self.metadata.sorted_tables if table.name not in existing]
+        if missing:
+            self.metadata.create_all(self.engine, tables=missing)
+        self._add_columns(existing)
         
         logger.info("Database service initialized")
     
+    def _add_columns(self, existing):
+        """
+        Add the columns of ADDED_COLUMNS that tables created before them lack,
+        e.g. the generated memo_tsv, which the search index and the backend's
+        search need. Only missing columns are altered, so a warm start does not
+        take the table's lock.
+        
+        Args:
+            existing (dict): Names of the tables that existed before create_all
+        """
+        added = [(table, column) for table, column in ADDED_COLUMNS if table in existing]
+        if not added:
+            return
+        with self.engine.begin() as connection:
+            present = set(connection.execute(
+                text(
+                    "SELECT table_name, column_name FROM information_schema.columns "
+                    "WHERE table_schema = current_schema() AND table_name = ANY(:tables)"
+                ),
+                {'tables': sorted({table for table, _ in added})}
+            ).all())
+            for table, column in added:
+                if (table, column) in present:
+                    continue
+                ddl = CreateColumn(self.metadata.tables[table].c[column]).compile(dialect=connection.dialect)
+                # A generated column is computed for every existing row, which rewrites the table once
+                connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {ddl}")
+                logger.info(f"Added column {column} to table {table}")
+    
     def _init_tables(self):
         """Initialize SQLAlchemy table definitions"""
         
+        # Partitioned tables are listed by budget and ranged by month, so the partition
+        # keys join their primary keys and foreign keys into them are not possible
+        partition_options = {'postgresql_partition_by': 'LIST (budget_id)'} if self.partitioned else {}
+        transaction_fk = [] if self.partitioned else [ForeignKey('transactions.id')]
+        
         # Server Knowledge table to track delta syncs
         self.server_knowledge = Table(
             'server_knowledge',
@@ -44,6 +124,29 @@ class DatabaseService:
             Column('updated_at', DateTime, nullable=False, server_default=text('CURRENT_TIMESTAMP'))
         )
         
+        # Sync checkpoint table to resume interrupted chunked writes
+        self.sync_checkpoints = Table(
+            'sync_checkpoints',
+            self.metadata,
+            Column('budget_id', String, primary_key=True),
+            Column('entity_type', String, primary_key=True),
+            Column('start_knowledge', Integer),
+            Column('target_knowledge', Integer),
+            Column('cursor', String, nullable=False),
+            Column('rows_written', Integer, nullable=False),
+            Column('updated_at', DateTime, nullable=False, server_default=text('CURRENT_TIMESTAMP'))
+        )
+        
+        # Watermarks of post-sync pipeline stages, in server knowledge
+        self.stage_watermarks = Table(
+            'stage_watermarks',
+            self.metadata,
+            Column('budget_id', String, primary_key=True),
+            Column('stage', String, primary_key=True),
+            Column('knowledge', Integer, nullable=False),
+            Column('updated_at', DateTime, nullable=False, server_default=text('CURRENT_TIMESTAMP'))
+        )
+        
         # Budget table
         self.budgets = Table(
             'budgets',
@@ -73,7 +176,9 @@ class DatabaseService:
             Column('cleared_balance', Integer),
             Column('uncleared_balance', Integer),
             Column('transfer_payee_id', String),
-            Column('deleted', Boolean, default=False)
+            Column('deleted', Boolean, default=False),
+            # Live rows of a budget, without the tombstones every query filters out
+            Index('ix_accounts_live_budget', 'budget_id', postgresql_where=text('NOT deleted'))
         )
         
         # Category Group table
@@ -84,7 +189,8 @@ class DatabaseService:
             Column('budget_id', String, ForeignKey('budgets.id'), nullable=False),
             Column('name', String, nullable=False),
             Column('hidden', Boolean, default=False),
-            Column('deleted', Boolean, default=False)
+            Column('deleted', Boolean, default=False),
+            Index('ix_category_groups_live_budget', 'budget_id', postgresql_where=text('NOT deleted'))
         )
         
         # Category table
@@ -117,7 +223,10 @@ class DatabaseService:
             Column('budget_id', String, ForeignKey('budgets.id'), nullable=False),
             Column('name', String, nullable=False),
             Column('transfer_account_id', String),
-            Column('deleted', Boolean, default=False)
+            Column('deleted', Boolean, default=False),
+            Index('ix_payees_live_budget', 'budget_id', postgresql_where=text('NOT deleted')),
+            # Fuzzy payee search, tolerant of misspellings
+            Index('ix_payees_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
         )
         
         # Month table
@@ -142,7 +251,49 @@ class DatabaseService:
             Column('category_id', String, ForeignKey('categories.id'), primary_key=True),
             Column('budgeted', Integer),
             Column('activity', Integer),
-            Column('balance', Integer)
+            Column('balance', Integer),
+            **partition_options
+        )
+        
+        # Versions of each month's values (SCD2): a row is valid from the sync that
+        # wrote it until one wrote different values, valid_to is NULL while current
+        self.month_history = Table(
+            'month_history',
+            self.metadata,
+            Column('budget_id', String, ForeignKey('budgets.id'), primary_key=True),
+            Column('month', String, primary_key=True),
+            Column('valid_from', DateTime, primary_key=True),
+            Column('valid_to', DateTime),
+            Column('knowledge', Integer),
+            Column('to_be_budgeted', Integer),
+            Column('age_of_money', Integer),
+            Column('income', Integer),
+            Column('budgeted', Integer),
+            Column('activity', Integer),
+            Index('ix_month_history_current', 'budget_id', 'month', unique=True, postgresql_where=text('valid_to IS NULL'))
+        )
+        
+        # Versions of each category month's values, as month_history. No foreign key
+        # to categories, so the history outlives purged categories. The primary key
+        # serves point-in-time reads of a month: one range of the index per month
+        self.category_month_history = Table(
+            'category_month_history',
+            self.metadata,
+            Column('budget_id', String, ForeignKey('budgets.id'), primary_key=True),
+            Column('month', String, primary_key=True),
+            Column('category_id', String, primary_key=True),
+            Column('valid_from', DateTime, primary_key=True),
+            Column('valid_to', DateTime),
+            Column('knowledge', Integer),
+            Column('budgeted', Integer),
+            Column('activity', Integer),
+            Column('balance', Integer),
+            Index(
+                'ix_category_month_history_current',
+                'budget_id', 'month', 'category_id',
+                unique=True,
+                postgresql_where=text('valid_to IS NULL')
+            )
         )
         
         # Transaction table
@@ -150,11 +301,11 @@ class DatabaseService:
             'transactions',
             self.metadata,
             Column('id', String, primary_key=True),
-            Column('budget_id', String, ForeignKey('budgets.id'), nullable=False),
+            Column('budget_id', String, ForeignKey('budgets.id'), nullable=False, primary_key=self.partitioned),
             Column('account_id', String, ForeignKey('accounts.id'), nullable=False),
             Column('category_id', String, ForeignKey('categories.id')),
             Column('payee_id', String, ForeignKey('payees.id')),
-            Column('date', String, nullable=False),
+            Column('date', String, nullable=False, primary_key=self.partitioned),
             Column('amount', Integer, nullable=False),
             Column('memo', String),
             Column('cleared', String, nullable=False),
@@ -162,20 +313,39 @@ class DatabaseService:
             Column('flag_color', String),
             Column('flag_name', String),
             Column('import_id', String),
-            Column('deleted', Boolean, default=False)
+            Column('deleted', Boolean, default=False),
+            Column('server_knowledge', Integer),
+            # Full-text search over memos, maintained by Postgres on every write
+            Column('memo_tsv', TSVECTOR, Computed("to_tsvector('simple', coalesce(memo, ''))", persisted=True)),
+            Index('ix_transactions_budget_date', 'budget_id', 'date'),
+            Index('ix_transactions_budget_knowledge', 'budget_id', 'server_knowledge'),
+            Index('ix_transactions_budget_payee', 'budget_id', 'payee_id'),
+            # Duplicate and transfer matching probes an (account, amount) bucket over a date range
+            Index(
+                'ix_transactions_match',
+                'budget_id', 'account_id', 'amount', 'date',
+                postgresql_include=['import_id', 'payee_id', 'deleted']
+            ),
+            Index('ix_transactions_memo_tsv', 'memo_tsv', postgresql_using='gin'),
+            Index('ix_transactions_memo_trgm', 'memo', postgresql_using='gin', postgresql_ops={'memo': 'gin_trgm_ops'}),
+            **partition_options
         )
+        if self.partitioned:
+            # Lookups by ID alone have to probe every partition's ID index
+            Index('ix_transactions_id', self.transactions.c.id)
         
         # Subtransaction table
         self.subtransactions = Table(
             'subtransactions',
             self.metadata,
             Column('id', String, primary_key=True),
-            Column('transaction_id', String, ForeignKey('transactions.id'), nullable=False),
+            Column('transaction_id', String, *transaction_fk, nullable=False),
             Column('category_id', String, ForeignKey('categories.id')),
             Column('amount', Integer, nullable=False),
             Column('memo', String),
             Column('payee_id', String, ForeignKey('payees.id')),
-            Column('deleted', Boolean, default=False)
+            Column('deleted', Boolean, default=False),
+            Index('ix_subtransactions_transaction', 'transaction_id')
         )
         
         # Scheduled Transaction table
@@ -188,12 +358,14 @@ class DatabaseService:
             Column('category_id', String, ForeignKey('categories.id')),
             Column('payee_id', String, ForeignKey('payees.id')),
             Column('date', String),
+            Column('date_first', String),
             Column('amount', Integer, nullable=False),
             Column('memo', String),
             Column('frequency', String, nullable=False),
             Column('flag_color', String),
             Column('flag_name', String),
-            Column('deleted', Boolean, default=False)
+            Column('deleted', Boolean, default=False),
+            Index('ix_scheduled_transactions_live_budget', 'budget_id', postgresql_where=text('NOT deleted'))
         )
         
         # Scheduled Subtransaction table
@@ -206,9 +378,220 @@ class DatabaseService:
             Column('amount', Integer, nullable=False),
             Column('memo', String),
             Column('payee_id', String, ForeignKey('payees.id')),
-            Column('deleted', Boolean, default=False)
+            Column('deleted', Boolean, default=False),
+            Index('ix_scheduled_subtransactions_transaction', 'scheduled_transaction_id')
+        )
+        
+        # Running balance of each account at the end of every day with activity
+        self.account_daily_balances = Table(
+            'account_daily_balances',
+            self.metadata,
+            Column('account_id', String, primary_key=True),
+            Column('date', String, primary_key=True),
+            Column('budget_id', String, ForeignKey('budgets.id'), nullable=False),
+            Column('activity', Integer, nullable=False),
+            Column('balance', Integer, nullable=False),
+            Index('ix_account_daily_balances_budget_date', 'budget_id', 'date')
+        )
+        
+        # Earliest transaction date per account whose daily balances are out of date
+        self.balance_dirty_ranges = Table(
+            'balance_dirty_ranges',
+            self.metadata,
+            Column('budget_id', String, primary_key=True),
+            Column('account_id', String, primary_key=True),
+            Column('from_date', String, nullable=False)
+        )
+        
+        # Running amount and interval statistics per payee and per category, kept by the anomaly stage
+        self.anomaly_stats = Table(
+            'anomaly_stats',
+            self.metadata,
+            Column('budget_id', String, ForeignKey('budgets.id'), primary_key=True),
+            Column('key_type', String, primary_key=True),
+            Column('key_id', String, primary_key=True),
+            Column('count', Integer, nullable=False),
+            Column('mean', Float, nullable=False),
+            Column('m2', Float, nullable=False),
+            Column('last_date', String),
+            Column('interval_count', Integer, nullable=False),
+            Column('interval_mean', Float, nullable=False),
+            Column('interval_m2', Float, nullable=False),
+            Column('recurring', Boolean, nullable=False)
+        )
+
+        # Outflows absorbed into the anomaly statistics with their score; flagged ones have reasons
+        self.transaction_scores = Table(
+            'transaction_scores',
+            self.metadata,
+            Column('transaction_id', String, primary_key=True),
+            Column('budget_id', String, ForeignKey('budgets.id'), nullable=False),
+            Column('date', String, nullable=False),
+            Column('amount', Integer, nullable=False),
+            Column('payee_id', String),
+            Column('category_id', String),
+            Column('score', Float, nullable=False),
+            Column('expected_amount', Integer),
+            Column('reasons', String),
+            Column('scored_at', DateTime, nullable=False, server_default=text('CURRENT_TIMESTAMP')),
+            Index(
+                'ix_transaction_scores_flagged',
+                'budget_id',
+                'date',
+                postgresql_where=text('reasons IS NOT NULL')
+            )
+        )
+
+        # Likely duplicate imports and unmatched transfers, kept by the match stage
+        self.transaction_matches = Table(
+            'transaction_matches',
+            self.metadata,
+            Column('id', Integer, primary_key=True, autoincrement=True),
+            Column('budget_id', String, ForeignKey('budgets.id'), nullable=False),
+            Column('kind', String, nullable=False),
+            Column('transaction_id', String, nullable=False),
+            # The other transaction of the pair, or the candidate counterpart of an unmatched transfer
+            Column('match_id', String),
+            Column('days_apart', Integer),
+            Column('score', Float, nullable=False),
+            Index('ix_transaction_matches_pair', 'transaction_id', 'match_id', 'kind', unique=True),
+            Index('ix_transaction_matches_match', 'match_id'),
+            # Best matches first, of one kind or of all
+            Index('ix_transaction_matches_budget_kind_score', 'budget_id', 'kind', 'score'),
+            Index('ix_transaction_matches_budget_score', 'budget_id', 'score')
+        )
+        
+        # Embedding table for RAG, one vector per transaction, payee or month summary
+        self.embeddings = Table(
+            'embeddings',
+            self.metadata,
+            Column('budget_id', String, ForeignKey('budgets.id'), primary_key=True),
+            Column('source_type', String, primary_key=True),
+            Column('source_id', String, primary_key=True),
+            Column('content_hash', String, nullable=False),
+            Column('content', String, nullable=False),
+            Column('embedding', ARRAY(Float), nullable=False),
+            Column('updated_at', DateTime, nullable=False, server_default=text('CURRENT_TIMESTAMP')),
+            Index('ix_embeddings_content_hash', 'content_hash')
+        )
+        
+        # Last consistency check of each budget against YNAB's aggregates
+        self.verifications = Table(
+            'verifications',
+            self.metadata,
+            Column('budget_id', String, ForeignKey('budgets.id'), primary_key=True),
+            Column('verified_at', DateTime, nullable=False, server_default=text('CURRENT_TIMESTAMP')),
+            Column('knowledge', Integer),
+            Column('accounts_checked', Integer, nullable=False),
+            Column('months_checked', Integer, nullable=False),
+            Column('mismatches', Integer, nullable=False),
+            Column('repaired', Integer, nullable=False)
+        )
+        
+        # Soft-deleted rows seen by the maintenance stage, purged once past the retention window
+        self.tombstones = Table(
+            'tombstones',
+            self.metadata,
+            Column('budget_id', String, primary_key=True),
+            Column('table_name', String, primary_key=True),
+            Column('row_id', String, primary_key=True),
+            Column('seen_at', DateTime, nullable=False, server_default=text('CURRENT_TIMESTAMP'))
+        )
+        
+        # Purged tombstones, kept as JSON when the maintenance stage archives instead of deleting
+        self.archived_rows = Table(
+            'archived_rows',
+            self.metadata,
+            Column('id', Integer, primary_key=True, autoincrement=True),
+            Column('budget_id', String, nullable=False),
+            Column('table_name', String, nullable=False),
+            Column('row_id', String, nullable=False),
+            Column('data', JSONB, nullable=False),
+            Column('archived_at', DateTime, nullable=False, server_default=text('CURRENT_TIMESTAMP')),
+            Index('ix_archived_rows_budget_table', 'budget_id', 'table_name', 'row_id')
+        )
+        
+        # Sync job queue table, one row per queued budget sync
+        self.sync_jobs = Table(
+            'sync_jobs',
+            self.metadata,
+            Column('id', Integer, primary_key=True, autoincrement=True),
+            Column('budget_id', String, nullable=False),
+            Column('status', String, nullable=False, server_default='pending'),
+            Column('attempts', Integer, nullable=False, server_default='0'),
+            Column('run_after', DateTime, nullable=False, server_default=text('CURRENT_TIMESTAMP')),
+            Column('lease_expires_at', DateTime),
+            Column('locked_by', String),
+            Column('last_error', String),
+            Column('created_at', DateTime, nullable=False, server_default=text('CURRENT_TIMESTAMP')),
+            Column('updated_at', DateTime, nullable=False, server_default=text('CURRENT_TIMESTAMP')),
+            # At most one pending or running job per budget
+            Index(
+                'ix_sync_jobs_active_budget',
+                'budget_id',
+                unique=True,
+                postgresql_where=text("status IN ('pending', 'running')")
+            ),
+            Index('ix_sync_jobs_claim', 'status', 'run_after')
+        )
+        
+        # Scheduler state, e.g. when the last round of sync jobs was enqueued
+        self.sync_scheduler = Table(
+            'sync_scheduler',
+            self.metadata,
+            Column('name', String, primary_key=True),
+            Column('last_run_at', DateTime, nullable=False)
         )
     
+    def get_stage_watermark(self, budget_id, stage):
+        """
+        Get the server knowledge up to which a post-sync stage has processed a budget.
+        
+        Args:
+            budget_id (str): The budget ID
+            stage (str): The stage name (e.g., 'embeddings')
+            
+        Returns:
+            int: The stage watermark, or None if the stage never ran
+        """
+        session = self.Session()
+        try:
+            row = session.query(self.stage_watermarks).filter_by(budget_id=budget_id, stage=stage).first()
+            return row.knowledge if row else None
+        finally:
+            session.close()
+    
+    def set_stage_watermark(self, budget_id, stage, knowledge):
+        """
+        Record the server knowledge up to which a post-sync stage has processed a budget.
+        
+        Args:
+            budget_id (str): The budget ID
+            stage (str): The stage name (e.g., 'embeddings')
+            knowledge (int): The new watermark
+        """
+        session = self.Session()
+        try:
+            stmt = insert(self.stage_watermarks).values(
+                budget_id=budget_id,
+                stage=stage,
+                knowledge=knowledge,
+                updated_at=text('CURRENT_TIMESTAMP')
+            )
+            session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=['budget_id', 'stage'],
+                    set_={'knowledge': stmt.excluded.knowledge, 'updated_at': stmt.excluded.updated_at}
+                )
+            )
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error updating stage watermark: {str(e)}")
+            raise
+        finally:
+            session.close()
+    
     def get_server_knowledge(self, budget_id):
         """
         Get the server knowledge for all entity types for a budget.
@@ -231,9 +614,60 @@ class DatabaseService:
         finally:
             session.close()
     
+    def notify_change(self, session, budget_id, entity_type, knowledge):
+        """
+        Publish a change event on CHANGES_CHANNEL within an open session.
+        Postgres delivers it to listeners when the session commits, and not at
+        all if it rolls back.
+        
+        Args:
+            session (Session): The open database session
+            budget_id (str): The budget ID
+            entity_type (str): The changed entity type (e.g., 'transactions', 'balances')
+            knowledge (int): Server knowledge the data is now at
+        """
+        payload = json.dumps({'budget_id': budget_id, 'entity': entity_type, 'server_knowledge': knowledge})
+        session.execute(select(func.pg_notify(CHANGES_CHANNEL, payload)))
+    
+    def _set_server_knowledge(self, session, budget_id, entity_type, knowledge):
+        """
+        Upsert the server knowledge for an entity type within an open session,
+        so it commits atomically with the data it describes. A change event is
+        published when the knowledge moved.
+        
+        Args:
+            session (Session): The open database session
+            budget_id (str): The budget ID
+            entity_type (str): The entity type (e.g., 'accounts', 'transactions')
+            knowledge (int): The new server knowledge value
+        """
+        previous = session.execute(
+            select(self.server_knowledge.c.knowledge).where(
+                (self.server_knowledge.c.budget_id == budget_id) &
+                (self.server_knowledge.c.entity_type == entity_type)
+            )
+        ).scalar()
+        if previous != knowledge:
+            self.notify_change(session, budget_id, entity_type, knowledge)
+        
+        stmt = insert(self.server_knowledge).values(
+            budget_id=budget_id,
+            entity_type=entity_type,
+            knowledge=knowledge,
+            updated_at=text('CURRENT_TIMESTAMP')
+        )
+        session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=['budget_id', 'entity_type'],
+                set_={'knowledge': stmt.excluded.knowledge, 'updated_at': stmt.excluded.updated_at}
+            )
+        )
+    
     def _update_server_knowledge(self, budget_id, entity_type, knowledge):
         """
-        Update the server knowledge for an entity type.
+        Update the server knowledge for an entity type in its own transaction.
+        Only for a payload without rows: writers with rows set the knowledge in
+        their own session, so the change event is sent with the committed rows.
         
         Args:
             budget_id (str): The budget ID
@@ -242,34 +676,7 @@ class DatabaseService:
         """
         session = self.Session()
         try:
-            # Check if record exists
-            existing = session.query(self.server_knowledge).filter_by(
-                budget_id=budget_id, 
-                entity_type=entity_type
-            ).first()
-            
-            if existing:
-                # Update existing record
-                session.execute(
-                    self.server_knowledge.update().where(
-                        (self.server_knowledge.c.budget_id == budget_id) & 
-                        (self.server_knowledge.c.entity_type == entity_type)
-                    ).values(
-                        knowledge=knowledge,
-                        updated_at=text('CURRENT_TIMESTAMP')
-                    )
-                )
-            else:
-                # Insert new record
-                session.execute(
-                    self.server_knowledge.insert().values(
-                        budget_id=budget_id,
-                        entity_type=entity_type,
-                        knowledge=knowledge,
-                        updated_at=text('CURRENT_TIMESTAMP')
-                    )
-                )
-            
+            self._set_server_knowledge(session, budget_id, entity_type, knowledge)
             session.commit()
         except Exception as e:
             session.rollback()
@@ -278,6 +685,71 @@ class DatabaseService:
         finally:
             session.close()
     
+    def get_checkpoint(self, budget_id, entity_type):
+        """
+        Get the checkpoint of an interrupted chunked write, if any.
+        
+        Args:
+            budget_id (str): The budget ID
+            entity_type (str): The entity type (e.g., 'transactions')
+            
+        Returns:
+            dict: Checkpoint with start_knowledge, target_knowledge, cursor and rows_written, or None
+        """
+        session = self.Session()
+        try:
+            row = session.query(self.sync_checkpoints).filter_by(
+                budget_id=budget_id,
+                entity_type=entity_type
+            ).first()
+            
+            if row is None:
+                return None
+            
+            return {
+                'start_knowledge': row.start_knowledge,
+                'target_knowledge': row.target_knowledge,
+                'cursor': row.cursor,
+                'rows_written': row.rows_written
+            }
+        finally:
+            session.close()
+    
+    def _save_checkpoint(self, session, budget_id, entity_type, start_knowledge, target_knowledge, cursor, rows_written):
+        """
+        Upsert the checkpoint of a chunked write within an open session.
+        
+        Args:
+            session (Session): The open database session
+            budget_id (str): The budget ID
+            entity_type (str): The entity type (e.g., 'transactions')
+            start_knowledge (int): Server knowledge the payload was fetched from
+            target_knowledge (int): Server knowledge to record once the write completes
+            cursor (str): ID of the last row committed
+            rows_written (int): Number of rows committed so far
+        """
+        stmt = insert(self.sync_checkpoints).values(
+            budget_id=budget_id,
+            entity_type=entity_type,
+            start_knowledge=start_knowledge,
+            target_knowledge=target_knowledge,
+            cursor=cursor,
+            rows_written=rows_written,
+            updated_at=text('CURRENT_TIMESTAMP')
+        )
+        session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=['budget_id', 'entity_type'],
+                set_={
+                    'start_knowledge': stmt.excluded.start_knowledge,
+                    'target_knowledge': stmt.excluded.target_knowledge,
+                    'cursor': stmt.excluded.cursor,
+                    'rows_written': stmt.excluded.rows_written,
+                    'updated_at': stmt.excluded.updated_at
+                }
+            )
+        )
+    
     def save_budgets(self, budgets):
         """
         Save budgets to the database.
@@ -337,22 +809,15 @@ class DatabaseService:
             budget_id (str): The budget ID
             accounts_data (dict): Dictionary containing accounts and server_knowledge
         """
-        if 'server_knowledge' in accounts_data:
-            self._update_server_knowledge(budget_id, 'accounts', accounts_data['server_knowledge'])
-        
         if 'accounts' not in accounts_data:
+            if 'server_knowledge' in accounts_data:
+                self._update_server_knowledge(budget_id, 'accounts', accounts_data['server_knowledge'])
             return
         
         accounts = accounts_data['accounts']
         session = self.Session()
         try:
-            # Mark all accounts as deleted first (will be updated if still exist)
-            session.execute(
-                self.accounts.update().where(
-                    self.accounts.c.budget_id == budget_id
-                ).values(deleted=True)
-            )
-            
+            # A delta only contains changed accounts; YNAB flags deleted ones itself
             for account in accounts:
                 # Check if account exists
                 existing = session.query(self.accounts).filter_by(id=account.id).first()
@@ -369,7 +834,7 @@ class DatabaseService:
                     'cleared_balance': account.cleared_balance,
                     'uncleared_balance': account.uncleared_balance,
                     'transfer_payee_id': account.transfer_payee_id,
-                    'deleted': False
+                    'deleted': bool(getattr(account, 'deleted', False))
                 }
                 
                 if existing:
@@ -385,6 +850,8 @@ class DatabaseService:
                         self.accounts.insert().values(**account_data)
                     )
             
+            if 'server_knowledge' in accounts_data:
+                self._set_server_knowledge(session, budget_id, 'accounts', accounts_data['server_knowledge'])
             session.commit()
             logger.info(f"Saved {len(accounts)} accounts to database for budget {budget_id}")
         except Exception as e:
@@ -402,30 +869,15 @@ class DatabaseService:
             budget_id (str): The budget ID
             categories_data (dict): Dictionary containing category_groups and server_knowledge
         """
-        if 'server_knowledge' in categories_data:
-            self._update_server_knowledge(budget_id, 'categories', categories_data['server_knowledge'])
-        
         if 'category_groups' not in categories_data:
+            if 'server_knowledge' in categories_data:
+                self._update_server_knowledge(budget_id, 'categories', categories_data['server_knowledge'])
             return
         
         category_groups = categories_data['category_groups']
         session = self.Session()
         try:
-            # Mark all category groups and categories as deleted first
-            session.execute(
-                self.category_groups.update().where(
-                    self.category_groups.c.budget_id == budget_id
-                ).values(deleted=True)
-            )
-            
-            session.execute(
-                self.categories.update().where(
-                    self.categories.c.category_group_id.in_(
-                        session.query(self.category_groups.c.id).filter_by(budget_id=budget_id)
-                    )
-                ).values(deleted=True)
-            )
-            
+            # A delta only contains changed groups and categories; YNAB flags deleted ones itself
             for group in category_groups:
                 # Save category group
                 group_data = {
@@ -433,7 +885,7 @@ class DatabaseService:
                     'budget_id': budget_id,
                     'name': group.name,
                     'hidden': group.hidden,
-                    'deleted': False
+                    'deleted': bool(getattr(group, 'deleted', False))
                 }
                 
                 existing_group = session.query(self.category_groups).filter_by(id=group.id).first()
@@ -468,7 +920,7 @@ class DatabaseService:
                             'goal_under_funded': getattr(category, 'goal_under_funded', None),
                             'goal_overall_funded': getattr(category, 'goal_overall_funded', None),
                             'goal_overall_left': getattr(category, 'goal_overall_left', None),
-                            'deleted': False
+                            'deleted': bool(getattr(category, 'deleted', False))
                         }
                         
                         existing_category = session.query(self.categories).filter_by(id=category.id).first()
@@ -484,6 +936,8 @@ class DatabaseService:
                                 self.categories.insert().values(**category_data)
                             )
             
+            if 'server_knowledge' in categories_data:
+                self._set_server_knowledge(session, budget_id, 'categories', categories_data['server_knowledge'])
             session.commit()
             logger.info(f"Saved {len(category_groups)} category groups to database for budget {budget_id}")
         except Exception as e:
@@ -501,29 +955,22 @@ class DatabaseService:
             budget_id (str): The budget ID
             payees_data (dict): Dictionary containing payees and server_knowledge
         """
-        if 'server_knowledge' in payees_data:
-            self._update_server_knowledge(budget_id, 'payees', payees_data['server_knowledge'])
-        
         if 'payees' not in payees_data:
+            if 'server_knowledge' in payees_data:
+                self._update_server_knowledge(budget_id, 'payees', payees_data['server_knowledge'])
             return
         
         payees = payees_data['payees']
         session = self.Session()
         try:
-            # Mark all payees as deleted first
-            session.execute(
-                self.payees.update().where(
-                    self.payees.c.budget_id == budget_id
-                ).values(deleted=True)
-            )
-            
+            # A delta only contains changed payees; YNAB flags deleted ones itself
             for payee in payees:
                 payee_data = {
                     'id': payee.id,
                     'budget_id': budget_id,
                     'name': payee.name,
                     'transfer_account_id': getattr(payee, 'transfer_account_id', None),
-                    'deleted': False
+                    'deleted': bool(getattr(payee, 'deleted', False))
                 }
                 
                 existing_payee = session.query(self.payees).filter_by(id=payee.id).first()
@@ -539,6 +986,8 @@ class DatabaseService:
                         self.payees.insert().values(**payee_data)
                     )
             
+            if 'server_knowledge' in payees_data:
+                self._set_server_knowledge(session, budget_id, 'payees', payees_data['server_knowledge'])
             session.commit()
             logger.info(f"Saved {len(payees)} payees to database for budget {budget_id}")
         except Exception as e:
@@ -548,94 +997,470 @@ class DatabaseService:
         finally:
             session.close()
     
-    def save_transactions(self, budget_id, transactions_data):
+    def save_transactions(self, budget_id, transactions_data, checkpoint=None):
         """
         Save transactions to the database.
         
+        Transactions are written in chunks of chunk_size rows, ordered by ID.
+        Each chunk commits together with a checkpoint, so an interrupted write
+        can be resumed instead of starting over. Server knowledge is only
+        advanced once the last chunk is committed.
+        
         Args:
             budget_id (str): The budget ID
             transactions_data (dict): Dictionary containing transactions and server_knowledge
+            checkpoint (dict, optional): Checkpoint of an interrupted write to resume from
         """
-        if 'server_knowledge' in transactions_data:
-            self._update_server_knowledge(budget_id, 'transactions', transactions_data['server_knowledge'])
-        
         if 'transactions' not in transactions_data:
+            if 'server_knowledge' in transactions_data:
+                self._update_server_knowledge(budget_id, 'transactions', transactions_data['server_knowledge'])
             return
         
-        transactions = transactions_data['transactions']
-        session = self.Session()
-        try:
-            # Mark all transactions as deleted first
-            session.execute(
-                self.transactions.update().where(
-                    self.transactions.c.budget_id == budget_id
-                ).values(deleted=True)
-            )
-            
-            for transaction in transactions:
-                transaction_data = {
-                    'id': transaction.id,
-                    'budget_id': budget_id,
-                    'account_id': transaction.account_id,
-                    'category_id': getattr(transaction, 'category_id', None),
-                    'payee_id': getattr(transaction, 'payee_id', None),
-                    'date': transaction.date,
-                    'amount': transaction.amount,
-                    'memo': getattr(transaction, 'memo', None),
-                    'cleared': transaction.cleared,
-                    'approved': transaction.approved,
-                    'flag_color': getattr(transaction, 'flag_color', None),
-                    'flag_name': getattr(transaction, 'flag_name', None),
-                    'import_id': getattr(transaction, 'import_id', None),
-                    'deleted': False
-                }
-                
-                existing_transaction = session.query(self.transactions).filter_by(id=transaction.id).first()
+        transactions = sorted(transactions_data['transactions'], key=lambda transaction: transaction.id)
+        
+        if checkpoint:
+            # Rows up to the cursor are already written at the checkpoint's knowledge,
+            # so that is the knowledge that is safe to record once the rest is written
+            transactions = [transaction for transaction in transactions if transaction.id > checkpoint['cursor']]
+            start_knowledge = checkpoint['start_knowledge']
+            target_knowledge = checkpoint['target_knowledge']
+            rows_written = checkpoint['rows_written']
+            logger.info(f"Resuming transactions for budget {budget_id} after {rows_written} rows")
+        else:
+            start_knowledge = self.get_server_knowledge(budget_id).get('transactions')
+            target_knowledge = transactions_data.get('server_knowledge')
+            rows_written = 0
+        
+        chunks = [
+            transactions[start:start + self.chunk_size]
+            for start in range(0, len(transactions), self.chunk_size)
+        ] or [[]]
+        
+        for index, chunk in enumerate(chunks):
+            session = self.Session()
+            try:
+                self._write_transactions(session, budget_id, chunk, transactions_data.get('server_knowledge'))
+                rows_written += len(chunk)
                 
-                if existing_transaction:
+                if index == len(chunks) - 1:
+                    if target_knowledge is not None:
+                        self._set_server_knowledge(session, budget_id, 'transactions', target_knowledge)
                     session.execute(
-                        self.transactions.update().where(
-                            self.transactions.c.id == transaction.id
-                        ).values(**transaction_data)
+                        self.sync_checkpoints.delete().where(
+                            (self.sync_checkpoints.c.budget_id == budget_id) &
+                            (self.sync_checkpoints.c.entity_type == 'transactions')
+                        )
                     )
                 else:
-                    session.execute(
-                        self.transactions.insert().values(**transaction_data)
+                    self._save_checkpoint(
+                        session, budget_id, 'transactions',
+                        start_knowledge, target_knowledge, chunk[-1].id, rows_written
                     )
                 
-                # Save subtransactions if any
-                if hasattr(transaction, 'subtransactions') and transaction.subtransactions:
-                    # Delete existing subtransactions for this transaction
-                    session.execute(
-                        self.subtransactions.delete().where(
-                            self.subtransactions.c.transaction_id == transaction.id
-                        )
-                    )
-                    
-                    for subtransaction in transaction.subtransactions:
-                        subtransaction_data = {
-                            'id': subtransaction.id,
-                            'transaction_id': transaction.id,
-                            'category_id': getattr(subtransaction, 'category_id', None),
-                            'amount': subtransaction.amount,
-                            'memo': getattr(subtransaction, 'memo', None),
-                            'payee_id': getattr(subtransaction, 'payee_id', None),
-                            'deleted': False
-                        }
-                        
-                        session.execute(
-                            self.subtransactions.insert().values(**subtransaction_data)
-                        )
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Error saving transactions: {str(e)}")
+                raise
+            finally:
+                session.close()
+        
+        logger.info(f"Saved {rows_written} transactions to database for budget {budget_id}")
+    
+    def _write_transactions(self, session, budget_id, transactions, knowledge):
+        """
+        Upsert a chunk of transactions and replace their subtransactions.
+        
+        Args:
+            session (Session): The open database session
+            budget_id (str): The budget ID
+            transactions (list): Transaction objects from YNAB API
+            knowledge (int): Server knowledge of the payload, stored so post-sync stages can find changed rows
+        """
+        if not transactions:
+            return
+        
+        transaction_rows = []
+        subtransaction_rows = []
+        for transaction in transactions:
+            transaction_rows.append({
+                'id': transaction.id,
+                'budget_id': budget_id,
+                'account_id': transaction.account_id,
+                'category_id': getattr(transaction, 'category_id', None),
+                'payee_id': getattr(transaction, 'payee_id', None),
+                'date': transaction.date,
+                'amount': transaction.amount,
+                'memo': getattr(transaction, 'memo', None),
+                'cleared': transaction.cleared,
+                'approved': transaction.approved,
+                'flag_color': getattr(transaction, 'flag_color', None),
+                'flag_name': getattr(transaction, 'flag_name', None),
+                'import_id': getattr(transaction, 'import_id', None),
+                'deleted': bool(getattr(transaction, 'deleted', False)),
+                'server_knowledge': knowledge
+            })
+            
+            for subtransaction in getattr(transaction, 'subtransactions', None) or []:
+                subtransaction_rows.append({
+                    'id': subtransaction.id,
+                    'transaction_id': transaction.id,
+                    'category_id': getattr(subtransaction, 'category_id', None),
+                    'amount': subtransaction.amount,
+                    'memo': getattr(subtransaction, 'memo', None),
+                    'payee_id': getattr(subtransaction, 'payee_id', None),
+                    'deleted': bool(getattr(subtransaction, 'deleted', False))
+                })
+        
+        if self.partitioned:
+            # Partitions are created in their own transaction, before this session locks the table
+            self.partitions.ensure_partitions('transactions', budget_id, [row['date'] for row in transaction_rows])
+        
+        self._mark_balances_dirty(session, budget_id, transaction_rows)
+        
+        key_columns = ['id']
+        if self.partitioned:
+            key_columns = ['budget_id', 'date', 'id']
+            
+            # A transaction whose date changed lives in another partition, so remove the old row
+            session.execute(
+                text(
+                    "DELETE FROM transactions USING unnest(CAST(:ids AS varchar[]), CAST(:dates AS varchar[])) AS moved(id, date) "
+                    "WHERE transactions.budget_id = :budget_id AND transactions.id = moved.id AND transactions.date <> moved.date"
+                ),
+                {
+                    'budget_id': budget_id,
+                    'ids': [row['id'] for row in transaction_rows],
+                    'dates': [str(row['date']) for row in transaction_rows]
+                }
+            )
+        
+        stmt = insert(self.transactions)
+        session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=key_columns,
+                set_={
+                    column: stmt.excluded[column]
+                    for column in transaction_rows[0]
+                    if column not in key_columns
+                }
+            ),
+            transaction_rows
+        )
+        
+        # Subtransactions are always sent in full with their parent, so replace them
+        session.execute(
+            self.subtransactions.delete().where(
+                self.subtransactions.c.transaction_id.in_([row['id'] for row in transaction_rows])
+            )
+        )
+        if subtransaction_rows:
+            session.execute(self.subtransactions.insert(), subtransaction_rows)
+    
+    def replace_account_transactions(self, budget_id, account_id, transactions, knowledge):
+        """
+        Replace the transactions of one account with a full fetch of that account.
+        
+        Fetched transactions are upserted, and stored live transactions of the
+        account that the fetch no longer contains are marked deleted. Rows are
+        stamped with the given knowledge and the budget's stage watermarks are
+        moved below it, so post-sync stages reprocess the repaired rows. The
+        budget's server knowledge itself is left alone, so the next delta sync
+        still covers everything since the last one.
+        
+        Args:
+            budget_id (str): The budget ID
+            account_id (str): The account ID
+            transactions (list): All live transactions of the account from YNAB API
+            knowledge (int): Server knowledge to stamp on the written rows
             
+        Returns:
+            int: Number of stored transactions marked deleted
+        """
+        transactions = sorted(transactions, key=lambda transaction: transaction.id)
+        fetched = {transaction.id for transaction in transactions}
+        session = self.Session()
+        try:
+            stored = session.execute(
+                select(self.transactions.c.id, self.transactions.c.account_id, self.transactions.c.date).where(
+                    (self.transactions.c.budget_id == budget_id) &
+                    (self.transactions.c.account_id == account_id) &
+                    (self.transactions.c.deleted == False)
+                )
+            ).all()
+            stale = [row._asdict() for row in stored if row.id not in fetched]
+            
+            for start in range(0, len(transactions), self.chunk_size):
+                self._write_transactions(session, budget_id, transactions[start:start + self.chunk_size], knowledge)
+            if stale:
+                self._mark_balances_dirty(session, budget_id, stale)
+                session.execute(
+                    self.transactions.update().where(
+                        (self.transactions.c.budget_id == budget_id) &
+                        self.transactions.c.id.in_([row['id'] for row in stale])
+                    ).values(deleted=True, server_knowledge=knowledge)
+                )
+            
+            self._rewind_stage_watermarks(session, budget_id, knowledge - 1)
+            self.notify_change(session, budget_id, 'transactions', knowledge)
             session.commit()
-            logger.info(f"Saved {len(transactions)} transactions to database for budget {budget_id}")
+            logger.info(
+                f"Replaced {len(transactions)} transactions of account {account_id} for budget {budget_id}, "
+                f"{len(stale)} marked deleted"
+            )
+            return len(stale)
         except Exception as e:
             session.rollback()
-            logger.error(f"Error saving transactions: {str(e)}")
+            logger.error(f"Error replacing account transactions: {str(e)}")
             raise
         finally:
             session.close()
     
+    def _month_rows(self, budget_id, month):
+        """Live table rows of a month from YNAB API: the month row and its category month rows."""
+        key = str(month.month)
+        month_row = {
+            'budget_id': budget_id,
+            'month': key,
+            'to_be_budgeted': getattr(month, 'to_be_budgeted', None),
+            'age_of_money': getattr(month, 'age_of_money', None),
+            'income': getattr(month, 'income', None),
+            'budgeted': getattr(month, 'budgeted', None),
+            'activity': getattr(month, 'activity', None)
+        }
+        category_rows = [
+            {
+                'budget_id': budget_id,
+                'month': key,
+                'category_id': category.id,
+                'budgeted': getattr(category, 'budgeted', None),
+                'activity': getattr(category, 'activity', None),
+                'balance': getattr(category, 'balance', None)
+            }
+            for category in getattr(month, 'categories', None) or []
+        ]
+        return month_row, category_rows
+    
+    def _backfill_history(self, budget_id):
+        """
+        Open the first versions of a budget's months and category months from
+        the live tables, if it has no history yet. Months synced before the
+        history existed are not returned by later deltas until they change, so
+        without this they would have no current version. Commits in its own
+        transaction before a write, so the write versions its changes against
+        the backfilled values at a later timestamp.
+        
+        Args:
+            budget_id (str): The budget ID
+        """
+        session = self.Session()
+        try:
+            started = session.execute(
+                select(self.month_history.c.month).where(self.month_history.c.budget_id == budget_id).limit(1)
+            ).first()
+            if started:
+                return
+            
+            # The live values are only known to be valid from now on
+            params = {'budget_id': budget_id}
+            months = session.execute(
+                text(
+                    "INSERT INTO month_history (budget_id, month, valid_from, knowledge, to_be_budgeted, age_of_money, "
+                    "income, budgeted, activity) "
+                    "SELECT m.budget_id, m.month, CURRENT_TIMESTAMP, k.knowledge, m.to_be_budgeted, m.age_of_money, "
+                    "m.income, m.budgeted, m.activity "
+                    "FROM months m LEFT JOIN server_knowledge k ON k.budget_id = m.budget_id AND k.entity_type = 'months' "
+                    "WHERE m.budget_id = :budget_id"
+                ),
+                params
+            ).rowcount
+            category_months = session.execute(
+                text(
+                    "INSERT INTO category_month_history (budget_id, month, category_id, valid_from, knowledge, budgeted, "
+                    "activity, balance) "
+                    "SELECT cm.budget_id, cm.month, cm.category_id, CURRENT_TIMESTAMP, k.knowledge, cm.budgeted, "
+                    "cm.activity, cm.balance "
+                    "FROM category_months cm "
+                    "LEFT JOIN server_knowledge k ON k.budget_id = cm.budget_id AND k.entity_type = 'months' "
+                    "WHERE cm.budget_id = :budget_id"
+                ),
+                params
+            ).rowcount
+            if months or category_months:
+                logger.info(
+                    f"Backfilled history of {months} months and {category_months} category months for budget {budget_id}"
+                )
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error backfilling month history: {str(e)}")
+            raise
+        finally:
+            session.close()
+    
+    def _record_history(self, session, history, key_columns, rows, knowledge):
+        """
+        Version the rows just written to a live table in its history table.
+        
+        Only rows whose values differ from their current version are versioned:
+        the current version is closed and a new one opened, both at the time of
+        the write's transaction, in one bulk statement each. Unchanged rows
+        cost nothing but the comparison.
+        
+        Args:
+            session (Session): The open database session
+            history (Table): The history table
+            key_columns (list): Columns identifying a row within its budget
+            rows (list): Rows written to the live table, all of one budget
+            knowledge (int, optional): Server knowledge the rows were synced at
+            
+        Returns:
+            int: Number of new versions
+        """
+        if not rows:
+            return 0
+        
+        # The last row wins if a payload repeats one
+        rows = list({tuple(row[column] for column in key_columns): row for row in rows}.values())
+        value_columns = [column for column in rows[0] if column != 'budget_id' and column not in key_columns]
+        columns = key_columns + value_columns
+        
+        # The rows as one set: an array parameter per column, unnested together
+        incoming = "unnest({}) AS incoming({})".format(
+            ", ".join(
+                f"CAST(:{column} AS {history.c[column].type.compile(dialect=self.engine.dialect)}[])"
+                for column in columns
+            ),
+            ", ".join(columns)
+        )
+        same_key = " AND ".join(f"h.{column} = incoming.{column}" for column in key_columns)
+        params = {column: [row[column] for row in rows] for column in columns}
+        params.update(budget_id=rows[0]['budget_id'], knowledge=knowledge)
+        
+        session.execute(
+            text(
+                f"UPDATE {history.name} AS h SET valid_to = CURRENT_TIMESTAMP FROM {incoming} "
+                f"WHERE h.budget_id = :budget_id AND h.valid_to IS NULL AND {same_key} "
+                f"AND ({', '.join(f'h.{column}' for column in value_columns)}) "
+                f"IS DISTINCT FROM ({', '.join(f'incoming.{column}' for column in value_columns)})"
+            ),
+            params
+        )
+        return session.execute(
+            text(
+                f"INSERT INTO {history.name} (budget_id, {', '.join(columns)}, valid_from, knowledge) "
+                f"SELECT :budget_id, {', '.join(f'incoming.{column}' for column in columns)}, CURRENT_TIMESTAMP, :knowledge "
+                f"FROM {incoming} "
+                f"WHERE NOT EXISTS (SELECT 1 FROM {history.name} AS h "
+                f"WHERE h.budget_id = :budget_id AND h.valid_to IS NULL AND {same_key})"
+            ),
+            params
+        ).rowcount
+    
+    def replace_month(self, budget_id, month, knowledge=None):
+        """
+        Replace one month and its category months, leaving all other months alone.
+        
+        Args:
+            budget_id (str): The budget ID
+            month: Month detail from YNAB API, with its categories
+            knowledge (int, optional): Server knowledge of months the detail was fetched at, kept with its history
+        """
+        month_row, category_rows = self._month_rows(budget_id, month)
+        key = month_row['month']
+        if self.partitioned and category_rows:
+            self.partitions.ensure_partitions('category_months', budget_id, [key])
+        
+        self._backfill_history(budget_id)
+        session = self.Session()
+        try:
+            session.execute(
+                self.months.delete().where((self.months.c.budget_id == budget_id) & (self.months.c.month == key))
+            )
+            session.execute(self.months.insert().values(**month_row))
+            session.execute(
+                self.category_months.delete().where(
+                    (self.category_months.c.budget_id == budget_id) & (self.category_months.c.month == key)
+                )
+            )
+            if category_rows:
+                session.execute(self.category_months.insert(), category_rows)
+            
+            # Category months the detail no longer has end their history too
+            history = self.category_month_history
+            session.execute(
+                history.update().where(
+                    (history.c.budget_id == budget_id) &
+                    (history.c.month == key) &
+                    history.c.valid_to.is_(None) &
+                    history.c.category_id.notin_([row['category_id'] for row in category_rows])
+                ).values(valid_to=text('CURRENT_TIMESTAMP'))
+            )
+            self._record_history(session, self.month_history, ['month'], [month_row], knowledge)
+            self._record_history(session, history, ['month', 'category_id'], category_rows, knowledge)
+            session.commit()
+            logger.info(f"Replaced month {key} with {len(category_rows)} categories for budget {budget_id}")
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error replacing month: {str(e)}")
+            raise
+        finally:
+            session.close()
+    
+    def _rewind_stage_watermarks(self, session, budget_id, knowledge):
+        """
+        Move the budget's post-sync stage watermarks back to at most the given
+        knowledge, so the stages process rows stamped above it again.
+        """
+        session.execute(
+            self.stage_watermarks.update().where(
+                (self.stage_watermarks.c.budget_id == budget_id) &
+                (self.stage_watermarks.c.knowledge > knowledge)
+            ).values(knowledge=knowledge, updated_at=text('CURRENT_TIMESTAMP'))
+        )
+    
+    def _mark_balances_dirty(self, session, budget_id, transaction_rows):
+        """
+        Record the earliest date from which each affected account's daily balances
+        must be recomputed. Both the stored and the incoming version of a
+        transaction count, so moving a transaction to another date or account
+        invalidates the old position as well.
+        
+        Args:
+            session (Session): The open database session
+            budget_id (str): The budget ID
+            transaction_rows (list): Transaction rows about to be written
+        """
+        earliest = {}
+        
+        def mark(account_id, date):
+            date = str(date)
+            if account_id not in earliest or date < earliest[account_id]:
+                earliest[account_id] = date
+        
+        existing = session.execute(
+            select(self.transactions.c.account_id, self.transactions.c.date).where(
+                (self.transactions.c.budget_id == budget_id) &
+                self.transactions.c.id.in_([row['id'] for row in transaction_rows])
+            )
+        )
+        for account_id, date in existing:
+            mark(account_id, date)
+        for row in transaction_rows:
+            mark(row['account_id'], row['date'])
+        
+        stmt = insert(self.balance_dirty_ranges)
+        session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=['budget_id', 'account_id'],
+                set_={'from_date': func.least(self.balance_dirty_ranges.c.from_date, stmt.excluded.from_date)}
+            ),
+            [
+                {'budget_id': budget_id, 'account_id': account_id, 'from_date': date}
+                for account_id, date in earliest.items()
+            ]
+        )
+    
     def save_scheduled_transactions(self, budget_id, scheduled_transactions_data):
         """
         Save scheduled transactions to the database.
@@ -644,36 +1469,32 @@ class DatabaseService:
             budget_id (str): The budget ID
             scheduled_transactions_data (dict): Dictionary containing scheduled_transactions and server_knowledge
         """
-        if 'server_knowledge' in scheduled_transactions_data:
-            self._update_server_knowledge(budget_id, 'scheduled_transactions', scheduled_transactions_data['server_knowledge'])
-        
         if 'scheduled_transactions' not in scheduled_transactions_data:
+            if 'server_knowledge' in scheduled_transactions_data:
+                self._update_server_knowledge(budget_id, 'scheduled_transactions', scheduled_transactions_data['server_knowledge'])
             return
         
         scheduled_transactions = scheduled_transactions_data['scheduled_transactions']
         session = self.Session()
         try:
-            # Mark all scheduled transactions as deleted first
-            session.execute(
-                self.scheduled_transactions.update().where(
-                    self.scheduled_transactions.c.budget_id == budget_id
-                ).values(deleted=True)
-            )
-            
+            # A delta only contains changed scheduled transactions, so removals
+            # arrive as deleted=True instead of being inferred from absence
             for transaction in scheduled_transactions:
+                frequency = transaction.frequency
                 transaction_data = {
                     'id': transaction.id,
                     'budget_id': budget_id,
                     'account_id': transaction.account_id,
                     'category_id': getattr(transaction, 'category_id', None),
                     'payee_id': getattr(transaction, 'payee_id', None),
-                    'date': getattr(transaction, 'date', None),
+                    'date': getattr(transaction, 'date_next', None),
+                    'date_first': getattr(transaction, 'date_first', None),
                     'amount': transaction.amount,
                     'memo': getattr(transaction, 'memo', None),
-                    'frequency': transaction.frequency,
+                    'frequency': getattr(frequency, 'value', frequency),
                     'flag_color': getattr(transaction, 'flag_color', None),
                     'flag_name': getattr(transaction, 'flag_name', None),
-                    'deleted': False
+                    'deleted': bool(getattr(transaction, 'deleted', False))
                 }
                 
                 existing_transaction = session.query(self.scheduled_transactions).filter_by(id=transaction.id).first()
@@ -706,13 +1527,15 @@ class DatabaseService:
                             'amount': subtransaction.amount,
                             'memo': getattr(subtransaction, 'memo', None),
                             'payee_id': getattr(subtransaction, 'payee_id', None),
-                            'deleted': False
+                            'deleted': bool(getattr(subtransaction, 'deleted', False))
                         }
                         
                         session.execute(
                             self.scheduled_subtransactions.insert().values(**subtransaction_data)
                         )
             
+            if 'server_knowledge' in scheduled_transactions_data:
+                self._set_server_knowledge(session, budget_id, 'scheduled_transactions', scheduled_transactions_data['server_knowledge'])
             session.commit()
             logger.info(f"Saved {len(scheduled_transactions)} scheduled transactions to database for budget {budget_id}")
         except Exception as e:
@@ -724,69 +1547,61 @@ class DatabaseService:
     
     def save_months(self, budget_id, months_data):
         """
-        Save months and category months to the database.
+        Save months and category months to the database, versioning the values
+        that changed in month_history and category_month_history.
         
         Args:
             budget_id (str): The budget ID
             months_data (dict): Dictionary containing months and server_knowledge
         """
-        if 'server_knowledge' in months_data:
-            self._update_server_knowledge(budget_id, 'months', months_data['server_knowledge'])
-        
         if 'months' not in months_data:
+            if 'server_knowledge' in months_data:
+                self._update_server_knowledge(budget_id, 'months', months_data['server_knowledge'])
             return
         
         months = months_data['months']
+        month_rows = []
+        category_rows = []
+        for month in months:
+            month_row, rows = self._month_rows(budget_id, month)
+            month_rows.append(month_row)
+            category_rows.extend(rows)
+        
+        if self.partitioned and category_rows:
+            self.partitions.ensure_partitions('category_months', budget_id, {row['month'] for row in category_rows})
+        
+        self._backfill_history(budget_id)
         session = self.Session()
         try:
-            # Delete existing months for this budget
-            session.execute(
-                self.months.delete().where(
-                    self.months.c.budget_id == budget_id
-                )
-            )
-            
-            for month in months:
-                month_data = {
-                    'budget_id': budget_id,
-                    'month': month.month,
-                    'to_be_budgeted': getattr(month, 'to_be_budgeted', None),
-                    'age_of_money': getattr(month, 'age_of_money', None),
-                    'income': getattr(month, 'income', None),
-                    'budgeted': getattr(month, 'budgeted', None),
-                    'activity': getattr(month, 'activity', None)
-                }
-                
+            # A delta only contains changed months, so upsert them and keep the others
+            for table, rows, key_columns in (
+                (self.months, month_rows, ['budget_id', 'month']),
+                (self.category_months, category_rows, ['budget_id', 'month', 'category_id'])
+            ):
+                if not rows:
+                    continue
+                stmt = insert(table)
+                value_columns = [column for column in rows[0] if column not in key_columns]
                 session.execute(
-                    self.months.insert().values(**month_data)
+                    stmt.on_conflict_do_update(
+                        index_elements=key_columns,
+                        set_={column: stmt.excluded[column] for column in value_columns},
+                        # Unchanged rows are left alone rather than rewritten
+                        where=or_(*[table.c[column].is_distinct_from(stmt.excluded[column]) for column in value_columns])
+                    ),
+                    rows
                 )
-                
-                # Save category months if any
-                if hasattr(month, 'categories') and month.categories:
-                    # Delete existing category months for this month
-                    session.execute(
-                        self.category_months.delete().where(
-                            (self.category_months.c.budget_id == budget_id) &
-                            (self.category_months.c.month == month.month)
-                        )
-                    )
-                    
-                    for category in month.categories:
-                        category_month_data = {
-                            'budget_id': budget_id,
-                            'month': month.month,
-                            'category_id': category.id,
-                            'budgeted': getattr(category, 'budgeted', None),
-                            'activity': getattr(category, 'activity', None),
-                            'balance': getattr(category, 'balance', None)
-                        }
-                        
-                        session.execute(
-                            self.category_months.insert().values(**category_month_data)
-                        )
             
+            knowledge = months_data.get('server_knowledge')
+            versions = self._record_history(session, self.month_history, ['month'], month_rows, knowledge)
+            versions += self._record_history(
+                session, self.category_month_history, ['month', 'category_id'], category_rows, knowledge
+            )
+            
+            if 'server_knowledge' in months_data:
+                self._set_server_knowledge(session, budget_id, 'months', months_data['server_knowledge'])
             session.commit()
-            logger.info(f"Saved {len(months)} months to database for budget {budget_id}")
+            logger.info(f"Saved {len(months)} months to database for budget {budget_id}, {versions} new history versions")
         except Exception as e:
             session.rollback()
             logger.error(f"Error saving months: {str(e)}")
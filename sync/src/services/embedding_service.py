@@ -0,0 +1,403 @@
+import hashlib
+import importlib
+import logging
+import math
+import re
+import time
+from sqlalchemy import select, func, or_, text
+from sqlalchemy.dialects.postgresql import insert
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def hashing_embedding(texts, dimensions=256):
+    """
+    Deterministic local embedding using the hashing trick over word unigrams
+    and bigrams. Needs no model download, so it is the default embedder and
+    the reference implementation for tests.
+
+    Args:
+        texts (list): Texts to embed
+        dimensions (int): Size of the embedding vectors
+
+    Returns:
+        list: One L2-normalised vector (list of floats) per text
+    """
+    vectors = []
+    for content in texts:
+        tokens = TOKEN_PATTERN.findall(content.lower())
+        features = tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+
+        vector = [0.0] * dimensions
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], 'little') % dimensions
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        vectors.append([value / norm for value in vector])
+    return vectors
+
+def load_embedding_function(path):
+    """
+    Load an embedding function from a 'module:attribute' path.
+
+    Args:
+        path (str): Import path of a callable mapping a list of texts to a list of vectors
+
+    Returns:
+        callable: The embedding function
+    """
+    module_name, _, attribute = path.partition(':')
+    return getattr(importlib.import_module(module_name), attribute)
+
+def format_amount(milliunits):
+    """Format a YNAB milliunit amount as a decimal string."""
+    if milliunits is None:
+        return "n/a"
+    return f"{milliunits / 1000:,.2f}"
+
+class EmbeddingService:
+    """
+    Post-sync pipeline stage that embeds transactions, payees, categories,
+    accounts and monthly summaries for retrieval. Chunks are keyed by a hash
+    of their content, so only new or changed content is embedded and
+    identical content reuses an existing vector.
+
+    Transaction chunks are rebuilt when the transaction changed since the
+    stage's watermark, or when its payee, category or account was renamed,
+    i.e. the chunk of that payee, category or account changed.
+    """
+
+    STAGE = 'embeddings'
+
+    def __init__(self, db_service, embed_fn=None, model_name='hashing-256', batch_size=64):
+        """
+        Initialize the embedding service.
+
+        Args:
+            db_service (DatabaseService): Database service owning the synced tables
+            embed_fn (callable, optional): Maps a list of texts to a list of vectors, defaults to hashing_embedding
+            model_name (str): Name of the embedding model, part of the content hash so a new model re-embeds everything
+            batch_size (int): Number of texts embedded and written per batch
+        """
+        self.db = db_service
+        self.embed_fn = embed_fn or hashing_embedding
+        self.model_name = model_name
+        self.batch_size = batch_size
+
+    def _content_hash(self, content):
+        """Hash chunk content together with the model name."""
+        return hashlib.sha256(f"{self.model_name}\n{content}".encode()).hexdigest()
+
+    def _transaction_chunks(self, session, budget_id, watermark, renamed):
+        """
+        Build chunks for transactions changed since the watermark, or whose
+        payee, category or account was renamed.
+
+        Args:
+            renamed (dict): IDs of renamed payees, categories and accounts by source type
+
+        Returns:
+            tuple: (chunks as {source_id: content}, IDs of deleted transactions)
+        """
+        db = self.db
+        query = select(
+            db.transactions.c.id,
+            db.transactions.c.date,
+            db.transactions.c.amount,
+            db.transactions.c.memo,
+            db.transactions.c.deleted,
+            db.payees.c.name.label('payee_name'),
+            db.categories.c.name.label('category_name'),
+            db.accounts.c.name.label('account_name')
+        ).select_from(
+            db.transactions
+            .outerjoin(db.payees, db.payees.c.id == db.transactions.c.payee_id)
+            .outerjoin(db.categories, db.categories.c.id == db.transactions.c.category_id)
+            .outerjoin(db.accounts, db.accounts.c.id == db.transactions.c.account_id)
+        ).where(db.transactions.c.budget_id == budget_id)
+
+        if watermark is not None:
+            query = query.where(or_(
+                db.transactions.c.server_knowledge > watermark,
+                db.transactions.c.payee_id.in_(renamed['payee']),
+                db.transactions.c.category_id.in_(renamed['category']),
+                db.transactions.c.account_id.in_(renamed['account'])
+            ))
+
+        chunks = {}
+        deleted = []
+        for row in session.execute(query):
+            if row.deleted:
+                deleted.append(row.id)
+                continue
+            parts = [
+                f"Transaction on {row.date}",
+                f"payee {row.payee_name or 'unknown'}",
+                f"category {row.category_name or 'uncategorized'}",
+                f"account {row.account_name or 'unknown'}",
+                f"amount {format_amount(row.amount)}"
+            ]
+            if row.memo:
+                parts.append(f"memo {row.memo}")
+            chunks[row.id] = ", ".join(parts)
+        return chunks, deleted
+
+    def _payee_chunks(self, session, budget_id):
+        """
+        Build chunks for all payees of a budget. Payees are few, so unchanged
+        ones are filtered out by their content hash instead of a watermark.
+
+        Returns:
+            tuple: (chunks as {source_id: content}, IDs of deleted payees)
+        """
+        chunks = {}
+        deleted = []
+        query = select(self.db.payees.c.id, self.db.payees.c.name, self.db.payees.c.deleted).where(
+            self.db.payees.c.budget_id == budget_id
+        )
+        for row in session.execute(query):
+            if row.deleted:
+                deleted.append(row.id)
+            else:
+                chunks[row.id] = f"Payee {row.name}"
+        return chunks, deleted
+
+    def _category_chunks(self, session, budget_id):
+        """
+        Build chunks for all categories of a budget, filtered by content hash like payees.
+
+        Returns:
+            tuple: (chunks as {source_id: content}, IDs of deleted categories)
+        """
+        db = self.db
+        chunks = {}
+        deleted = []
+        query = select(db.categories.c.id, db.categories.c.name, db.categories.c.deleted).select_from(
+            db.categories.join(db.category_groups, db.category_groups.c.id == db.categories.c.category_group_id)
+        ).where(db.category_groups.c.budget_id == budget_id)
+        for row in session.execute(query):
+            if row.deleted:
+                deleted.append(row.id)
+            else:
+                chunks[row.id] = f"Category {row.name}"
+        return chunks, deleted
+
+    def _account_chunks(self, session, budget_id):
+        """
+        Build chunks for all accounts of a budget, filtered by content hash like payees.
+
+        Returns:
+            tuple: (chunks as {source_id: content}, IDs of deleted accounts)
+        """
+        chunks = {}
+        deleted = []
+        query = select(self.db.accounts.c.id, self.db.accounts.c.name, self.db.accounts.c.deleted).where(
+            self.db.accounts.c.budget_id == budget_id
+        )
+        for row in session.execute(query):
+            if row.deleted:
+                deleted.append(row.id)
+            else:
+                chunks[row.id] = f"Account {row.name}"
+        return chunks, deleted
+
+    def _stored_hashes(self, session, budget_id, source_type, source_ids):
+        """Content hashes of the stored chunks of the given sources, by source ID."""
+        embeddings = self.db.embeddings
+        source_ids = list(source_ids)
+        hashes = {}
+        for start in range(0, len(source_ids), 10000):
+            hashes.update(session.execute(
+                select(embeddings.c.source_id, embeddings.c.content_hash).where(
+                    (embeddings.c.budget_id == budget_id) &
+                    (embeddings.c.source_type == source_type) &
+                    embeddings.c.source_id.in_(source_ids[start:start + 10000])
+                )
+            ).all())
+        return hashes
+
+    def _month_chunks(self, session, budget_id, top_categories=5):
+        """
+        Build summary chunks for all months of a budget, including the
+        categories with the most activity.
+
+        Returns:
+            tuple: (chunks as {source_id: content}, empty list of deleted IDs)
+        """
+        db = self.db
+        spending = {}
+        ranked = select(
+            db.category_months.c.month,
+            db.categories.c.name,
+            db.category_months.c.activity,
+            func.row_number().over(
+                partition_by=db.category_months.c.month,
+                order_by=db.category_months.c.activity
+            ).label('rank')
+        ).select_from(
+            db.category_months.join(db.categories, db.categories.c.id == db.category_months.c.category_id)
+        ).where(
+            (db.category_months.c.budget_id == budget_id) &
+            (db.category_months.c.activity < 0)
+        ).subquery()
+        for row in session.execute(select(ranked).where(ranked.c.rank <= top_categories)):
+            spending.setdefault(row.month, []).append(f"{row.name} {format_amount(row.activity)}")
+
+        chunks = {}
+        for row in session.execute(select(db.months).where(db.months.c.budget_id == budget_id)):
+            content = (
+                f"Month {row.month}: income {format_amount(row.income)}, "
+                f"budgeted {format_amount(row.budgeted)}, activity {format_amount(row.activity)}, "
+                f"to be budgeted {format_amount(row.to_be_budgeted)}, "
+                f"age of money {row.age_of_money if row.age_of_money is not None else 'n/a'} days"
+            )
+            if row.month in spending:
+                content += ". Top spending: " + ", ".join(spending[row.month])
+            chunks[row.month] = content
+        return chunks, []
+
+    def _sync_source(self, budget_id, source_type, chunks, deleted, stats):
+        """
+        Embed and upsert the chunks of one source type whose content hash changed.
+
+        Args:
+            budget_id (str): The budget ID
+            source_type (str): The source type ('transaction', 'payee', 'category', 'account' or 'month')
+            chunks (dict): Chunk content by source ID
+            deleted (list): Source IDs whose embeddings should be removed
+            stats (dict): Running statistics, updated in place
+        """
+        embeddings = self.db.embeddings
+        session = self.db.Session()
+        try:
+            if deleted:
+                session.execute(
+                    embeddings.delete().where(
+                        (embeddings.c.budget_id == budget_id) &
+                        (embeddings.c.source_type == source_type) &
+                        embeddings.c.source_id.in_(deleted)
+                    )
+                )
+
+            existing = self._stored_hashes(session, budget_id, source_type, chunks)
+
+            pending = []
+            for source_id, content in chunks.items():
+                content_hash = self._content_hash(content)
+                if existing.get(source_id) == content_hash:
+                    stats['unchanged'] += 1
+                else:
+                    pending.append((source_id, content, content_hash))
+
+            for start in range(0, len(pending), self.batch_size):
+                batch = pending[start:start + self.batch_size]
+
+                # Identical content embedded before (e.g. for another budget) reuses its vector
+                cached = dict(session.execute(
+                    select(embeddings.c.content_hash, embeddings.c.embedding).distinct(embeddings.c.content_hash).where(
+                        embeddings.c.content_hash.in_({content_hash for _, _, content_hash in batch})
+                    )
+                ).all())
+                to_embed = [item for item in batch if item[2] not in cached]
+                stats['reused'] += len(batch) - len(to_embed)
+
+                if to_embed:
+                    started = time.perf_counter()
+                    vectors = self.embed_fn([content for _, content, _ in to_embed])
+                    stats['embed_seconds'] += time.perf_counter() - started
+                    stats['embedded'] += len(to_embed)
+                    for (_, _, content_hash), vector in zip(to_embed, vectors):
+                        cached[content_hash] = [float(value) for value in vector]
+
+                stmt = insert(embeddings)
+                session.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=['budget_id', 'source_type', 'source_id'],
+                        set_={
+                            'content_hash': stmt.excluded.content_hash,
+                            'content': stmt.excluded.content,
+                            'embedding': stmt.excluded.embedding,
+                            'updated_at': text('CURRENT_TIMESTAMP')
+                        }
+                    ),
+                    [
+                        {
+                            'budget_id': budget_id,
+                            'source_type': source_type,
+                            'source_id': source_id,
+                            'content_hash': content_hash,
+                            'content': content,
+                            'embedding': cached[content_hash]
+                        }
+                        for source_id, content, content_hash in batch
+                    ]
+                )
+                session.commit()
+
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error embedding {source_type} chunks: {str(e)}")
+            raise
+        finally:
+            session.close()
+
+    def run(self, budget_id):
+        """
+        Embed new or changed content for a budget.
+
+        Args:
+            budget_id (str): The budget ID
+
+        Returns:
+            dict: Statistics including embeddings_per_second and cache_hit_rate
+        """
+        # Read the target knowledge first so rows written during the run are picked up next time
+        target_knowledge = self.db.get_server_knowledge(budget_id).get('transactions')
+        watermark = self.db.get_stage_watermark(budget_id, self.STAGE)
+
+        session = self.db.Session()
+        try:
+            dimensions = {
+                'payee': self._payee_chunks(session, budget_id),
+                'category': self._category_chunks(session, budget_id),
+                'account': self._account_chunks(session, budget_id)
+            }
+            renamed = {}
+            for source_type, (chunks, _) in dimensions.items():
+                stored = self._stored_hashes(session, budget_id, source_type, chunks)
+                renamed[source_type] = [
+                    source_id for source_id, content in chunks.items()
+                    if stored.get(source_id) != self._content_hash(content)
+                ]
+            # Transactions are written before the dimensions, so a failed run finds the renames again
+            sources = {
+                'transaction': self._transaction_chunks(session, budget_id, watermark, renamed),
+                **dimensions,
+                'month': self._month_chunks(session, budget_id)
+            }
+        finally:
+            session.close()
+
+        stats = {'candidates': 0, 'unchanged': 0, 'reused': 0, 'embedded': 0, 'embed_seconds': 0.0}
+        for source_type, (chunks, deleted) in sources.items():
+            stats['candidates'] += len(chunks)
+            self._sync_source(budget_id, source_type, chunks, deleted, stats)
+
+        if target_knowledge is not None:
+            self.db.set_stage_watermark(budget_id, self.STAGE, target_knowledge)
+
+        stats['embeddings_per_second'] = (
+            stats['embedded'] / stats['embed_seconds'] if stats['embed_seconds'] else 0.0
+        )
+        stats['cache_hit_rate'] = (
+            (stats['unchanged'] + stats['reused']) / stats['candidates'] if stats['candidates'] else 1.0
+        )
+        logger.info(
+            f"Embedded {stats['embedded']} of {stats['candidates']} chunks for budget {budget_id} "
+            f"({stats['embeddings_per_second']:.0f} embeddings/sec, cache hit rate {stats['cache_hit_rate']:.1%})"
+        )
+        return stats
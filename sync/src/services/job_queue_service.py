@@ -0,0 +1,313 @@
+import logging
+import os
+import socket
+from contextlib import contextmanager
+from datetime import timedelta
+from sqlalchemy import select, func, text
+from sqlalchemy.dialects.postgresql import insert
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock key used to elect the replica that enqueues the next round of jobs
+SCHEDULER_LOCK_KEY = 'budgey-sync:scheduler'
+
+# Scheduler state row recording when jobs were last enqueued
+ENQUEUE_TASK = 'enqueue'
+
+class JobQueueService:
+    """
+    Service for distributing per-budget sync jobs across sync replicas.
+    Jobs are claimed with FOR UPDATE SKIP LOCKED and leased for a limited time,
+    so any number of workers can drain the queue without duplicating work.
+    """
+
+    def __init__(self, db_service, worker_id=None, lease_seconds=900, max_attempts=5, retry_backoff_seconds=60):
+        """
+        Initialize the job queue service.
+
+        Args:
+            db_service (DatabaseService): Database service owning the sync_jobs table
+            worker_id (str, optional): Identifier of this worker, defaults to hostname and pid
+            lease_seconds (int): How long a claimed job stays locked before other workers may reclaim it
+            max_attempts (int): Number of attempts before a job is marked as failed
+            retry_backoff_seconds (int): Base delay before retrying a failed job, doubled per attempt
+        """
+        self.engine = db_service.engine
+        self.Session = db_service.Session
+        self.sync_jobs = db_service.sync_jobs
+        self.sync_scheduler = db_service.sync_scheduler
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease = timedelta(seconds=lease_seconds)
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+
+    @contextmanager
+    def _advisory_lock(self, key):
+        """
+        Hold a session-level advisory lock for the duration of the block.
+
+        Args:
+            key (str): Lock name, hashed into the advisory lock key space
+
+        Yields:
+            bool: True if the lock was acquired, False if another session holds it
+        """
+        connection = self.engine.connect()
+        try:
+            acquired = connection.execute(
+                select(func.pg_try_advisory_lock(func.hashtext(key)))
+            ).scalar()
+            connection.commit()
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    connection.execute(select(func.pg_advisory_unlock(func.hashtext(key))))
+                    connection.commit()
+        finally:
+            connection.close()
+
+    def scheduler_lock(self):
+        """
+        Advisory lock ensuring only one replica enqueues jobs at a time.
+
+        Returns:
+            contextmanager: Yields True if this replica should enqueue jobs
+        """
+        return self._advisory_lock(SCHEDULER_LOCK_KEY)
+
+    def budget_lock(self, budget_id):
+        """
+        Advisory lock ensuring a budget is never synced by two workers at once,
+        even if a lease expired while the original worker was still running.
+
+        Args:
+            budget_id (str): The budget ID
+
+        Returns:
+            contextmanager: Yields True if this worker may sync the budget
+        """
+        return self._advisory_lock(f"budgey-sync:budget:{budget_id}")
+
+    def is_enqueue_due(self, interval_seconds):
+        """
+        Check whether enough time has passed since jobs were last enqueued.
+        Rounds are recorded whether or not they inserted a job, so a round in
+        which every budget still had an active job does not make the next one
+        due right away.
+
+        Args:
+            interval_seconds (int): Minimum number of seconds between enqueue rounds
+
+        Returns:
+            bool: True if a new round of jobs should be enqueued
+        """
+        session = self.Session()
+        try:
+            due = session.execute(
+                select(
+                    func.coalesce(
+                        func.max(self.sync_scheduler.c.last_run_at) <= func.now() - timedelta(seconds=interval_seconds),
+                        True
+                    )
+                ).where(self.sync_scheduler.c.name == ENQUEUE_TASK)
+            ).scalar()
+            return bool(due)
+        finally:
+            session.close()
+
+    def enqueue_budget_jobs(self, budget_ids, retention_days=7):
+        """
+        Enqueue one sync job per budget. Budgets that already have a pending
+        or running job are skipped, so enqueueing is safe from any replica.
+
+        Args:
+            budget_ids (list): Budget IDs to enqueue
+            retention_days (int): Finished jobs older than this are purged
+
+        Returns:
+            int: Number of jobs enqueued
+        """
+        session = self.Session()
+        try:
+            session.execute(
+                self.sync_jobs.delete().where(
+                    self.sync_jobs.c.status.in_(['succeeded', 'failed']) &
+                    (self.sync_jobs.c.updated_at < func.now() - timedelta(days=retention_days))
+                )
+            )
+
+            enqueued = 0
+            for budget_id in budget_ids:
+                result = session.execute(
+                    text(
+                        "INSERT INTO sync_jobs (budget_id) VALUES (:budget_id) "
+                        "ON CONFLICT (budget_id) WHERE status IN ('pending', 'running') DO NOTHING"
+                    ),
+                    {'budget_id': budget_id}
+                )
+                enqueued += result.rowcount
+
+            stmt = insert(self.sync_scheduler).values(name=ENQUEUE_TASK, last_run_at=func.now())
+            session.execute(stmt.on_conflict_do_update(
+                index_elements=['name'],
+                set_={'last_run_at': stmt.excluded.last_run_at}
+            ))
+            session.commit()
+            logger.info(f"Enqueued {enqueued} sync jobs for {len(budget_ids)} budgets")
+            return enqueued
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error enqueueing sync jobs: {str(e)}")
+            raise
+        finally:
+            session.close()
+
+    def claim_job(self):
+        """
+        Claim the next runnable job. Pending jobs whose retry delay has passed
+        and running jobs whose lease expired are both eligible. A job whose
+        lease expired on its last attempt, e.g. because it kept killing its
+        worker, never reached fail_job and is marked as failed instead.
+
+        Returns:
+            dict: The claimed job (id, budget_id, attempts), or None if the queue is empty
+        """
+        jobs = self.sync_jobs
+        session = self.Session()
+        try:
+            expired = (jobs.c.status == 'running') & (jobs.c.lease_expires_at < func.now())
+            for row in session.execute(
+                jobs.update().where(expired & (jobs.c.attempts >= self.max_attempts)).values(
+                    status='failed',
+                    locked_by=None,
+                    lease_expires_at=None,
+                    last_error='lease expired',
+                    updated_at=func.now()
+                ).returning(jobs.c.id, jobs.c.budget_id)
+            ):
+                logger.error(f"Sync job {row.id} for budget {row.budget_id} failed permanently: lease expired")
+
+            next_job = select(jobs.c.id).where(
+                ((jobs.c.status == 'pending') & (jobs.c.run_after <= func.now())) |
+                (expired & (jobs.c.attempts < self.max_attempts))
+            ).order_by(jobs.c.run_after).limit(1).with_for_update(skip_locked=True).scalar_subquery()
+
+            row = session.execute(
+                jobs.update().where(jobs.c.id == next_job).values(
+                    status='running',
+                    attempts=jobs.c.attempts + 1,
+                    locked_by=self.worker_id,
+                    lease_expires_at=func.now() + self.lease,
+                    updated_at=func.now()
+                ).returning(jobs.c.id, jobs.c.budget_id, jobs.c.attempts)
+            ).first()
+            session.commit()
+
+            if row is None:
+                return None
+
+            logger.info(f"Claimed sync job {row.id} for budget {row.budget_id} (attempt {row.attempts})")
+            return {'id': row.id, 'budget_id': row.budget_id, 'attempts': row.attempts}
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error claiming sync job: {str(e)}")
+            raise
+        finally:
+            session.close()
+
+    def _update_owned_job(self, job_id, **values):
+        """
+        Update a job only if this worker still holds its lease.
+
+        Args:
+            job_id (int): The job ID
+            **values: Column values to set
+
+        Returns:
+            bool: True if the job was updated
+        """
+        session = self.Session()
+        try:
+            result = session.execute(
+                self.sync_jobs.update().where(
+                    (self.sync_jobs.c.id == job_id) &
+                    (self.sync_jobs.c.locked_by == self.worker_id) &
+                    (self.sync_jobs.c.status == 'running')
+                ).values(updated_at=func.now(), **values)
+            )
+            session.commit()
+            if result.rowcount == 0:
+                logger.warning(f"Sync job {job_id} is no longer leased by {self.worker_id}")
+            return result.rowcount > 0
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error updating sync job {job_id}: {str(e)}")
+            raise
+        finally:
+            session.close()
+
+    def extend_lease(self, job_id):
+        """
+        Extend the lease of a running job. Called between sync phases so
+        long-running budgets are not reclaimed by other workers.
+
+        Args:
+            job_id (int): The job ID
+
+        Returns:
+            bool: True if the lease was extended
+        """
+        return self._update_owned_job(job_id, lease_expires_at=func.now() + self.lease)
+
+    def complete_job(self, job_id):
+        """
+        Mark a job as succeeded.
+
+        Args:
+            job_id (int): The job ID
+        """
+        self._update_owned_job(job_id, status='succeeded', lease_expires_at=None, last_error=None)
+
+    def release_job(self, job_id, delay_seconds=30):
+        """
+        Return a job to the queue without counting the attempt, e.g. when
+        another worker currently holds the budget lock.
+
+        Args:
+            job_id (int): The job ID
+            delay_seconds (int): Delay before the job becomes runnable again
+        """
+        self._update_owned_job(
+            job_id,
+            status='pending',
+            attempts=self.sync_jobs.c.attempts - 1,
+            locked_by=None,
+            lease_expires_at=None,
+            run_after=func.now() + timedelta(seconds=delay_seconds)
+        )
+
+    def fail_job(self, job, error):
+        """
+        Record a failed attempt. The job is retried with exponential backoff
+        until max_attempts is reached, after which it is marked as failed.
+
+        Args:
+            job (dict): The job returned by claim_job
+            error (Exception): The error that caused the failure
+        """
+        if job['attempts'] >= self.max_attempts:
+            logger.error(f"Sync job {job['id']} for budget {job['budget_id']} failed permanently")
+            self._update_owned_job(job['id'], status='failed', lease_expires_at=None, last_error=str(error))
+            return
+
+        delay = self.retry_backoff_seconds * 2 ** (job['attempts'] - 1)
+        logger.warning(f"Sync job {job['id']} for budget {job['budget_id']} failed, retrying in {delay}s")
+        self._update_owned_job(
+            job['id'],
+            status='pending',
+            locked_by=None,
+            lease_expires_at=None,
+            last_error=str(error),
+            run_after=func.now() + timedelta(seconds=delay)
+        )
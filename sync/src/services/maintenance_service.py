@@ -0,0 +1,413 @@
+import logging
+import time
+from datetime import date
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+
+logger = logging.getLogger(__name__)
+
+# Soft-deleted tables in purge order, children before their parents, each with
+# the query finding its tombstones in a budget (optionally only those written
+# after a server knowledge). Children of a purged parent go with it, and so do
+# the rows post-sync stages derived from it, which have no foreign key to it.
+TOMBSTONE_TABLES = [
+    {
+        'table': 'subtransactions',
+        'discover': """
+            SELECT s.id FROM subtransactions s
+            JOIN transactions t ON t.id = s.transaction_id
+            WHERE t.budget_id = :budget_id AND s.deleted
+                AND (CAST(:since AS integer) IS NULL OR t.server_knowledge > :since)
+        """
+    },
+    {
+        'table': 'transactions',
+        'discover': """
+            SELECT id FROM transactions
+            WHERE budget_id = :budget_id AND deleted
+                AND (CAST(:since AS integer) IS NULL OR server_knowledge > :since)
+        """,
+        'children': [('subtransactions', 'transaction_id')],
+        # Conditions on d matching the rows derived from the purged :ids
+        'derived': [
+            ('transaction_scores', "d.transaction_id = ANY(:ids)"),
+            ('transaction_matches', "d.transaction_id = ANY(:ids) OR d.match_id = ANY(:ids)"),
+            ('embeddings', "d.source_type = 'transaction' AND d.source_id = ANY(:ids)")
+        ]
+    },
+    {
+        'table': 'scheduled_subtransactions',
+        'discover': """
+            SELECT s.id FROM scheduled_subtransactions s
+            JOIN scheduled_transactions t ON t.id = s.scheduled_transaction_id
+            WHERE t.budget_id = :budget_id AND s.deleted
+        """
+    },
+    {
+        'table': 'scheduled_transactions',
+        'discover': "SELECT id FROM scheduled_transactions WHERE budget_id = :budget_id AND deleted",
+        'children': [('scheduled_subtransactions', 'scheduled_transaction_id')]
+    },
+    {
+        'table': 'categories',
+        'discover': """
+            SELECT c.id FROM categories c
+            JOIN category_groups g ON g.id = c.category_group_id
+            WHERE g.budget_id = :budget_id AND c.deleted
+        """
+    },
+    {
+        'table': 'category_groups',
+        'discover': "SELECT id FROM category_groups WHERE budget_id = :budget_id AND deleted"
+    },
+    {
+        'table': 'payees',
+        'discover': "SELECT id FROM payees WHERE budget_id = :budget_id AND deleted"
+    },
+    {
+        'table': 'accounts',
+        'discover': "SELECT id FROM accounts WHERE budget_id = :budget_id AND deleted"
+    },
+]
+
+# Tables checked for dead rows after a run: the purged ones and those the sync
+# and post-sync stages rewrite most
+VACUUM_TABLES = [spec['table'] for spec in TOMBSTONE_TABLES] + [
+    'account_daily_balances',
+    'transaction_scores',
+    'transaction_matches',
+    'embeddings',
+]
+
+# Dead and changed rows of a table, or of each of its partitions
+TABLE_STATS = text("""
+SELECT s.relid::regclass::text AS name, s.n_live_tup, s.n_dead_tup, s.n_mod_since_analyze
+FROM pg_stat_user_tables s
+WHERE s.relid = CAST(:table AS regclass)
+    OR s.relid IN (SELECT relid FROM pg_partition_tree(CAST(:table AS regclass)) WHERE isleaf)
+""")
+
+class MaintenanceService:
+    """
+    Post-sync pipeline stage that purges tombstones and keeps the synced tables vacuumed.
+
+    The sync soft-deletes rows with deleted = true, as YNAB reports them, so
+    without this stage the tables only grow and every query filters more dead
+    rows. The stage records when it first saw each tombstone in `tombstones`,
+    and once the retention window has passed deletes it in batches, each its
+    own short transaction, optionally archiving it to `archived_rows` as JSON.
+    A tombstone still referenced by a live row is kept. Deleted transactions
+    are only purged after every stage in wait_for has processed them, so the
+    stages still see the deletion. After the run, tables whose dead or changed
+    rows passed a share of their live rows get a targeted VACUUM or ANALYZE,
+    instead of waiting for autovacuum's much larger default thresholds. With
+    partitioned tables, month partitions older than partition_archive_months
+    are moved to the archive schema.
+    """
+
+    STAGE = 'maintenance'
+
+    def __init__(self, db_service, retention_days=30, archive=False, batch_size=5000, wait_for=(),
+                 vacuum_ratio=0.05, vacuum_min_rows=1000, partition_archive_months=0):
+        """
+        Initialize the maintenance service.
+
+        Args:
+            db_service (DatabaseService): Database service owning the synced tables
+            retention_days (float): Days a tombstone is kept after it was first seen
+            archive (bool): Copy purged rows to archived_rows instead of only deleting them
+            batch_size (int): Tombstones purged per transaction
+            wait_for (iterable): Stages whose watermark must pass a deleted transaction before it is purged
+            vacuum_ratio (float): Share of live rows that must be dead (or changed) to VACUUM (or ANALYZE)
+            vacuum_min_rows (int): Fewest dead or changed rows that trigger a VACUUM or ANALYZE
+            partition_archive_months (int): Months kept in partitioned tables before their partitions are archived, 0 keeps all
+        """
+        self.db = db_service
+        self.retention_days = retention_days
+        self.archive = archive
+        self.batch_size = batch_size
+        self.wait_for = list(wait_for)
+        self.vacuum_ratio = vacuum_ratio
+        self.vacuum_min_rows = vacuum_min_rows
+        self.partition_archive_months = partition_archive_months
+        self._indexes_checked = False
+
+        # Tables referencing each soft-deleted table, from the foreign keys
+        self.references = {spec['table']: [] for spec in TOMBSTONE_TABLES}
+        for table in db_service.metadata.tables.values():
+            for foreign_key in table.foreign_keys:
+                referenced = foreign_key.column.table.name
+                if referenced in self.references:
+                    self.references[referenced].append((table, foreign_key.parent.name))
+
+    def ensure_indexes(self):
+        """
+        Create indexes that were added to the schema after a database's tables
+        were created, which create_all skips for existing tables. Plain tables
+        are indexed concurrently, so syncs and reads are not blocked.
+        """
+        with self.db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            for table in self.db.metadata.sorted_tables:
+                if connection.execute(text("SELECT to_regclass(:name)"), {'name': table.name}).scalar() is None:
+                    continue
+                partitioned = 'postgresql_partition_by' in table.kwargs
+                for index in sorted(table.indexes, key=lambda index: index.name):
+                    if connection.execute(text("SELECT to_regclass(:name)"), {'name': index.name}).scalar():
+                        continue
+                    ddl = str(CreateIndex(index).compile(dialect=connection.dialect))
+                    if not partitioned:
+                        # Partitioned tables cannot be indexed concurrently
+                        ddl = ddl.replace('INDEX', 'INDEX CONCURRENTLY', 1)
+                    started = time.perf_counter()
+                    try:
+                        connection.exec_driver_sql(ddl)
+                        logger.info(f"Created index {index.name} in {time.perf_counter() - started:.1f}s")
+                    except Exception as e:
+                        logger.error(f"Error creating index {index.name}: {str(e)}")
+                        if not partitioned:
+                            # A failed concurrent build leaves an invalid index behind
+                            connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index.name}"))
+        self._indexes_checked = True
+
+    def _settled_knowledge(self, budget_id):
+        """
+        Get the server knowledge every waited-for stage has processed, or None
+        if one of them never ran or there are no stages to wait for.
+        """
+        if not self.wait_for:
+            return None
+        session = self.db.Session()
+        try:
+            settled, count = session.execute(
+                text(
+                    "SELECT min(knowledge), count(*) FROM stage_watermarks "
+                    "WHERE budget_id = :budget_id AND stage = ANY(:stages)"
+                ),
+                {'budget_id': budget_id, 'stages': self.wait_for}
+            ).one()
+        finally:
+            session.close()
+        return settled if count == len(set(self.wait_for)) else None
+
+    def _guard(self, table_name, exclude=()):
+        """SQL condition on t that holds when no row of a table other than exclude references it."""
+        conditions = []
+        for table, column in self.references[table_name]:
+            if table.name in exclude:
+                continue
+            scope = " AND r.budget_id = :budget_id" if 'budget_id' in table.c else ""
+            conditions.append(f"NOT EXISTS (SELECT 1 FROM {table.name} r WHERE r.{column} = t.id{scope})")
+        return " AND ".join(conditions) or "true"
+
+    def _remove(self, session, budget_id, table_name, column, ids):
+        """Delete (or archive) the rows of a table whose column is in ids."""
+        params = {'budget_id': budget_id, 'table_name': table_name, 'ids': ids}
+        if self.archive:
+            statement = text(f"""
+                WITH gone AS (DELETE FROM {table_name} t WHERE t.{column} = ANY(:ids) RETURNING t.*)
+                INSERT INTO archived_rows (budget_id, table_name, row_id, data)
+                SELECT :budget_id, :table_name, gone.id, to_jsonb(gone) FROM gone
+            """)
+        else:
+            statement = text(f"DELETE FROM {table_name} t WHERE t.{column} = ANY(:ids)")
+        return session.execute(statement, params).rowcount
+
+    def _purge(self, budget_id, spec, settled):
+        """
+        Purge the expired tombstones of a table in batches.
+
+        Returns:
+            int: Rows removed, including children of purged rows and rows derived from them
+        """
+        table_name = spec['table']
+        children = spec.get('children', [])
+        # Children are removed with their parent, so they do not hold it back
+        guard = self._guard(table_name, exclude={child for child, _ in children})
+        if table_name == 'transactions' and settled is not None:
+            guard += " AND t.server_knowledge <= :settled"
+
+        params = {
+            'budget_id': budget_id,
+            'table_name': table_name,
+            'retention_days': self.retention_days,
+            'batch_size': self.batch_size,
+            'settled': settled
+        }
+
+        removed = 0
+        after = ''
+        while True:
+            session = self.db.Session()
+            try:
+                ids = session.execute(
+                    text(
+                        "SELECT row_id FROM tombstones "
+                        "WHERE budget_id = :budget_id AND table_name = :table_name AND row_id > :after "
+                        "AND seen_at < CURRENT_TIMESTAMP - make_interval(secs => :retention_days * 86400) "
+                        "ORDER BY row_id LIMIT :batch_size"
+                    ),
+                    {**params, 'after': after}
+                ).scalars().all()
+                if not ids:
+                    session.commit()
+                    break
+                after = ids[-1]
+
+                purgeable = session.execute(
+                    text(f"SELECT t.id FROM {table_name} t WHERE t.id = ANY(:ids) AND t.deleted AND {guard}"),
+                    {**params, 'ids': ids}
+                ).scalars().all()
+                if purgeable:
+                    # Derived rows are recomputed by their stages, so they are deleted, not archived
+                    for derived, condition in spec.get('derived', []):
+                        removed += session.execute(
+                            text(f"DELETE FROM {derived} d WHERE d.budget_id = :budget_id AND ({condition})"),
+                            {**params, 'ids': purgeable}
+                        ).rowcount
+                    for child, column in children:
+                        removed += self._remove(session, budget_id, child, column, purgeable)
+                    removed += self._remove(session, budget_id, table_name, 'id', purgeable)
+
+                # Forget tombstones that are gone or were restored; referenced ones are retried next run
+                session.execute(
+                    text(
+                        f"DELETE FROM tombstones x WHERE x.budget_id = :budget_id AND x.table_name = :table_name "
+                        f"AND x.row_id = ANY(:ids) "
+                        f"AND NOT EXISTS (SELECT 1 FROM {table_name} t WHERE t.id = x.row_id AND t.deleted)"
+                    ),
+                    {**params, 'ids': ids}
+                )
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+        return removed
+
+    def vacuum(self, tables=VACUUM_TABLES, removed=None):
+        """
+        VACUUM (ANALYZE) the tables, or their partitions, with many dead rows,
+        and ANALYZE those with many changed rows.
+
+        Args:
+            tables (list): Table names to check
+            removed (dict): Rows just deleted per table, which the statistics may not count yet
+
+        Returns:
+            tuple: Names of the vacuumed and of the analyzed tables
+        """
+        removed = removed or {}
+        vacuumed, analyzed = [], []
+        with self.db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            for table in tables:
+                if connection.execute(text("SELECT to_regclass(:name)"), {'name': table}).scalar() is None:
+                    continue
+                stats = connection.execute(TABLE_STATS, {'table': table}).all()
+                if removed.get(table, 0) >= max(self.vacuum_min_rows, self.vacuum_ratio * sum(row[1] for row in stats)):
+                    connection.execute(text(f"VACUUM (ANALYZE) {table}"))
+                    vacuumed.append(table)
+                    continue
+                for name, live, dead, modified in stats:
+                    threshold = max(self.vacuum_min_rows, self.vacuum_ratio * live)
+                    if dead >= threshold:
+                        connection.execute(text(f"VACUUM (ANALYZE) {name}"))
+                        vacuumed.append(name)
+                    elif modified >= threshold:
+                        connection.execute(text(f"ANALYZE {name}"))
+                        analyzed.append(name)
+        return vacuumed, analyzed
+
+    def archive_partitions(self, budget_id):
+        """
+        Archive a budget's month partitions of the partitioned tables that are
+        older than partition_archive_months, counted from the current month.
+
+        Args:
+            budget_id (str): The budget ID
+
+        Returns:
+            list: Names of the archived partitions
+        """
+        if not self.partition_archive_months or not self.db.partitioned:
+            return []
+        today = date.today()
+        cutoff = today.year * 12 + today.month - 1 - self.partition_archive_months
+        before_month = f"{cutoff // 12:04d}-{cutoff % 12 + 1:02d}-01"
+        archived = []
+        for table_name in self.db.partitions.range_columns:
+            archived.extend(self.db.partitions.archive_partitions(table_name, budget_id, before_month))
+        return archived
+
+    def run(self, budget_id):
+        """
+        Record new tombstones of a budget, purge the expired ones, archive old
+        partitions and vacuum where needed.
+
+        Args:
+            budget_id (str): The budget ID
+
+        Returns:
+            dict: Statistics with the new and purged tombstones and the vacuumed tables
+        """
+        db = self.db
+        if not self._indexes_checked:
+            self.ensure_indexes()
+
+        # Read the target knowledge first so rows written during the run are picked up next time
+        target_knowledge = db.get_server_knowledge(budget_id).get('transactions')
+        watermark = db.get_stage_watermark(budget_id, self.STAGE)
+        settled = self._settled_knowledge(budget_id)
+
+        started = time.perf_counter()
+        session = db.Session()
+        try:
+            seen = 0
+            for spec in TOMBSTONE_TABLES:
+                seen += session.execute(
+                    text(
+                        f"INSERT INTO tombstones (budget_id, table_name, row_id) "
+                        f"SELECT :budget_id, :table_name, d.id FROM ({spec['discover']}) d "
+                        f"ON CONFLICT DO NOTHING"
+                    ),
+                    {'budget_id': budget_id, 'table_name': spec['table'], 'since': watermark}
+                ).rowcount
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error recording tombstones: {str(e)}")
+            raise
+        finally:
+            session.close()
+
+        purged = {}
+        for spec in TOMBSTONE_TABLES:
+            if spec['table'] == 'transactions' and self.wait_for and settled is None:
+                # A waited-for stage has not run yet and still needs to see the deletions
+                continue
+            try:
+                purged[spec['table']] = self._purge(budget_id, spec, settled)
+            except Exception as e:
+                logger.error(f"Error purging tombstones of {spec['table']}: {str(e)}")
+                raise
+
+        if target_knowledge is not None:
+            db.set_stage_watermark(budget_id, self.STAGE, target_knowledge)
+
+        archived = self.archive_partitions(budget_id)
+        vacuumed, analyzed = self.vacuum(removed=purged)
+        stats = {
+            'tombstones': seen,
+            'purged': sum(purged.values()),
+            'purged_by_table': {table: count for table, count in purged.items() if count},
+            'archived_partitions': archived,
+            'vacuumed': vacuumed,
+            'analyzed': analyzed,
+            'seconds': time.perf_counter() - started
+        }
+        logger.info(
+            f"Maintenance for budget {budget_id}: {stats['tombstones']} new tombstones, "
+            f"{'archived' if self.archive else 'purged'} {stats['purged']} rows {stats['purged_by_table']}, "
+            f"archived {len(archived)} partitions, vacuumed {vacuumed or 'nothing'}, analyzed {analyzed or 'nothing'} in {stats['seconds']:.2f}s"
+        )
+        return stats
@@ -0,0 +1,194 @@
+import logging
+import time
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# First and last day of the matching window around a transaction's date, as ISO strings
+WINDOW = """
+    BETWEEN to_char({alias}.date::date - :window_days, 'YYYY-MM-DD')
+        AND to_char({alias}.date::date + :window_days, 'YYYY-MM-DD')
+"""
+
+# Transactions whose matches change with the delta: the delta itself, every
+# transaction in its (account, amount) bucket, every transaction of the
+# opposite amount in another account (a possible transfer counterpart), and
+# the partners of their current matches
+EXPAND_AFFECTED = text(f"""
+INSERT INTO match_affected (id)
+SELECT n.id
+FROM match_delta x
+JOIN transactions d ON d.id = x.id AND d.budget_id = :budget_id
+JOIN transactions n
+    ON n.budget_id = :budget_id AND n.account_id = d.account_id AND n.amount = d.amount
+    AND n.date {WINDOW.format(alias='d')}
+UNION
+SELECT n.id
+FROM match_delta x
+JOIN transactions d ON d.id = x.id AND d.budget_id = :budget_id
+JOIN accounts a ON a.budget_id = :budget_id AND a.id <> d.account_id
+JOIN transactions n
+    ON n.budget_id = :budget_id AND n.account_id = a.id AND n.amount = -d.amount
+    AND n.date {WINDOW.format(alias='d')}
+UNION
+SELECT m.match_id FROM transaction_matches m JOIN match_delta x ON x.id = m.transaction_id
+WHERE m.match_id IS NOT NULL
+UNION
+SELECT m.transaction_id FROM transaction_matches m JOIN match_delta x ON x.id = m.match_id
+UNION
+SELECT id FROM match_delta
+""")
+
+# Same account, same amount, a few days apart, and not both imported: YNAB
+# import IDs are unique per account, so two imported transactions are distinct
+INSERT_DUPLICATES = text(f"""
+INSERT INTO transaction_matches (budget_id, kind, transaction_id, match_id, days_apart, score)
+SELECT
+    :budget_id,
+    'duplicate',
+    least(t.id, m.id),
+    greatest(t.id, m.id),
+    abs(t.date::date - m.date::date),
+    1.0 - abs(t.date::date - m.date::date) / (:window_days + 1.0)
+FROM match_affected x
+JOIN transactions t ON t.id = x.id AND t.budget_id = :budget_id AND t.deleted = false
+JOIN transactions m
+    ON m.budget_id = :budget_id AND m.account_id = t.account_id AND m.amount = t.amount
+    AND m.date {WINDOW.format(alias='t')}
+    AND m.id <> t.id AND m.deleted = false
+WHERE t.amount <> 0 AND (t.import_id IS NULL OR m.import_id IS NULL)
+ON CONFLICT (transaction_id, match_id, kind) DO NOTHING
+""")
+
+# Transfers without their counterpart (the opposite amount in the target
+# account, paid to the source account's transfer payee), each with the
+# non-transfer transactions there that could be the missing side
+INSERT_UNMATCHED_TRANSFERS = text(f"""
+INSERT INTO transaction_matches (budget_id, kind, transaction_id, match_id, days_apart, score)
+SELECT
+    :budget_id,
+    'transfer',
+    t.id,
+    c.id,
+    abs(t.date::date - c.date::date),
+    CASE WHEN c.id IS NULL THEN 0.0 ELSE 1.0 - abs(t.date::date - c.date::date) / (:window_days + 1.0) END
+FROM match_affected x
+JOIN transactions t ON t.id = x.id AND t.budget_id = :budget_id AND t.deleted = false
+JOIN payees p ON p.id = t.payee_id AND p.transfer_account_id IS NOT NULL
+JOIN accounts a ON a.id = t.account_id
+LEFT JOIN LATERAL (
+    SELECT c.id, c.date FROM transactions c
+    WHERE c.budget_id = :budget_id AND c.account_id = p.transfer_account_id AND c.amount = -t.amount
+        AND c.date {WINDOW.format(alias='t')}
+        AND c.deleted = false AND c.payee_id IS DISTINCT FROM a.transfer_payee_id
+) c ON true
+WHERE NOT EXISTS (
+    SELECT 1 FROM transactions o
+    WHERE o.budget_id = :budget_id AND o.account_id = p.transfer_account_id AND o.amount = -t.amount
+        AND o.date {WINDOW.format(alias='t')}
+        AND o.deleted = false AND o.payee_id = a.transfer_payee_id
+)
+ON CONFLICT (transaction_id, match_id, kind) DO NOTHING
+""")
+
+class MatchService:
+    """
+    Post-sync pipeline stage that finds likely duplicate imports and transfers
+    whose other side is missing.
+
+    Candidates are found by probing ix_transactions_match, which buckets
+    transactions by (account, amount) and orders each bucket by date, so a
+    transaction's neighbours within the matching window are one index range
+    scan rather than a self-join over the account. Only the transactions
+    changed since the stage's watermark and their neighbours are re-matched,
+    and the results are kept in transaction_matches for the backend to serve.
+    """
+
+    STAGE = 'matches'
+
+    def __init__(self, db_service, window_days=3):
+        """
+        Initialize the match service.
+
+        Args:
+            db_service (DatabaseService): Database service owning the synced tables
+            window_days (int): Most days two transactions may be apart to match
+        """
+        self.db = db_service
+        self.window_days = window_days
+
+    def run(self, budget_id):
+        """
+        Re-match the transactions of a budget changed since the last run.
+
+        Args:
+            budget_id (str): The budget ID
+
+        Returns:
+            dict: Statistics with the number of re-matched transactions and found matches
+        """
+        db = self.db
+        # Read the target knowledge first so rows written during the run are picked up next time
+        target_knowledge = db.get_server_knowledge(budget_id).get('transactions')
+        watermark = db.get_stage_watermark(budget_id, self.STAGE)
+        params = {'budget_id': budget_id, 'window_days': self.window_days}
+
+        started = time.perf_counter()
+        session = db.Session()
+        try:
+            session.execute(text("CREATE TEMP TABLE match_delta (id text PRIMARY KEY) ON COMMIT DROP"))
+            session.execute(text("CREATE TEMP TABLE match_affected (id text PRIMARY KEY) ON COMMIT DROP"))
+            if watermark is None:
+                # Match everything from scratch
+                session.execute(
+                    db.transaction_matches.delete().where(db.transaction_matches.c.budget_id == budget_id)
+                )
+                session.execute(
+                    text("INSERT INTO match_affected (id) SELECT id FROM transactions WHERE budget_id = :budget_id"),
+                    params
+                )
+            else:
+                session.execute(
+                    text(
+                        "INSERT INTO match_delta (id) SELECT id FROM transactions "
+                        "WHERE budget_id = :budget_id AND server_knowledge > :watermark"
+                    ),
+                    {**params, 'watermark': watermark}
+                )
+                session.execute(EXPAND_AFFECTED, params)
+                session.execute(
+                    text(
+                        "DELETE FROM transaction_matches m USING match_affected x "
+                        "WHERE m.transaction_id = x.id OR m.match_id = x.id"
+                    )
+                )
+            session.execute(text("ANALYZE match_affected"))
+
+            affected = session.execute(text("SELECT count(*) FROM match_affected")).scalar()
+            duplicates = session.execute(INSERT_DUPLICATES, params).rowcount if affected else 0
+            transfers = session.execute(INSERT_UNMATCHED_TRANSFERS, params).rowcount if affected else 0
+            if affected:
+                db.notify_change(session, budget_id, 'matches', target_knowledge)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error matching transactions: {str(e)}")
+            raise
+        finally:
+            session.close()
+
+        if target_knowledge is not None:
+            db.set_stage_watermark(budget_id, self.STAGE, target_knowledge)
+
+        stats = {
+            'transactions': affected,
+            'duplicates': duplicates,
+            'transfers': transfers,
+            'seconds': time.perf_counter() - started
+        }
+        logger.info(
+            f"Re-matched {stats['transactions']} transactions for budget {budget_id}: "
+            f"{stats['duplicates']} duplicate pairs, {stats['transfers']} unmatched transfer rows "
+            f"in {stats['seconds']:.2f}s"
+        )
+        return stats
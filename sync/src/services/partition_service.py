@@ -0,0 +1,148 @@
+import hashlib
+import logging
+import re
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+MONTH_PATTERN = re.compile(r'^(\d{4})-(\d{2})')
+
+class PartitionService:
+    """
+    Service for managing declarative partitions of large tables.
+    Tables are list-partitioned by budget_id and each budget partition is
+    range-partitioned by month, so queries filtered by budget and date prune
+    down to a few small partitions that can be vacuumed and archived on their own.
+    """
+
+    def __init__(self, engine, range_columns):
+        """
+        Initialize the partition service.
+
+        Args:
+            engine (Engine): SQLAlchemy engine
+            range_columns (dict): Partitioned table names mapped to their month range column
+        """
+        self.engine = engine
+        self.range_columns = range_columns
+        self._known_partitions = set()
+
+    @staticmethod
+    def _month_bounds(month):
+        """
+        Get the range bounds of the month containing a date string.
+
+        Args:
+            month (str): A date or month string starting with YYYY-MM
+
+        Returns:
+            tuple: Partition suffix, inclusive lower bound and exclusive upper bound
+        """
+        match = MONTH_PATTERN.match(str(month))
+        if not match:
+            raise ValueError(f"Invalid month value: {month}")
+        year, month_number = int(match.group(1)), int(match.group(2))
+        next_year, next_month = (year + 1, 1) if month_number == 12 else (year, month_number + 1)
+        return (
+            f"y{year:04d}m{month_number:02d}",
+            f"{year:04d}-{month_number:02d}-01",
+            f"{next_year:04d}-{next_month:02d}-01"
+        )
+
+    def budget_partition_name(self, table_name, budget_id):
+        """
+        Get the name of a budget's partition of a table.
+
+        Args:
+            table_name (str): The partitioned table name
+            budget_id (str): The budget ID
+
+        Returns:
+            str: Partition table name
+        """
+        digest = hashlib.sha1(budget_id.encode()).hexdigest()[:12]
+        return f"{table_name}_b{digest}"
+
+    def ensure_partitions(self, table_name, budget_id, months):
+        """
+        Create the budget partition and month sub-partitions needed to store rows.
+        Partitions are created in their own transaction so they survive a rolled
+        back write.
+
+        Args:
+            table_name (str): The partitioned table name
+            budget_id (str): The budget ID
+            months (iterable): Date or month strings of the rows about to be written
+        """
+        budget_partition = self.budget_partition_name(table_name, budget_id)
+        statements = []
+
+        if budget_partition not in self._known_partitions:
+            literal = budget_id.replace("'", "''")
+            statements.append(
+                (budget_partition,
+                 f"CREATE TABLE IF NOT EXISTS {budget_partition} PARTITION OF {table_name} "
+                 f"FOR VALUES IN ('{literal}') PARTITION BY RANGE ({self.range_columns[table_name]})")
+            )
+
+        for suffix, lower, upper in sorted({self._month_bounds(month) for month in months}):
+            month_partition = f"{budget_partition}_{suffix}"
+            if month_partition in self._known_partitions:
+                continue
+            statements.append(
+                (month_partition,
+                 f"CREATE TABLE IF NOT EXISTS {month_partition} PARTITION OF {budget_partition} "
+                 f"FOR VALUES FROM ('{lower}') TO ('{upper}')")
+            )
+
+        if not statements:
+            return
+
+        with self.engine.begin() as connection:
+            for _, statement in statements:
+                connection.execute(text(statement))
+
+        self._known_partitions.update(name for name, _ in statements)
+        logger.info(f"Ensured {len(statements)} partitions of {table_name} for budget {budget_id}")
+
+    def archive_partitions(self, table_name, budget_id, before_month, schema='archive'):
+        """
+        Detach a budget's month partitions older than a month and move them to
+        an archive schema. Detaching is a metadata-only operation, so archiving
+        does not rewrite or scan the remaining data.
+
+        Args:
+            table_name (str): The partitioned table name
+            budget_id (str): The budget ID
+            before_month (str): Partitions for months before this one are archived
+            schema (str): Schema that archived partitions are moved to
+
+        Returns:
+            list: Names of the archived partitions
+        """
+        budget_partition = self.budget_partition_name(table_name, budget_id)
+        cutoff, _, _ = self._month_bounds(before_month)
+
+        with self.engine.begin() as connection:
+            partitions = connection.execute(
+                text(
+                    "SELECT child.relname FROM pg_inherits "
+                    "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                    "WHERE pg_inherits.inhparent = to_regclass(:parent)"
+                ),
+                {'parent': budget_partition}
+            ).scalars().all()
+
+            archived = sorted(
+                name for name in partitions
+                if name.startswith(f"{budget_partition}_y") and name[len(budget_partition) + 1:] < cutoff
+            )
+            if archived:
+                connection.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema}"))
+            for name in archived:
+                connection.execute(text(f"ALTER TABLE {budget_partition} DETACH PARTITION {name}"))
+                connection.execute(text(f"ALTER TABLE {name} SET SCHEMA {schema}"))
+
+        self._known_partitions.difference_update(archived)
+        logger.info(f"Archived {len(archived)} partitions of {table_name} for budget {budget_id}")
+        return archived
@@ -0,0 +1,120 @@
+import logging
+import re
+import time
+from contextlib import contextmanager
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+WHITESPACE = re.compile(r"\s+")
+EXPLAINABLE = ("select", "with", "insert", "update", "delete")
+
+class PhaseStats:
+    """SQL activity of one sync phase."""
+
+    def __init__(self, name):
+        self.name = name
+        self.queries = 0
+        self.rows = 0
+        self.sql_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.seconds = 0.0
+
+    def record(self, seconds, rows):
+        self.queries += 1
+        self.rows += rows
+        self.sql_seconds += seconds
+        self.slowest_seconds = max(self.slowest_seconds, seconds)
+
+class QueryStatsService:
+    """
+    Times every statement executed on the sync engine and attributes it to the
+    running sync phases (an entity write, a post-sync stage), so a slow sync
+    can be traced to the phase and statement responsible.
+    Statements slower than the threshold are logged with their EXPLAIN plan.
+    """
+
+    def __init__(self, engine, slow_query_ms=1000):
+        """
+        Initialize the query stats service and register its engine event hooks.
+
+        Args:
+            engine (Engine): Engine whose statements are timed
+            slow_query_ms (float): Threshold for the slow-query log, 0 disables it
+        """
+        self.engine = engine
+        self.slow_query_ms = slow_query_ms
+        self.phases = []
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(engine, 'handle_error', self._handle_error)
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Attribute the statements executed within the block to a phase and log
+        its totals when it ends. Phases nest; a statement counts towards every
+        running phase.
+
+        Args:
+            name (str): Phase name used in the log
+
+        Yields:
+            PhaseStats: Stats of the phase, complete once the block exits
+        """
+        stats = PhaseStats(name)
+        self.phases.append(stats)
+        started = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.seconds = time.perf_counter() - started
+            self.phases.remove(stats)
+            logger.info(
+                f"Phase {name}: {stats.queries} statements, {stats.rows} rows, "
+                f"{stats.sql_seconds:.2f}s in SQL of {stats.seconds:.2f}s "
+                f"(slowest statement {stats.slowest_seconds * 1000:.0f}ms)"
+            )
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info['query_started'].pop()
+        rows = max(cursor.rowcount, 0)
+        for stats in self.phases:
+            stats.record(seconds, rows)
+
+        if self.slow_query_ms and seconds * 1000 >= self.slow_query_ms:
+            plan = None
+            if not executemany and statement.lstrip().lower().startswith(EXPLAINABLE):
+                plan = self._explain(statement, parameters)
+            phase = self.phases[-1].name if self.phases else 'none'
+            logger.warning(
+                f"Slow query in phase {phase} ({seconds * 1000:.0f}ms, {rows} rows): "
+                f"{WHITESPACE.sub(' ', statement).strip()}\n{plan or ''}"
+            )
+
+    def _handle_error(self, exception_context):
+        started = exception_context.connection.info.get('query_started') if exception_context.connection else None
+        if started:
+            started.pop()
+
+    def _explain(self, statement, parameters):
+        """
+        EXPLAIN a statement on a pooled connection of its own, outside the
+        sync's transaction, which a failing EXPLAIN therefore cannot abort.
+        The lock timeout keeps it from waiting on locks that transaction holds;
+        statements on its temporary tables cannot be explained.
+        """
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SET LOCAL lock_timeout = '1s'")
+            cursor.execute("EXPLAIN " + statement, parameters)
+            return "\n".join(row[0] for row in cursor.fetchall())
+        except Exception as e:
+            return f"EXPLAIN failed: {e}"
+        finally:
+            connection.rollback()
+            connection.close()
@@ -0,0 +1,241 @@
+import logging
+import time
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+
+logger = logging.getLogger(__name__)
+
+# Balance and cleared balance of every account, summed from the mirrored transactions
+ACCOUNT_AGGREGATES = text("""
+SELECT
+    a.id,
+    a.balance,
+    a.cleared_balance,
+    coalesce(sum(t.amount), 0) AS transactions_balance,
+    coalesce(sum(t.amount) FILTER (WHERE t.cleared IN ('cleared', 'reconciled')), 0) AS transactions_cleared
+FROM accounts a
+LEFT JOIN transactions t ON t.budget_id = a.budget_id AND t.account_id = a.id AND t.deleted = false
+WHERE a.budget_id = :budget_id AND a.deleted = false
+GROUP BY a.id, a.balance, a.cleared_balance
+""")
+
+# Stored month totals next to the assigned amounts summed over their category months
+MONTH_AGGREGATES = text("""
+SELECT
+    m.month,
+    m.budgeted,
+    m.activity,
+    count(cm.category_id) AS categories,
+    coalesce(sum(cm.budgeted), 0) AS categories_budgeted
+FROM months m
+LEFT JOIN category_months cm ON cm.budget_id = m.budget_id AND cm.month = m.month
+WHERE m.budget_id = :budget_id
+GROUP BY m.month, m.budgeted, m.activity
+""")
+
+class VerificationService:
+    """
+    Checks that the mirror of a budget matches YNAB without a full resync.
+
+    Two requests fetch YNAB's own aggregates: every account's balance and
+    cleared balance, and every month's assigned and activity totals. They are
+    compared with the same aggregates computed in Postgres, account balances
+    summed from the mirrored transactions and month totals summed from the
+    category months. Only the accounts and months that disagree are fetched
+    again, one request each, and replaced in the mirror. A budget that changed
+    in YNAB since its last sync is skipped, since the next delta sync will
+    bring the difference anyway.
+    """
+
+    def __init__(self, ynab_service, db_service, interval_hours=24, max_slices=10):
+        """
+        Initialize the verification service.
+
+        Args:
+            ynab_service (YNABService): YNAB API service
+            db_service (DatabaseService): Database service owning the synced tables
+            interval_hours (float): Hours between verifications of a budget
+            max_slices (int): Most accounts and months re-fetched per verification
+        """
+        self.ynab = ynab_service
+        self.db = db_service
+        self.interval_hours = interval_hours
+        self.max_slices = max_slices
+
+    def is_due(self, budget_id):
+        """
+        Check whether a budget's last verification is older than the interval.
+
+        Args:
+            budget_id (str): The budget ID
+
+        Returns:
+            bool: True if the budget was never verified or the interval has passed
+        """
+        session = self.db.Session()
+        try:
+            recent = session.execute(
+                text(
+                    "SELECT 1 FROM verifications WHERE budget_id = :budget_id "
+                    "AND verified_at > CURRENT_TIMESTAMP - make_interval(secs => :seconds)"
+                ),
+                {'budget_id': budget_id, 'seconds': self.interval_hours * 3600}
+            ).scalar()
+        finally:
+            session.close()
+        return recent is None
+
+    def _query(self, statement, budget_id):
+        session = self.db.Session()
+        try:
+            return session.execute(statement, {'budget_id': budget_id}).all()
+        finally:
+            session.close()
+
+    def _account_mismatches(self, budget_id, accounts):
+        """
+        Compare YNAB's account balances with the mirror.
+
+        Returns:
+            tuple: Accounts whose stored row differs, and IDs of accounts whose transactions do not add up
+        """
+        local = {row.id: row for row in self._query(ACCOUNT_AGGREGATES, budget_id)}
+        stale_rows, stale_transactions = [], []
+        for account in accounts:
+            if getattr(account, 'deleted', False):
+                continue
+            row = local.get(account.id)
+            if row is None or (row.balance, row.cleared_balance) != (account.balance, account.cleared_balance):
+                stale_rows.append(account)
+            if row is None or (row.transactions_balance, row.transactions_cleared) != (account.balance, account.cleared_balance):
+                stale_transactions.append(account.id)
+        return stale_rows, stale_transactions
+
+    def _month_mismatches(self, budget_id, months):
+        """
+        Compare YNAB's month totals with the mirror.
+
+        Returns:
+            list: First days (date) of the months that differ
+        """
+        local = {row.month: row for row in self._query(MONTH_AGGREGATES, budget_id)}
+        stale = []
+        for month in months:
+            if getattr(month, 'deleted', False):
+                continue
+            row = local.get(str(month.month))
+            if (
+                row is None or
+                (row.budgeted, row.activity) != (month.budgeted, month.activity) or
+                # Category months are only mirrored for months fetched with their categories
+                (row.categories and row.categories_budgeted != month.budgeted)
+            ):
+                stale.append(month.month)
+        return stale
+
+    def verify(self, budget_id):
+        """
+        Verify a budget against YNAB and re-fetch the accounts and months that differ.
+
+        Args:
+            budget_id (str): The budget ID
+
+        Returns:
+            dict: Statistics with the checked, mismatched and repaired slices,
+                or None if the budget changed in YNAB since its last sync
+        """
+        started = time.perf_counter()
+        knowledge = self.db.get_server_knowledge(budget_id).get('transactions')
+        accounts = self.ynab.get_accounts(budget_id)
+        if knowledge is None or accounts['server_knowledge'] != knowledge:
+            logger.info(f"Budget {budget_id} changed since its last sync, skipping verification")
+            return None
+        months = self.ynab.get_months(budget_id)
+
+        stale_rows, stale_accounts = self._account_mismatches(budget_id, accounts['accounts'])
+        stale_months = self._month_mismatches(budget_id, months['months'])
+        if stale_rows:
+            self.db.save_accounts(budget_id, {'accounts': stale_rows})
+
+        slices = [('account', account_id) for account_id in stale_accounts] + [('month', month) for month in stale_months]
+        if len(slices) > self.max_slices:
+            logger.warning(
+                f"Budget {budget_id} has {len(slices)} mismatched slices, re-fetching the first {self.max_slices}; "
+                f"the rest follow in later verifications"
+            )
+        repaired = 0
+        for kind, key in slices[:self.max_slices]:
+            if kind == 'account':
+                fetched = self.ynab.get_account_transactions(budget_id, key)
+                self.db.replace_account_transactions(budget_id, key, fetched['transactions'], fetched['server_knowledge'])
+            else:
+                self.db.replace_month(budget_id, self.ynab.get_month(budget_id, key), months['server_knowledge'])
+            repaired += 1
+
+        # A slice that still differs after its re-fetch is not a sync gap, so report it
+        unresolved = []
+        if repaired:
+            _, still_accounts = self._account_mismatches(budget_id, accounts['accounts'])
+            still_months = set(self._month_mismatches(budget_id, months['months']))
+            unresolved = [
+                (kind, str(key)) for kind, key in slices[:self.max_slices]
+                if (kind == 'account' and key in still_accounts) or (kind == 'month' and key in still_months)
+            ]
+
+        stats = {
+            'accounts': len(accounts['accounts']),
+            'months': len(months['months']),
+            'account_rows': len(stale_rows),
+            'mismatches': len(slices),
+            'repaired': repaired,
+            'unresolved': unresolved,
+            'seconds': time.perf_counter() - started
+        }
+        self._record(budget_id, knowledge, stats)
+        log = logger.warning if unresolved else logger.info
+        log(
+            f"Verified budget {budget_id}: {stats['accounts']} accounts and {stats['months']} months, "
+            f"{stats['mismatches']} mismatched slices, {stats['repaired']} re-fetched, "
+            f"unresolved {unresolved or 'none'} in {stats['seconds']:.2f}s"
+        )
+        return stats
+
+    def _record(self, budget_id, knowledge, stats):
+        session = self.db.Session()
+        try:
+            stmt = insert(self.db.verifications).values(
+                budget_id=budget_id,
+                verified_at=text('CURRENT_TIMESTAMP'),
+                knowledge=knowledge,
+                accounts_checked=stats['accounts'],
+                months_checked=stats['months'],
+                mismatches=stats['mismatches'],
+                repaired=stats['repaired']
+            )
+            session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=['budget_id'],
+                    set_={column: stmt.excluded[column] for column in stmt.excluded.keys() if column != 'budget_id'}
+                )
+            )
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error recording verification: {str(e)}")
+            raise
+        finally:
+            session.close()
+
+    def run_if_due(self, budget_id):
+        """
+        Verify a budget if its interval has passed.
+
+        Args:
+            budget_id (str): The budget ID
+
+        Returns:
+            dict: Verification statistics, or None if not due or skipped
+        """
+        if not self.is_due(budget_id):
+            return None
+        return self.verify(budget_id)
@@ -236,4 +236,55 @@ class YNABService:
             }
         except ApiException as e:
             logger.error(f"Error fetching months: {str(e)}")
+            raise
+    
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+        retry=retry_if_exception_type(ApiException)
+    )
+    def get_account_transactions(self, budget_id, account_id):
+        """
+        Get all transactions of one account.
+        
+        Args:
+            budget_id (str): The budget ID
+            account_id (str): The account ID
+            
+        Returns:
+            dict: Dictionary containing transactions and server_knowledge
+        """
+        try:
+            logger.info(f"Fetching transactions of account {account_id} for budget {budget_id}")
+            response = self.transactions_api.get_transactions_by_account(budget_id, account_id)
+            return {
+                'transactions': response.data.transactions,
+                'server_knowledge': response.data.server_knowledge
+            }
+        except ApiException as e:
+            logger.error(f"Error fetching account transactions: {str(e)}")
+            raise
+    
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+        retry=retry_if_exception_type(ApiException)
+    )
+    def get_month(self, budget_id, month):
+        """
+        Get one month of a budget with its categories.
+        
+        Args:
+            budget_id (str): The budget ID
+            month (date): First day of the month
+            
+        Returns:
+            object: Month detail object
+        """
+        try:
+            logger.info(f"Fetching month {month} for budget {budget_id}")
+            response = self.months_api.get_budget_month(budget_id, month)
+            return response.data.month
+        except ApiException as e:
+            logger.error(f"Error fetching month: {str(e)}")
             raise
\ No newline at end of file
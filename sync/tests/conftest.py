@@ -0,0 +1,40 @@
+"""
+Fixtures for tests that need PostgreSQL. Set TEST_DATABASE_URL to a server
+where the user may create databases; each test gets a scratch database that
+is dropped afterwards. Without it, database tests are skipped.
+"""
+import os
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+from factories import seed_budget
+from src.services.db_service import DatabaseService
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+@pytest.fixture
+def database_url():
+    """URL of a scratch database, dropped after the test."""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    name = f"test_{uuid.uuid4().hex[:12]}"
+    server = create_engine(TEST_DATABASE_URL, isolation_level="AUTOCOMMIT")
+    with server.connect() as connection:
+        connection.execute(text(f"CREATE DATABASE {name}"))
+    try:
+        yield make_url(TEST_DATABASE_URL).set(database=name).render_as_string(hide_password=False)
+    finally:
+        with server.connect() as connection:
+            connection.execute(text(f"DROP DATABASE IF EXISTS {name} WITH (FORCE)"))
+        server.dispose()
+
+@pytest.fixture
+def db(database_url):
+    """A DatabaseService on a scratch database, with budget b1 and its accounts, categories and payees."""
+    service = DatabaseService(database_url)
+    seed_budget(service)
+    yield service
+    service.engine.dispose()
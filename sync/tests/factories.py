@@ -0,0 +1,46 @@
+"""Objects shaped like the YNAB API models the sync saves."""
+import datetime
+from types import SimpleNamespace
+
+def account(id, name):
+    return SimpleNamespace(
+        id=id, name=name, type='checking', on_budget=True, closed=False, note=None, balance=0,
+        cleared_balance=0, uncleared_balance=0, transfer_payee_id=f'tp_{id}', deleted=False
+    )
+
+def category(id, name):
+    return SimpleNamespace(id=id, name=name, hidden=False, deleted=False)
+
+def category_group(id, name, categories):
+    return SimpleNamespace(id=id, name=name, hidden=False, deleted=False, categories=categories)
+
+def payee(id, name, transfer_account_id=None):
+    return SimpleNamespace(id=id, name=name, transfer_account_id=transfer_account_id, deleted=False)
+
+def transaction(index, account_id='a1', payee_id='p1', category_id='c1', amount=-1000, memo=None, deleted=False):
+    return SimpleNamespace(
+        id=f't{index:04d}', account_id=account_id, payee_id=payee_id, category_id=category_id,
+        date=datetime.date(2024, 1, index % 28 + 1), amount=amount, memo=memo, cleared='cleared', approved=True,
+        flag_color=None, flag_name=None, import_id=None, deleted=deleted, subtransactions=[]
+    )
+
+def seed_budget(db, budget_id='b1'):
+    """Save a budget with accounts a1/a2, categories c1/c2 and payees p1/p2 as the sync would."""
+    db.save_budgets([SimpleNamespace(
+        id=budget_id, name='Test', last_modified_on=None, first_month='2024-01-01',
+        last_month='2024-12-01', currency_format=None, date_format=None
+    )])
+    db.save_accounts(budget_id, {
+        'accounts': [account('a1', 'Checking'), account('a2', 'Savings')], 'server_knowledge': 1
+    })
+    db.save_categories(budget_id, {
+        'category_groups': [category_group('g1', 'Everyday', [category('c1', 'Coffee'), category('c2', 'Rent')])],
+        'server_knowledge': 1
+    })
+    db.save_payees(budget_id, {
+        'payees': [
+            payee('p1', 'Starbucks'), payee('p2', 'Landlord'),
+            payee('tp_a1', 'Transfer : Checking', 'a1'), payee('tp_a2', 'Transfer : Savings', 'a2')
+        ],
+        'server_knowledge': 1
+    })
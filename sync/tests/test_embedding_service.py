@@ -0,0 +1,89 @@
+import pytest
+from sqlalchemy import select
+
+from factories import account, category, category_group, payee, transaction
+from src.services.embedding_service import EmbeddingService, hashing_embedding
+
+def test_hashing_embedding_is_deterministic():
+    texts = ["Transaction on 2024-01-05, payee Starbucks", "payee Landlord, category Rent", ""]
+
+    first = hashing_embedding(texts)
+
+    assert first == hashing_embedding(texts)
+    assert first[0] == hashing_embedding(texts[:1])[0]
+    assert [len(vector) for vector in first] == [256, 256, 256]
+    assert len(hashing_embedding(texts[:1], dimensions=32)[0]) == 32
+
+def test_hashing_embedding_is_normalised():
+    vector = hashing_embedding(["coffee at the corner cafe"])[0]
+
+    assert sum(value * value for value in vector) == pytest.approx(1.0)
+    assert hashing_embedding(["coffee"]) != hashing_embedding(["rent"])
+
+def transaction_hashes(db):
+    """Content hash of each stored transaction chunk by transaction ID."""
+    with db.engine.connect() as connection:
+        rows = connection.execute(
+            select(db.embeddings.c.source_id, db.embeddings.c.content_hash)
+            .where(db.embeddings.c.source_type == 'transaction')
+        )
+        return dict(rows.all())
+
+@pytest.fixture
+def embedded(db):
+    """Budget b1 with transactions spread over both payees, categories and accounts, embedded once."""
+    transactions = [
+        transaction(index, account_id=f'a{index % 2 + 1}', payee_id=f'p{index % 3 % 2 + 1}',
+                    category_id=f'c{index % 5 % 2 + 1}', memo='latte' if index % 4 else None)
+        for index in range(30)
+    ]
+    db.save_transactions('b1', {'transactions': transactions, 'server_knowledge': 5})
+    service = EmbeddingService(db)
+    stats = service.run('b1')
+    assert stats['embedded'] + stats['reused'] == stats['candidates']
+    return service, transactions
+
+def test_unchanged_rows_hit_the_cache(db, embedded):
+    service, transactions = embedded
+    before = transaction_hashes(db)
+
+    stats = service.run('b1')
+
+    assert stats['embedded'] == 0
+    assert stats['unchanged'] == stats['candidates']
+    assert stats['cache_hit_rate'] == 1.0
+    assert transaction_hashes(db) == before
+
+def test_changed_transaction_is_the_only_one_rebuilt(db, embedded):
+    service, transactions = embedded
+    before = transaction_hashes(db)
+    transactions[1].memo = 'flat white'
+    db.save_transactions('b1', {'transactions': [transactions[1]], 'server_knowledge': 6})
+
+    stats = service.run('b1')
+
+    after = transaction_hashes(db)
+    assert {id for id in after if after[id] != before[id]} == {transactions[1].id}
+    assert stats['embedded'] == 1
+
+@pytest.mark.parametrize('rename, attribute, renamed_id', [
+    (lambda db: db.save_payees('b1', {'payees': [payee('p1', 'Corner Cafe')], 'server_knowledge': 9}),
+     'payee_id', 'p1'),
+    (lambda db: db.save_categories('b1', {'category_groups': [
+        category_group('g1', 'Everyday', [category('c1', 'Coffee'), category('c2', 'Housing')])
+    ], 'server_knowledge': 9}), 'category_id', 'c2'),
+    (lambda db: db.save_accounts('b1', {'accounts': [account('a2', 'Rainy Day')], 'server_knowledge': 9}),
+     'account_id', 'a2'),
+])
+def test_rename_rebuilds_only_affected_transactions(db, embedded, rename, attribute, renamed_id):
+    service, transactions = embedded
+    before = transaction_hashes(db)
+
+    rename(db)
+    service.run('b1')
+
+    after = transaction_hashes(db)
+    affected = {txn.id for txn in transactions if getattr(txn, attribute) == renamed_id}
+    assert affected and affected != set(before)
+    assert {id for id in after if after[id] != before[id]} == affected
+    assert service.run('b1')['embedded'] == 0
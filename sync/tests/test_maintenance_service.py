@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import insert, select
+
+from factories import transaction
+from src.services.maintenance_service import MaintenanceService
+
+@pytest.mark.parametrize('archive', [False, True])
+def test_purged_transactions_take_their_derived_rows(db, archive):
+    transactions = [transaction(index, deleted=index == 1) for index in range(4)]
+    db.save_transactions('b1', {'transactions': transactions, 'server_knowledge': 5})
+    live, purged = 't0000', 't0001'
+    with db.engine.begin() as connection:
+        connection.execute(insert(db.transaction_scores), [
+            {'transaction_id': id, 'budget_id': 'b1', 'date': '2024-01-01', 'amount': -1000, 'score': 1.0}
+            for id in (live, purged)
+        ])
+        connection.execute(insert(db.transaction_matches), [
+            {'budget_id': 'b1', 'kind': 'duplicate', 'transaction_id': live, 'match_id': purged, 'score': 1.0},
+            {'budget_id': 'b1', 'kind': 'duplicate', 'transaction_id': purged, 'match_id': 't0002', 'score': 1.0},
+            {'budget_id': 'b1', 'kind': 'duplicate', 'transaction_id': 't0002', 'match_id': 't0003', 'score': 1.0},
+        ])
+        connection.execute(insert(db.embeddings), [
+            {'budget_id': 'b1', 'source_type': source_type, 'source_id': id, 'content_hash': id,
+             'content': id, 'embedding': [1.0]}
+            for source_type, id in (('transaction', live), ('transaction', purged), ('payee', purged))
+        ])
+
+    stats = MaintenanceService(db, retention_days=0, archive=archive).run('b1')
+
+    assert stats['purged_by_table']['transactions'] == 5
+    with db.engine.connect() as connection:
+        assert sorted(connection.execute(select(db.transactions.c.id)).scalars()) == [live, 't0002', 't0003']
+        assert connection.execute(select(db.transaction_scores.c.transaction_id)).scalars().all() == [live]
+        assert connection.execute(
+            select(db.transaction_matches.c.transaction_id, db.transaction_matches.c.match_id)
+        ).all() == [('t0002', 't0003')]
+        assert sorted(connection.execute(
+            select(db.embeddings.c.source_type, db.embeddings.c.source_id)
+        ).all()) == [('payee', purged), ('transaction', live)]